@@ -1,15 +1,39 @@
 import base64
-import hashlib
-import importlib.util
-import json
+import inspect
 import os
 import sys
 import tempfile
 import io
+from functools import partial
 import streamlit as st
 
+from tgchatsanalyzer.cache import ChatCache, content_hash
+from tgchatsanalyzer.datasets import prepare_datasets
+from tgchatsanalyzer.engine import SCAN_FUNCTION, run_scan, scan_messages
+from tgchatsanalyzer.memo import memoize, memoize_future
+from tgchatsanalyzer.plugins import import_plugin, inspect_plugin, plugin_module_name, warm_up
+from tgchatsanalyzer.pool import (
+    PluginPool,
+    compute_args,
+    compute_function,
+    compute_inline,
+    is_compute_plugin,
+    render_result,
+    set_default_pool,
+)
+
 video_path = os.path.join(os.path.dirname(__file__), "..", "images", "instruction.mp4")
 plugins_dir = os.path.join(os.path.dirname(__file__), "plugins")
+chat_cache = ChatCache()
+
+
+@st.cache_resource
+def get_plugin_pool():
+    """Пул процессов для compute_plugin и map_reduce, общий для всех перезапусков скрипта"""
+    pool = PluginPool(chat_cache.directory)
+    set_default_pool(pool)
+    return pool
+
 
 PLUGIN_CATEGORIES = {
     "📊 Основные": {
@@ -64,6 +88,19 @@ PLUGIN_CATEGORIES = {
 }
 
 
+def get_module_name_from_path(plugin_path: str) -> str:
+    # То же имя, что у пула и shared_result: второй копии модуля не будет
+    return plugin_module_name(plugin_path)
+
+
+def plugin_help(plugin_path: str):
+    """Описание плагина из docstring (без импорта модуля)"""
+    try:
+        return inspect_plugin(plugin_path).description or None
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
 def create_uploaded_file_from_path(path):
     with open(path, "rb") as f:
         content = f.read()
@@ -73,6 +110,58 @@ def create_uploaded_file_from_path(path):
     return bytes_io
 
 
+def get_chat(uploaded_file):
+    """
+    Колонки чата: из памяти сессии, из дискового кэша по хэшу содержимого
+    или потоковым парсингом (с прогрессом в боковой панели).
+    """
+    # Повторный запуск скрипта с тем же файлом: даже хэш не пересчитываем
+    upload_id = getattr(uploaded_file, "file_id", None) or content_hash(uploaded_file)
+    cached = st.session_state.get("chat_store")
+    if cached is not None and cached[0] == upload_id:
+        return cached[1]
+
+    progress_bar = st.sidebar.progress(0.0, text="Загрузка чата...")
+    try:
+        chat = chat_cache.load(
+            uploaded_file,
+            progress=lambda done: progress_bar.progress(
+                done, text=f"Загрузка чата... {done:.0%}"
+            ),
+        )
+    finally:
+        progress_bar.empty()
+
+    st.session_state.chat_store = (upload_id, chat)
+    return chat
+
+
+def select_period(chat):
+    """
+    Период анализа в боковой панели. Возвращает окно чата за выбранные
+    даты (виды на те же колонки, без копий) или сам чат, если выбран
+    весь период.
+    """
+    if not chat.n_dated:
+        return chat
+    first = chat.days[0].astype(object)
+    last = chat.days[chat.n_dated - 1].astype(object)
+    period = st.sidebar.date_input(
+        "Период",
+        value=(first, last),
+        min_value=first,
+        max_value=last,
+        key="period",
+    )
+    # Пока выбрана только первая дата диапазона, фильтр не применяем
+    if not isinstance(period, (tuple, list)) or len(period) != 2:
+        return chat
+    start, end = period
+    if (start, end) == (first, last):
+        return chat
+    return chat.window(*chat.rows_between(start, end))
+
+
 st.set_page_config(page_title="Chat Analyzer", layout="wide")
 
 # Sidebar: Load Chats
@@ -146,7 +235,9 @@ for category_name, category_data in PLUGIN_CATEGORIES.items():
             # Default to False (disabled)
             default_value = st.session_state.selected_plugins.get(key, False)
 
-            if st.checkbox(label, value=default_value, key=f"cb_{key}"):
+            if st.checkbox(
+                label, value=default_value, key=f"cb_{key}", help=plugin_help(plugin_path)
+            ):
                 st.session_state.selected_plugins[key] = True
                 selected_plugin_paths.append(plugin_path)
             else:
@@ -166,11 +257,20 @@ with st.sidebar.expander("📎 Свои плагины"):
     if not uploaded_plugins:
         uploaded_plugins = []
 
+# Import selected plugins in the background while the chat is uploaded and parsed
+cold_plugins = [
+    path for path in selected_plugin_paths if get_module_name_from_path(path) not in sys.modules
+]
+if cold_plugins:
+    warm_up(cold_plugins, get_module_name_from_path)
+
 # Chat selection
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 💬 Чаты")
 selected_file = None
 data = None
+chat = None
+full_chat = None
 
 if uploaded_chats:
     file_names = [file.name for file in uploaded_chats]
@@ -183,7 +283,9 @@ if uploaded_chats:
 
     if selected_file:
         try:
-            data = json.load(selected_file)
+            full_chat = get_chat(selected_file)
+            chat = select_period(full_chat)
+            data = chat.as_data()
         except Exception as e:
             st.sidebar.error(f"Ошибка загрузки JSON: {e}")
 else:
@@ -217,47 +319,177 @@ else:
         st.markdown(video_html, unsafe_allow_html=True)
 
 
-def get_module_name_from_path(plugin_path: str) -> str:
-    plugin_name = os.path.basename(plugin_path).replace(".py", "")
-    plugin_hash = hashlib.md5(plugin_path.encode()).hexdigest()[:8]
-    return f"plugin_{plugin_name}_{plugin_hash}"
+def accepts_chat(func) -> bool:
+    """Плагин может принять вторым аргументом колоночное хранилище чата"""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    positional = [
+        p
+        for p in params
+        if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.VAR_POSITIONAL)
+    ]
+    return len(positional) >= 2 or any(p.kind == p.VAR_POSITIONAL for p in positional)
 
 
-def load_and_run_plugin(plugin_path: str, data, function_name="run_plugin"):
-    module_name = get_module_name_from_path(plugin_path)
+def load_plugin_module(plugin_path: str):
+    try:
+        return import_plugin(plugin_path, get_module_name_from_path(plugin_path))
+    except Exception as e:
+        st.error(f"Ошибка загрузки модуля: {e}")
+        return None
 
-    if module_name in sys.modules:
-        plugin_module = sys.modules[module_name]
-    else:
-        spec = importlib.util.spec_from_file_location(module_name, plugin_path)
-        if spec is None:
-            st.error("Не удалось создать спецификацию плагина.")
-            return
-        plugin_module = importlib.util.module_from_spec(spec)
-        sys.modules[module_name] = plugin_module
+
+def is_scan_plugin(plugin_module, chat) -> bool:
+    """Плагин умеет работать в общем проходе по сообщениям"""
+    return chat is not None and hasattr(plugin_module, SCAN_FUNCTION)
+
+
+def load_and_run_plugin(plugin_path: str, data, function_name="run_plugin", chat=None):
+    plugin_module = load_plugin_module(plugin_path)
+    if plugin_module is None:
+        return
+
+    if function_name == "run_plugin" and chat is not None and is_compute_plugin(plugin_module):
+        try:
+            args = compute_args(plugin_module, chat)
+            result = memoize(chat, compute_function(plugin_module), *args)
+            render_result(plugin_module, data, chat, result)
+        except Exception as e:
+            st.error(f"Ошибка плагина: {e}")
+        return
+
+    if function_name == "run_plugin" and is_scan_plugin(plugin_module, chat):
         try:
-            spec.loader.exec_module(plugin_module)
+            run_scan(getattr(plugin_module, SCAN_FUNCTION)(data, chat), chat)
         except Exception as e:
-            st.error(f"Ошибка загрузки модуля: {e}")
-            return
+            st.error(f"Ошибка плагина: {e}")
+        return
 
     if hasattr(plugin_module, function_name):
         func = getattr(plugin_module, function_name)
         try:
-            func(data)
+            if chat is not None and accepts_chat(func):
+                func(data, chat)
+            else:
+                func(data)
         except Exception as e:
             st.error(f"Ошибка плагина: {e}")
     else:
         st.error(f"Функция {function_name} не найдена в плагине")
 
 
+def declared_datasets(plugin_paths) -> list:
+    """Производные наборы из DATASETS плагинов (без импорта)"""
+    names = []
+    for plugin_path in plugin_paths:
+        try:
+            names.extend(inspect_plugin(plugin_path).datasets)
+        except (OSError, SyntaxError, ValueError):
+            pass
+    return names
+
+
+def run_plugins(plugins, data, chat=None, pool=None):
+    """
+    Запускает плагины [(заголовок, путь)] в своих секциях, сохраняя порядок.
+
+    Расчёт разделённых плагинов (compute_plugin или compute из API v2
+    после его виджетов controls) сразу уходит в пул процессов (без пула —
+    считается здесь же). Обычные плагины выполняются сразу.
+    Производные наборы (DATASETS) всех плагинов считаются в фоновых
+    потоках по графу зависимостей, каждый один раз на чат.
+    У scan-плагинов сначала выполняется подготовка, затем все они
+    получают сообщения за один общий проход. После этого scan-плагины
+    и разделённые плагины по порядку отрисовывают результат.
+    """
+    sections = [(st.expander(title, expanded=True), path) for title, path in plugins]
+
+    modules = {}
+    for index, (section, plugin_path) in enumerate(sections):
+        with section:
+            modules[index] = load_plugin_module(plugin_path)
+
+    # После импорта: лексиконы плагинов уже зарегистрированы для общего прохода
+    if chat is not None:
+        prepare_datasets(chat, declared_datasets(path for _, path in plugins))
+
+    # Расчёты в пуле идут параллельно со всем остальным; уже посчитанные
+    # для этого чата и этой версии плагина берутся из памяти
+    computed = {}
+    if chat is not None:
+        for index, plugin_module in modules.items():
+            if plugin_module is not None and is_compute_plugin(plugin_module):
+                # Виджеты плагина API v2 (controls) рисуются в его секции до расчёта
+                with sections[index][0]:
+                    try:
+                        args = compute_args(plugin_module, chat)
+                    except Exception as e:
+                        st.error(f"Ошибка плагина: {e}")
+                        modules[index] = None
+                        continue
+                if pool is None:
+                    submit = partial(compute_inline, plugin_module, chat, *args)
+                else:
+                    submit = partial(pool.submit, sections[index][1], plugin_module, chat, *args)
+                computed[index] = memoize_future(
+                    chat, compute_function(plugin_module), submit, *args
+                )
+
+    scans = {}
+    for index, (section, plugin_path) in enumerate(sections):
+        plugin_module = modules[index]
+        if plugin_module is None or index in computed:
+            continue
+        with section:
+            if not is_scan_plugin(plugin_module, chat):
+                load_and_run_plugin(plugin_path, data, chat=chat)
+                continue
+            try:
+                scan = getattr(plugin_module, SCAN_FUNCTION)(data, chat)
+            except Exception as e:
+                st.error(f"Ошибка плагина: {e}")
+                continue
+            if scan is not None:
+                scans[index] = scan
+
+    errors = {}
+    if scans:
+        handler_index = {id(scan.on_message): index for index, scan in scans.items()}
+
+        def on_error(handler, exc):
+            errors[handler_index[id(handler)]] = exc
+
+        with st.spinner("Анализируем сообщения..."):
+            scan_messages(chat, [scan.on_message for scan in scans.values()], on_error)
+
+    for index in sorted({*scans, *computed}):
+        with sections[index][0]:
+            if index in errors:
+                st.error(f"Ошибка плагина: {errors[index]}")
+                continue
+            try:
+                if index in scans:
+                    scans[index].render()
+                else:
+                    with st.spinner("Считаем..."):
+                        result = computed[index].result()
+                    render_result(modules[index], data, chat, result)
+            except Exception as e:
+                st.error(f"Ошибка плагина: {e}")
+
+
 # Run selected plugins
 if data:
     # Show chat info
     chat_name = data.get("name", "Неизвестный чат")
     messages_count = len(data.get("messages", []))
     st.title(f"📊 {chat_name}")
-    st.caption(f"Всего сообщений: {messages_count}")
+    if chat is full_chat:
+        st.caption(f"Всего сообщений: {messages_count}")
+    else:
+        st.caption(f"Сообщений за период: {messages_count} из {len(full_chat)}")
 
     # Count selected plugins
     total_selected = len(selected_plugin_paths) + len(uploaded_plugins)
@@ -268,7 +500,9 @@ if data:
         st.markdown(f"**Выбрано плагинов: {total_selected}**")
         st.markdown("---")
 
-        # Run predefined plugins
+        plugins = []
+
+        # Predefined plugins
         for plugin_path in selected_plugin_paths:
             plugin_name = (
                 os.path.basename(plugin_path)
@@ -276,16 +510,17 @@ if data:
                 .replace("_", " ")
                 .title()
             )
-            with st.expander(f"📊 {plugin_name}", expanded=True):
-                load_and_run_plugin(plugin_path, data)
+            plugins.append((f"📊 {plugin_name}", plugin_path))
 
-        # Run custom uploaded plugins
+        # Custom uploaded plugins
         for plugin in uploaded_plugins:
             with tempfile.NamedTemporaryFile(delete=False, suffix=".py") as tmp_file:
                 tmp_file.write(plugin.read())
                 tmp_file_path = tmp_file.name
-            with st.expander(f"📎 {plugin.name}", expanded=True):
-                load_and_run_plugin(tmp_file_path, data)
+            plugins.append((f"📎 {plugin.name}", tmp_file_path))
+
+        # Scan plugins share one pass, compute plugins run in the process pool
+        run_plugins(plugins, data, chat=chat, pool=get_plugin_pool())
 
 elif uploaded_chats:
     st.info("Выберите чат из списка")
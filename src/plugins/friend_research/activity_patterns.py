@@ -3,8 +3,6 @@ Activity Patterns Analyzer
 Анализирует паттерны активности: когда кто пишет,
 какие дни недели самые активные, ночные совы vs жаворонки.
 """
-from collections import defaultdict
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -24,11 +22,7 @@ def get_text(msg):
     return str(text) if text else ''
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -39,26 +33,19 @@ def run_plugin(data):
     st.subheader(f"📈 Паттерны Активности — {chat_name}")
     st.markdown("Когда участники наиболее активны")
     
-    # Статистика
-    user_hourly = defaultdict(lambda: [0] * 24)
-    user_daily = defaultdict(lambda: [0] * 7)  # Пн-Вс
-    hourly_total = [0] * 24
-    daily_total = [0] * 7
-    
-    for msg in messages:
-        try:
-            dt = parse_date(msg['date'])
-            sender = msg.get('from')
-            if sender:
-                hour = dt.hour
-                weekday = dt.weekday()
-                
-                user_hourly[sender][hour] += 1
-                user_daily[sender][weekday] += 1
-                hourly_total[hour] += 1
-                daily_total[weekday] += 1
-        except:
-            continue
+    # Часы и дни недели — из общего куба отправитель × день
+    cube = chat.cube
+    hour_matrix = cube.hourly.between(0, cube.n_days)
+    day_matrix = cube.rollup(cube.messages, 'weekday').values  # Пн-Вс
+    user_hourly = {}
+    user_daily = {}
+    for index, code in enumerate(cube.senders):
+        if hour_matrix[index].any():
+            user = chat.users[code]
+            user_hourly[user] = hour_matrix[index].tolist()
+            user_daily[user] = day_matrix[code].tolist()
+    hourly_total = hour_matrix.sum(axis=0).tolist()
+    daily_total = day_matrix.sum(axis=0).tolist()
     
     users = list(user_hourly.keys())
     
@@ -99,16 +86,7 @@ def run_plugin(data):
     st.markdown("### 🗓️ Тепловая карта: часы × дни")
     
     # Собираем данные для heatmap
-    heatmap_data = [[0] * 24 for _ in range(7)]
-    
-    for msg in messages:
-        try:
-            dt = parse_date(msg['date'])
-            hour = dt.hour
-            weekday = dt.weekday()
-            heatmap_data[weekday][hour] += 1
-        except:
-            continue
+    heatmap_data = cube.weekday_hourly.between(0, cube.n_days)
     
     fig3, ax3 = plt.subplots(figsize=(14, 6))
     
@@ -4,29 +4,13 @@ Contribution Score Analyzer
 Учитывает количество, качество, полезность сообщений.
 """
 from collections import defaultdict
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import re
 
-
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+from tgchatsanalyzer.mapreduce import map_reduce
 
 
 # Маркеры полезного контента
@@ -49,97 +33,100 @@ HUMOR_MARKERS = {
 }
 
 
-def run_plugin(data):
-    messages = data.get("messages", [])
-    chat_name = data.get("name", "Chat")
-    
-    if not messages:
-        st.warning("Нет сообщений для анализа.")
-        return
-    
-    st.subheader(f"🏆 Вклад в Общение — {chat_name}")
-    st.markdown("Оценка полезности и активности каждого участника")
-    
-    # Карта ID -> отправитель для подсчёта реакций
-    id_to_sender = {}
-    for msg in messages:
-        msg_id = msg.get('id')
-        sender = msg.get('from')
-        if msg_id and sender:
-            id_to_sender[msg_id] = sender
-    
-    # Статистика
-    user_stats = defaultdict(lambda: {
-        'messages': 0,
-        'chars': 0,
-        'words': 0,
-        'links': 0,
-        'questions': 0,
-        'answers': 0,  # Ответы на чужие сообщения
-        'humor': 0,
-        'media': 0,  # Фото, видео, файлы
-        'reactions_received': 0,
-        'replies_received': 0,
-        'stickers': 0,
-        'voice': 0,
-        'useful': 0,  # Полезный контент
-    })
+# Счётчики участника (порядок — как в таблицах ниже)
+STAT_FIELDS = (
+    'messages', 'chars', 'words', 'links', 'questions',
+    'answers',  # Ответы на чужие сообщения
+    'humor',
+    'media',  # Фото, видео, файлы
+    'reactions_received', 'replies_received', 'stickers', 'voice',
+    'useful',  # Полезный контент
+)
+
+
+def score_chunk(chat, lo, hi):
+    """Счётчики участников по строкам [lo, hi) (для map_reduce)"""
+    user_stats = {}
     
-    # Подсчёт ответов на сообщения
-    reply_counts = defaultdict(int)
+    users = chat.users
+    names = chat.media_type_names
+    sticker = names.index('sticker') if 'sticker' in names else -2
+    voice = names.index('voice_message') if 'voice_message' in names else -2
     
-    for msg in messages:
-        sender = msg.get('from')
-        if not sender:
+    columns = zip(
+        chat.senders[lo:hi].tolist(),
+        chat.texts[lo:hi],
+        (chat.has_photo[lo:hi] | chat.has_file[lo:hi]).tolist(),
+        chat.media_types[lo:hi].tolist(),
+        chat.reaction_counts[lo:hi].tolist(),
+    )
+    for code, text, has_media, media_type, reactions in columns:
+        if code < 0:
             continue
         
-        text = get_text(msg)
+        stats = user_stats.get(users[code])
+        if stats is None:
+            stats = user_stats[users[code]] = dict.fromkeys(STAT_FIELDS, 0)
+        
         text_lower = text.lower()
         
-        user_stats[sender]['messages'] += 1
-        user_stats[sender]['chars'] += len(text)
-        user_stats[sender]['words'] += len(text.split())
+        stats['messages'] += 1
+        stats['chars'] += len(text)
+        stats['words'] += len(text.split())
         
         # Ссылки
         if re.search(r'https?://', text):
-            user_stats[sender]['links'] += 1
+            stats['links'] += 1
         
         # Вопросы
         if '?' in text or any(m in text_lower for m in ['подскажите', 'помогите', 'знает кто']):
-            user_stats[sender]['questions'] += 1
+            stats['questions'] += 1
         
         # Юмор
         if any(m in text_lower for m in HUMOR_MARKERS):
-            user_stats[sender]['humor'] += 1
+            stats['humor'] += 1
         
         # Полезный контент
         if any(m in text_lower for m in USEFUL_MARKERS):
-            user_stats[sender]['useful'] += 1
+            stats['useful'] += 1
         
         # Медиа
-        if msg.get('photo') or msg.get('file'):
-            user_stats[sender]['media'] += 1
+        if has_media:
+            stats['media'] += 1
         
         # Стикеры
-        if msg.get('media_type') == 'sticker':
-            user_stats[sender]['stickers'] += 1
+        if media_type == sticker:
+            stats['stickers'] += 1
         
         # Голосовые
-        if msg.get('media_type') == 'voice_message':
-            user_stats[sender]['voice'] += 1
-        
-        # Ответы
-        reply_to = msg.get('reply_to_message_id')
-        if reply_to and reply_to in id_to_sender:
-            replied_to = id_to_sender[reply_to]
-            if replied_to != sender:
-                user_stats[sender]['answers'] += 1
-                user_stats[replied_to]['replies_received'] += 1
+        if media_type == voice:
+            stats['voice'] += 1
         
         # Реакции
-        for reaction in msg.get('reactions', []):
-            count = reaction.get('count', 0)
-            user_stats[sender]['reactions_received'] += count
+        stats['reactions_received'] += reactions
+    
+    return user_stats
+
+
+def run_plugin(data, chat):
+    chat_name = data.get("name", "Chat")
+    
+    if not len(chat):
+        st.warning("Нет сообщений для анализа.")
+        return
+    
+    st.subheader(f"🏆 Вклад в Общение — {chat_name}")
+    st.markdown("Оценка полезности и активности каждого участника")
+    
+    # Счётчики по сообщениям считаются по чанкам (в пуле на больших чатах)
+    user_stats = map_reduce(chat, score_chunk)
+    
+    # Ответы на чужие сообщения — из общего графа ответов чата
+    answers, replies_received = chat.reply_graph.sent, chat.reply_graph.received
+    for code in np.flatnonzero(answers + replies_received).tolist():
+        stats = user_stats.setdefault(chat.users[code], dict.fromkeys(STAT_FIELDS, 0))
+        stats['answers'] += int(answers[code])
+        stats['replies_received'] += int(replies_received[code])
     
     users = list(user_stats.keys())
     
@@ -4,35 +4,16 @@ Friendship Balance Analyzer
 Кто с кем больше общается, кто игнорирует кого.
 """
 from collections import defaultdict
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def run_plugin(data):
-    messages = data.get("messages", [])
+def run_plugin(data, chat):
     chat_name = data.get("name", "Chat")
     
-    if not messages:
+    if not len(chat):
         st.warning("Нет сообщений для анализа.")
         return
     
@@ -48,38 +29,29 @@ def run_plugin(data):
         'mentions': defaultdict(int),  # Кого упоминает
     })
     
-    # Карта ID -> отправитель
-    id_to_sender = {}
-    for msg in messages:
-        msg_id = msg.get('id')
-        sender = msg.get('from')
-        if msg_id and sender:
-            id_to_sender[msg_id] = sender
-    
-    for msg in messages:
-        sender = msg.get('from')
-        if not sender:
+    senders = chat.senders.tolist()
+    for sender_code, text_length in zip(senders, chat.text_lengths.tolist()):
+        if sender_code < 0:
             continue
+        sender = chat.users[sender_code]
         
-        text = get_text(msg)
         user_stats[sender]['messages'] += 1
-        user_stats[sender]['chars'] += len(text)
-        
-        # Анализ ответов
-        reply_to_id = msg.get('reply_to_message_id')
-        if reply_to_id and reply_to_id in id_to_sender:
-            replied_to = id_to_sender[reply_to_id]
-            if replied_to != sender:
-                user_stats[sender]['replies_to'][replied_to] += 1
-                user_stats[replied_to]['replies_from'][sender] += 1
-        
-        # Анализ упоминаний (@username)
-        if isinstance(msg.get('text'), list):
-            for part in msg['text']:
-                if isinstance(part, dict) and part.get('type') == 'mention':
-                    mentioned = part.get('text', '').lstrip('@')
-                    if mentioned and mentioned != sender:
-                        user_stats[sender]['mentions'][mentioned] += 1
+        user_stats[sender]['chars'] += text_length
+    
+    # Анализ ответов: граф ответов строится один раз на чат
+    for source, target, count in chat.reply_graph.edges():
+        sender, replied_to = chat.users[source], chat.users[target]
+        user_stats[sender]['replies_to'][replied_to] += count
+        user_stats[replied_to]['replies_from'][sender] += count
+    
+    # Анализ упоминаний (@username)
+    for row, mentioned in zip(chat.mention_rows.tolist(), chat.mention_names):
+        sender_code = senders[row]
+        if sender_code < 0:
+            continue
+        sender = chat.users[sender_code]
+        if mentioned != sender:
+            user_stats[sender]['mentions'][mentioned] += 1
     
     users = list(user_stats.keys())
     
@@ -4,31 +4,14 @@ Group Dynamics Analyzer
 кто уходит/приходит, как меняется атмосфера.
 """
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -39,40 +22,29 @@ def run_plugin(data):
     st.subheader(f"👥 Динамика Группы — {chat_name}")
     st.markdown("Как группа развивается со временем")
     
-    # Парсим даты и сортируем
-    messages_parsed = []
-    for msg in messages:
-        try:
-            dt = parse_date(msg['date'])
-            sender = msg.get('from')
-            if sender:
-                messages_parsed.append({
-                    'datetime': dt,
-                    'sender': sender,
-                    'month': dt.strftime('%Y-%m'),
-                    'week': dt.strftime('%Y-W%W'),
-                    'text': get_text(msg)
-                })
-        except:
-            continue
-    
-    if len(messages_parsed) < 10:
+    # Сообщения по отправителям и месяцам из общего куба отправитель × день
+    cube = chat.cube
+    
+    if cube.messages.sum() < 10:
         st.warning("Недостаточно сообщений для анализа.")
         return
     
-    messages_parsed.sort(key=lambda x: x['datetime'])
-    
-    # Статистика по месяцам
-    monthly_stats = defaultdict(lambda: defaultdict(int))
-    monthly_users = defaultdict(set)
+    month_labels, month_counts = cube.rollup(cube.messages, 'month')
+    # Месяцы без сообщений не показываем
+    active_months = np.flatnonzero(month_counts.sum(axis=0) > 0)
+    months = [month_labels[i] for i in active_months]
+    month_counts = month_counts[:, active_months]
     
-    for msg in messages_parsed:
-        month = msg['month']
-        sender = msg['sender']
-        monthly_stats[month][sender] += 1
-        monthly_users[month].add(sender)
+    # Участники в порядке первого сообщения
+    senders = chat.senders[cube.rows]
+    codes, first_rows = np.unique(senders, return_index=True)
+    codes = codes[np.argsort(first_rows, kind='stable')].tolist()
     
-    months = sorted(monthly_stats.keys())
+    monthly_stats = {
+        month: {chat.users[code]: int(month_counts[code, i]) for code in codes if month_counts[code, i]}
+        for i, month in enumerate(months)
+    }
+    monthly_users = {month: set(stats) for month, stats in monthly_stats.items()}
     
     # Общая активность
     st.markdown("### 📈 Активность по месяцам")
@@ -145,16 +117,13 @@ def run_plugin(data):
     # Анализ "ухода" и "прихода"
     st.markdown("### 📊 Появление и уход участников")
     
+    # Первый и последний месяц с сообщениями у каждого участника
     first_seen = {}
     last_seen = {}
-    
-    for msg in messages_parsed:
-        user = msg['sender']
-        month = msg['month']
-        
-        if user not in first_seen:
-            first_seen[user] = month
-        last_seen[user] = month
+    for code in codes:
+        active = np.flatnonzero(month_counts[code] > 0)
+        first_seen[chat.users[code]] = months[active[0]]
+        last_seen[chat.users[code]] = months[active[-1]]
     
     # Новички по месяцам
     newcomers = defaultdict(list)
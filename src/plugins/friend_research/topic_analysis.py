@@ -3,13 +3,14 @@ Topic Analysis
 Анализирует основные темы обсуждений в группе.
 Использует частотный анализ слов и фраз.
 """
-from collections import defaultdict, Counter
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import re
 
+from tgchatsanalyzer.mapreduce import map_reduce
+from tgchatsanalyzer.tokens import token_counts
+
 # Стоп-слова для русского и английского
 STOP_WORDS = {
     # Русские
@@ -47,33 +48,41 @@ TOPIC_CATEGORIES = {
 }
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
+WORD_RE = re.compile(r'\w+')
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+AXES = ('users', 'months')
 
 
 def extract_words(text):
     """Извлекает слова из текста"""
-    # Оставляем только буквы и цифры
-    text = re.sub(r'[^\w\s]', ' ', text.lower())
-    words = text.split()
+    # Слова — последовательности букв и цифр
+    words = WORD_RE.findall(text.lower())
     # Фильтруем короткие и стоп-слова
     return [w for w in words if len(w) > 2 and w not in STOP_WORDS]
 
 
-def run_plugin(data):
+def count_words_chunk(chat, lo, hi):
+    """Частоты слов по строкам [lo, hi): общие, по участникам и по месяцам"""
+    counts = token_counts(len(chat), AXES)
+    
+    month_keys = chat.month_keys
+    users = chat.users
+    texts = chat.texts
+    for row, code in enumerate(chat.senders[lo:hi].tolist(), lo):
+        if code < 0:
+            continue
+        counts.add(extract_words(texts[row]), users=users[code], months=month_keys[row] or None)
+    
+    counts.flush()
+    return counts
+
+
+def compute_plugin(chat):
+    """Частоты слов по всему чату (выполняется в пуле процессов)"""
+    return map_reduce(chat, count_words_chunk)
+
+
+def render_plugin(data, chat, result):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -84,40 +93,16 @@ def run_plugin(data):
     st.subheader(f"💬 Анализ Тем — {chat_name}")
     st.markdown("О чём чаще всего говорят в группе")
     
-    # Собираем все слова
-    all_words = []
-    user_words = defaultdict(list)
-    monthly_words = defaultdict(list)
+    counts = result
     
-    for msg in messages:
-        sender = msg.get('from')
-        if not sender:
-            continue
-        
-        text = get_text(msg)
-        words = extract_words(text)
-        
-        all_words.extend(words)
-        user_words[sender].extend(words)
-        
-        try:
-            dt = parse_date(msg['date'])
-            month = dt.strftime('%Y-%m')
-            monthly_words[month].extend(words)
-        except:
-            pass
-    
-    if not all_words:
+    if not counts.total:
         st.warning("Недостаточно текста для анализа.")
         return
     
-    # Частота слов
-    word_freq = Counter(all_words)
-    
     # Топ слов
     st.markdown("### 🔤 Самые частые слова")
     
-    top_words = word_freq.most_common(30)
+    top_words = counts.most_common(30)
     
     col1, col2 = st.columns(2)
     
@@ -146,7 +131,7 @@ def run_plugin(data):
     
     topic_counts = {}
     for topic, keywords in TOPIC_CATEGORIES.items():
-        count = sum(word_freq.get(kw, 0) for kw in keywords)
+        count = sum(counts.count(kw) for kw in keywords)
         if count > 0:
             topic_counts[topic] = count
     
@@ -157,9 +142,9 @@ def run_plugin(data):
         fig2, ax2 = plt.subplots(figsize=(10, 6))
         
         topics = [t[0] for t in sorted_topics]
-        counts = [t[1] for t in sorted_topics]
+        topic_values = [t[1] for t in sorted_topics]
         
-        bars = ax2.bar(topics, counts, color='coral')
+        bars = ax2.bar(topics, topic_values, color='coral')
         ax2.set_ylabel('Упоминаний')
         ax2.set_title('Популярность тем')
         ax2.tick_params(axis='x', rotation=45)
@@ -171,7 +156,7 @@ def run_plugin(data):
         st.markdown("**Топ-3 темы:**")
         for topic, count in sorted_topics[:3]:
             keywords = TOPIC_CATEGORIES[topic]
-            found_keywords = [(kw, word_freq.get(kw, 0)) for kw in keywords if word_freq.get(kw, 0) > 0]
+            found_keywords = [(kw, counts.count(kw)) for kw in keywords if counts.count(kw) > 0]
             found_keywords.sort(key=lambda x: x[1], reverse=True)
             kw_str = ', '.join(f"{kw} ({c})" for kw, c in found_keywords[:5])
             st.write(f"**{topic}**: {count} упоминаний — {kw_str}")
@@ -181,18 +166,17 @@ def run_plugin(data):
     # Уникальные слова по участникам
     st.markdown("### 👤 Характерные слова участников")
     
-    users = list(user_words.keys())
+    users = counts.labels('users')
+    user_totals = counts.label_totals('users')
     
     # Находим уникальные слова для каждого пользователя
     user_unique = {}
     for user in users:
-        user_freq = Counter(user_words[user])
-        
         # Вычисляем TF-IDF-like метрику
         unique_words = []
-        for word, count in user_freq.most_common(50):
+        for word, count in counts.most_common(50, 'users', user):
             # Сколько пользователей используют это слово
-            users_with_word = sum(1 for u in users if word in user_words[u])
+            users_with_word = counts.spread(word, 'users')
             # Уникальность = частота * (1 / количество пользователей со словом)
             uniqueness = count * (len(users) / users_with_word)
             unique_words.append((word, uniqueness, count))
@@ -201,17 +185,16 @@ def run_plugin(data):
         user_unique[user] = unique_words[:10]
     
     # Показываем топ участников
-    for user in sorted(users, key=lambda u: len(user_words[u]), reverse=True)[:10]:
+    for user in sorted(users, key=lambda u: user_totals.get(u, 0), reverse=True)[:10]:
         if user_unique[user]:
             words_str = ', '.join(f"**{w[0]}** ({w[2]})" for w in user_unique[user][:5])
             st.write(f"👤 **{user}**: {words_str}")
     
     # Динамика тем по месяцам
-    if len(monthly_words) > 3:
+    months = sorted(counts.labels('months'))
+    if len(months) > 3:
         st.markdown("### 📈 Динамика тем по месяцам")
         
-        months = sorted(monthly_words.keys())
-        
         # Выбираем топ-5 тем для отслеживания
         top_topics = sorted_topics[:5] if topic_counts else []
         
@@ -222,8 +205,7 @@ def run_plugin(data):
                 keywords = TOPIC_CATEGORIES[topic]
                 values = []
                 for month in months:
-                    month_freq = Counter(monthly_words[month])
-                    count = sum(month_freq.get(kw, 0) for kw in keywords)
+                    count = sum(counts.count(kw, 'months', month) for kw in keywords)
                     values.append(count)
                 
                 ax3.plot(months, values, marker='o', label=topic, linewidth=2)
@@ -241,15 +223,19 @@ def run_plugin(data):
     st.markdown("### 💡 Интересные факты")
     
     # Самое длинное частое слово
-    long_words = [(w, c) for w, c in word_freq.items() if len(w) > 8 and c > 5]
+    long_words = [(w, c) for w, c in counts.items(min_count=6) if len(w) > 8]
     if long_words:
         longest = max(long_words, key=lambda x: len(x[0]))
         st.info(f"📝 Самое длинное популярное слово: **{longest[0]}** ({longest[1]} раз)")
     
     # Уникальный словарь группы
-    unique_vocab = len(word_freq)
-    total_words = sum(word_freq.values())
-    st.info(f"📚 Словарный запас группы: **{unique_vocab}** уникальных слов из {total_words} общих")
+    unique_vocab = counts.vocabulary_size
+    total_words = counts.total
+    if unique_vocab is not None:
+        st.info(f"📚 Словарный запас группы: **{unique_vocab}** уникальных слов из {total_words} общих")
+    else:
+        # Приближённый режим для очень больших чатов: словарь целиком не хранится
+        st.info(f"📚 Всего слов в группе: **{total_words}** (частоты оценены приближённо)")
     
     # Среднее количество слов на сообщение
     avg_words = total_words / len(messages) if messages else 0
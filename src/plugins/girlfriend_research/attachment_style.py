@@ -6,11 +6,16 @@ Attachment Style Analyzer
 - Надёжный (secure) — баланс близости и автономии
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 # Маркеры тревожного типа привязанности
 ANXIOUS_MARKERS = {
     # Страх потери
@@ -91,37 +96,16 @@ SECURE_MARKERS = {
 }
 
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+STYLES = {
+    '😰 Тревожный': ANXIOUS_MARKERS,
+    '🧊 Избегающий': AVOIDANT_MARKERS,
+    '💚 Надёжный': SECURE_MARKERS,
+}
 
-def count_markers(text, markers):
-    """Считает маркеры в тексте"""
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
+LEXICON = register_lexicon(Lexicon(STYLES))
 
 
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -141,11 +125,7 @@ def run_plugin(data):
     ⚠️ Это упрощённый анализ, не диагноз. Для точного определения нужен психолог.
     """)
     
-    styles = {
-        '😰 Тревожный': ANXIOUS_MARKERS,
-        '🧊 Избегающий': AVOIDANT_MARKERS,
-        '💚 Надёжный': SECURE_MARKERS,
-    }
+    styles = STYLES
     
     # Статистика
     user_stats = defaultdict(lambda: {
@@ -155,33 +135,38 @@ def run_plugin(data):
     
     monthly_stats = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
     
-    for msg in messages:
-        sender = msg.get('from')
+    month_keys = chat.month_keys
+    
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
             
-        text = get_text(msg)
         if not text or len(text) < 3:
-            continue
+            return
         
         user_stats[sender]['total_messages'] += 1
         
-        for style_name, markers in styles.items():
-            count, found = count_markers(text, markers)
-            if count > 0:
-                user_stats[sender]['styles'][style_name]['count'] += count
-                if len(user_stats[sender]['styles'][style_name]['examples']) < 5:
-                    user_stats[sender]['styles'][style_name]['examples'].append({
-                        'text': text[:100],
-                        'markers': found
-                    })
-                
-                try:
-                    dt = parse_date(msg['date'])
-                    monthly_stats[dt.strftime('%Y-%m')][sender][style_name] += count
-                except:
-                    pass
+        for style_name, found in features.hits(row).items():
+            count = len(found)
+            user_stats[sender]['styles'][style_name]['count'] += count
+            if len(user_stats[sender]['styles'][style_name]['examples']) < 5:
+                user_stats[sender]['styles'][style_name]['examples'].append({
+                    'text': text[:100],
+                    'markers': found
+                })
+            
+            month = month_keys[row]
+            if month:
+                monthly_stats[month][sender][style_name] += count
     
+    return Scan(on_message, partial(render_results, styles, user_stats))
+
+
+def render_results(styles, user_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.warning("Не удалось проанализировать сообщения.")
         return
@@ -4,11 +4,16 @@ Complaint Meter
 Помогает понять энергетический баланс в общении.
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 # Жалобы на жизнь, усталость
 LIFE_COMPLAINTS = {
     'устал', 'устала', 'задолбал', 'задолбала', 'достало', 'надоело',
@@ -76,37 +81,19 @@ WHINING_MARKERS = {
 }
 
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+CATEGORIES = {
+    '😫 Усталость/Жизнь': LIFE_COMPLAINTS,
+    '💼 Работа/Учёба': WORK_COMPLAINTS,
+    '🤒 Здоровье': HEALTH_COMPLAINTS,
+    '👥 Люди': PEOPLE_COMPLAINTS,
+    '🌧️ Внешние факторы': EXTERNAL_COMPLAINTS,
+    '😭 Общее нытьё': WHINING_MARKERS,
+}
 
-def count_markers(text, markers):
-    """Считает маркеры в тексте"""
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
+LEXICON = register_lexicon(Lexicon(CATEGORIES))
 
 
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -121,14 +108,7 @@ def run_plugin(data):
     Жаловаться — нормально, но постоянное нытьё может истощать партнёра.
     """)
     
-    categories = {
-        '😫 Усталость/Жизнь': LIFE_COMPLAINTS,
-        '💼 Работа/Учёба': WORK_COMPLAINTS,
-        '🤒 Здоровье': HEALTH_COMPLAINTS,
-        '👥 Люди': PEOPLE_COMPLAINTS,
-        '🌧️ Внешние факторы': EXTERNAL_COMPLAINTS,
-        '😭 Общее нытьё': WHINING_MARKERS,
-    }
+    categories = CATEGORIES
     
     # Собираем статистику
     user_stats = defaultdict(lambda: {
@@ -140,39 +120,44 @@ def run_plugin(data):
     monthly_stats = defaultdict(lambda: defaultdict(int))
     daily_stats = defaultdict(lambda: defaultdict(int))
     
-    for msg in messages:
-        sender = msg.get('from')
+    month_keys = chat.month_keys
+    day_keys = chat.day_keys
+    
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
             
-        text = get_text(msg)
         if not text or len(text) < 2:
-            continue
+            return
         
         user_stats[sender]['total_messages'] += 1
         
         is_complaint = False
-        for cat_name, markers in categories.items():
-            count, found = count_markers(text, markers)
-            if count > 0:
-                is_complaint = True
-                user_stats[sender]['categories'][cat_name]['count'] += count
-                if len(user_stats[sender]['categories'][cat_name]['examples']) < 5:
-                    user_stats[sender]['categories'][cat_name]['examples'].append({
-                        'text': text[:100],
-                        'markers': found
-                    })
+        for cat_name, found in features.hits(row).items():
+            count = len(found)
+            is_complaint = True
+            user_stats[sender]['categories'][cat_name]['count'] += count
+            if len(user_stats[sender]['categories'][cat_name]['examples']) < 5:
+                user_stats[sender]['categories'][cat_name]['examples'].append({
+                    'text': text[:100],
+                    'markers': found
+                })
         
         if is_complaint:
             user_stats[sender]['complaint_messages'] += 1
             
-            try:
-                dt = parse_date(msg['date'])
-                monthly_stats[dt.strftime('%Y-%m')][sender] += 1
-                daily_stats[dt.strftime('%Y-%m-%d')][sender] += 1
-            except:
-                pass
+            if month_keys[row]:
+                monthly_stats[month_keys[row]][sender] += 1
+                daily_stats[day_keys[row]][sender] += 1
     
+    return Scan(on_message, partial(render_results, categories, user_stats, monthly_stats))
+
+
+def render_results(categories, user_stats, monthly_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.warning("Не удалось проанализировать сообщения.")
         return
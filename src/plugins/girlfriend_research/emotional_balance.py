@@ -4,11 +4,16 @@ Emotional Balance Analyzer
 Помогает понять общий эмоциональный фон общения
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 # Расширенные словари для русского и английского
 POSITIVE_MARKERS = {
     # Русские
@@ -95,37 +100,15 @@ MANIPULATION_MARKERS = {
 }
 
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def count_markers(text, markers):
-    """Считает количество маркеров в тексте"""
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
-
+LEXICON = register_lexicon(Lexicon({
+    'positive': POSITIVE_MARKERS,
+    'negative': NEGATIVE_MARKERS,
+    'insecurity': INSECURITY_MARKERS,
+    'manipulation': MANIPULATION_MARKERS,
+}))
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
 
-
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -146,22 +129,28 @@ def run_plugin(data):
     # Статистика по месяцам для графика динамики
     monthly_stats = defaultdict(lambda: defaultdict(lambda: {'positive': 0, 'negative': 0}))
     
-    for msg in messages:
-        sender = msg.get('from')
+    month_keys = chat.month_keys
+    
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
             
-        text = get_text(msg)
         if not text or len(text) < 2:
-            continue
+            return
         
         user_stats[sender]['total_messages'] += 1
         
         # Считаем маркеры
-        pos_count, pos_found = count_markers(text, POSITIVE_MARKERS)
-        neg_count, neg_found = count_markers(text, NEGATIVE_MARKERS)
-        ins_count, ins_found = count_markers(text, INSECURITY_MARKERS)
-        man_count, man_found = count_markers(text, MANIPULATION_MARKERS)
+        hits = features.hits(row)
+        pos_found = hits.get('positive', [])
+        neg_found = hits.get('negative', [])
+        ins_found = hits.get('insecurity', [])
+        man_found = hits.get('manipulation', [])
+        pos_count, neg_count = len(pos_found), len(neg_found)
+        ins_count, man_count = len(ins_found), len(man_found)
         
         user_stats[sender]['positive'] += pos_count
         user_stats[sender]['negative'] += neg_count
@@ -179,14 +168,16 @@ def run_plugin(data):
             user_stats[sender]['manipulation_examples'].append((text[:100], man_found))
         
         # Статистика по месяцам
-        try:
-            dt = parse_date(msg['date'])
-            month_key = dt.strftime('%Y-%m')
+        month_key = month_keys[row]
+        if month_key:
             monthly_stats[month_key][sender]['positive'] += pos_count
             monthly_stats[month_key][sender]['negative'] += neg_count
-        except:
-            pass
     
+    return Scan(on_message, partial(render_results, user_stats, monthly_stats))
+
+
+def render_results(user_stats, monthly_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.warning("Не удалось проанализировать сообщения.")
         return
@@ -4,27 +4,24 @@ Initiative Ratio Analyzer
 Важный индикатор заинтересованности в общении
 """
 from collections import defaultdict
-from datetime import datetime, timedelta
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from tgchatsanalyzer.datasets import get_dataset
+
 # Порог паузы для определения "нового разговора" (в часах)
 DEFAULT_PAUSE_THRESHOLD = 4
 
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+PARAMS = {'pause_hours': DEFAULT_PAUSE_THRESHOLD}
+DATASETS = ("sessions@4h",)
 
 
-def run_plugin(data):
-    messages = data.get("messages", [])
-    chat_name = data.get("name", "Chat")
-    
-    if not messages:
-        st.warning("Нет сообщений для анализа.")
-        return
+def controls(chat):
+    if not len(chat):
+        return {}
     
+    chat_name = chat.info.get("name", "Chat")
     st.subheader(f"💬 Инициатива в Общении — {chat_name}")
     st.markdown("Кто чаще начинает разговор после пауз? Это показатель заинтересованности.")
     
@@ -34,33 +31,21 @@ def run_plugin(data):
         min_value=1, max_value=24, value=DEFAULT_PAUSE_THRESHOLD,
         help="Если между сообщениями прошло больше этого времени — считаем что начался новый разговор"
     )
-    pause_threshold = timedelta(hours=pause_hours)
-    
-    # Сортируем и парсим даты
-    messages_sorted = []
-    for msg in messages:
-        try:
-            dt = parse_date(msg["date"])
-            sender = msg.get("from")
-            if sender:
-                messages_sorted.append({
-                    'datetime': dt,
-                    'sender': sender,
-                    'date': dt.date()
-                })
-        except:
-            continue
-    
-    messages_sorted.sort(key=lambda x: x['datetime'])
+    return {'pause_hours': pause_hours}
+
+
+def compute(chat, params):
+    """Кто начинает разговоры после паузы: всего, по времени суток и по месяцам"""
+    pause_hours = params['pause_hours']
+    # Сообщения с датой и отправителем, разбиение по паузе — общий набор на порог
+    timeline = get_dataset(chat, "timeline")
+    if len(timeline) < 2:
+        return None
     
-    if len(messages_sorted) < 2:
-        st.warning("Недостаточно сообщений для анализа.")
-        return
+    sessions = get_dataset(chat, f"sessions@{pause_hours}h")
     
     # Анализируем кто начинает разговоры
     conversation_starters = defaultdict(int)
-    morning_starters = defaultdict(int)  # Кто пишет первым утром (6-12)
-    evening_starters = defaultdict(int)  # Кто пишет первым вечером (18-24)
     
     # Статистика по времени суток
     time_of_day_initiative = defaultdict(lambda: defaultdict(int))
@@ -68,35 +53,51 @@ def run_plugin(data):
     # Статистика по месяцам
     monthly_initiative = defaultdict(lambda: defaultdict(int))
     
-    prev_msg = messages_sorted[0]
-    conversation_starters[prev_msg['sender']] += 1  # Первое сообщение — начало разговора
+    rows = timeline.rows[sessions.starts]
+    starters = timeline.senders[sessions.starts].tolist()
+    hours = chat.hours[rows].tolist()
+    month_keys = chat.month_keys
     
-    for msg in messages_sorted[1:]:
-        time_diff = msg['datetime'] - prev_msg['datetime']
+    # Первое сообщение — начало разговора, но в разбивки по времени не входит
+    conversation_starters[chat.users[starters[0]]] += 1
+    
+    for row, code, hour in zip(rows[1:].tolist(), starters[1:], hours[1:]):
+        starter = chat.users[code]
+        conversation_starters[starter] += 1
         
-        if time_diff >= pause_threshold:
-            # Новый разговор начался
-            starter = msg['sender']
-            conversation_starters[starter] += 1
-            
-            # Время суток
-            hour = msg['datetime'].hour
-            if 6 <= hour < 12:
-                morning_starters[starter] += 1
-                time_of_day_initiative['Утро (6-12)'][starter] += 1
-            elif 12 <= hour < 18:
-                time_of_day_initiative['День (12-18)'][starter] += 1
-            elif 18 <= hour < 24:
-                evening_starters[starter] += 1
-                time_of_day_initiative['Вечер (18-24)'][starter] += 1
-            else:
-                time_of_day_initiative['Ночь (0-6)'][starter] += 1
-            
-            # По месяцам
-            month_key = msg['datetime'].strftime('%Y-%m')
-            monthly_initiative[month_key][starter] += 1
+        # Время суток
+        if 6 <= hour < 12:
+            time_of_day_initiative['Утро (6-12)'][starter] += 1
+        elif 12 <= hour < 18:
+            time_of_day_initiative['День (12-18)'][starter] += 1
+        elif 18 <= hour < 24:
+            time_of_day_initiative['Вечер (18-24)'][starter] += 1
+        else:
+            time_of_day_initiative['Ночь (0-6)'][starter] += 1
         
-        prev_msg = msg
+        # По месяцам
+        monthly_initiative[month_keys[row]][starter] += 1
+    
+    span = int(timeline.timestamps[-1] - timeline.timestamps[0])
+    return {
+        'starters': dict(conversation_starters),
+        'time_of_day': dict(time_of_day_initiative),
+        'monthly': dict(monthly_initiative),
+        'days': span // 86400 + 1,
+        'pause_hours': pause_hours,
+    }
+
+
+def render(result):
+    # Расчёт запоминается по значению слайдера и доступен другим плагинам
+    if result is None:
+        st.warning("Недостаточно сообщений для анализа.")
+        return
+    
+    pause_hours = result['pause_hours']
+    conversation_starters = result['starters']
+    time_of_day_initiative = result['time_of_day']
+    monthly_initiative = result['monthly']
     
     if not conversation_starters:
         st.warning("Не удалось определить начала разговоров.")
@@ -254,10 +255,9 @@ def run_plugin(data):
         st.metric("Всего разговоров", total_conversations)
     
     with col2:
-        if len(messages_sorted) > 0:
-            days = (messages_sorted[-1]['datetime'] - messages_sorted[0]['datetime']).days + 1
-            avg_per_day = total_conversations / days if days > 0 else 0
-            st.metric("Разговоров в день (среднее)", f"{avg_per_day:.1f}")
+        days = result['days']
+        avg_per_day = total_conversations / days if days > 0 else 0
+        st.metric("Разговоров в день (среднее)", f"{avg_per_day:.1f}")
     
     with col3:
         if len(users) == 2:
@@ -4,12 +4,17 @@ Interest Reciprocity Analyzer
 Кто чаще спрашивает о делах, планах, чувствах.
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import re
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 # Вопросы о жизни/делах
 LIFE_QUESTIONS = {
     'как дела', 'как ты', 'как день', 'как прошёл день', 'как твой день',
@@ -67,34 +72,16 @@ REMEMBERING_MARKERS = {
 }
 
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+CATEGORIES = {
+    '🌅 Жизнь/Дела': LIFE_QUESTIONS,
+    '💼 Работа/Учёба': WORK_QUESTIONS,
+    '📅 Планы': PLANS_QUESTIONS,
+    '💭 Чувства/Здоровье': FEELINGS_QUESTIONS,
+    '🤔 Мнение': OPINION_QUESTIONS,
+    '🧠 Память': REMEMBERING_MARKERS,
+}
 
-def count_markers(text, markers):
-    """Считает маркеры в тексте"""
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
+LEXICON = register_lexicon(Lexicon(CATEGORIES))
 
 
 def count_questions(text):
@@ -102,7 +89,7 @@ def count_questions(text):
     return len(re.findall(r'\?', text))
 
 
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -117,14 +104,7 @@ def run_plugin(data):
     Вопросы — это проявление интереса. В здоровых отношениях оба спрашивают друг друга.
     """)
     
-    categories = {
-        '🌅 Жизнь/Дела': LIFE_QUESTIONS,
-        '💼 Работа/Учёба': WORK_QUESTIONS,
-        '📅 Планы': PLANS_QUESTIONS,
-        '💭 Чувства/Здоровье': FEELINGS_QUESTIONS,
-        '🤔 Мнение': OPINION_QUESTIONS,
-        '🧠 Память': REMEMBERING_MARKERS,
-    }
+    categories = CATEGORIES
     
     # Статистика
     user_stats = defaultdict(lambda: {
@@ -136,38 +116,42 @@ def run_plugin(data):
     
     monthly_stats = defaultdict(lambda: defaultdict(int))
     
-    for msg in messages:
-        sender = msg.get('from')
+    month_keys = chat.month_keys
+    
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
             
-        text = get_text(msg)
         if not text:
-            continue
+            return
         
         user_stats[sender]['total_messages'] += 1
         user_stats[sender]['total_questions'] += count_questions(text)
         
         has_interest = False
-        for cat_name, markers in categories.items():
-            count, found = count_markers(text, markers)
-            if count > 0:
-                has_interest = True
-                user_stats[sender]['categories'][cat_name]['count'] += count
-                if len(user_stats[sender]['categories'][cat_name]['examples']) < 5:
-                    user_stats[sender]['categories'][cat_name]['examples'].append({
-                        'text': text[:100],
-                        'markers': found
-                    })
+        for cat_name, found in features.hits(row).items():
+            count = len(found)
+            has_interest = True
+            user_stats[sender]['categories'][cat_name]['count'] += count
+            if len(user_stats[sender]['categories'][cat_name]['examples']) < 5:
+                user_stats[sender]['categories'][cat_name]['examples'].append({
+                    'text': text[:100],
+                    'markers': found
+                })
         
         if has_interest:
             user_stats[sender]['interest_questions'] += 1
-            try:
-                dt = parse_date(msg['date'])
-                monthly_stats[dt.strftime('%Y-%m')][sender] += 1
-            except:
-                pass
+            if month_keys[row]:
+                monthly_stats[month_keys[row]][sender] += 1
     
+    return Scan(on_message, partial(render_results, categories, user_stats, monthly_stats))
+
+
+def render_results(categories, user_stats, monthly_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.warning("Не удалось проанализировать сообщения.")
         return
@@ -8,11 +8,17 @@ Love Language Analyzer
 - Физическое прикосновение (упоминания)
 """
 from collections import defaultdict, Counter
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import re
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 # Маркеры языков любви
 WORDS_OF_AFFIRMATION = {
     # Комплименты
@@ -75,29 +81,16 @@ PHYSICAL_TOUCH = {
 }
 
 
-def extract_text(msg):
-    text = msg.get("text", "")
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict):
-                parts.append(part.get("text", ""))
-        return " ".join(parts)
-    return str(text)
-
+LEXICON = register_lexicon(Lexicon({
+    "words": WORDS_OF_AFFIRMATION,
+    "time": QUALITY_TIME,
+    "gifts": GIFTS,
+    "service": ACTS_OF_SERVICE,
+    "touch": PHYSICAL_TOUCH,
+}))
 
-def count_markers(text, markers):
-    text_lower = text.lower()
-    count = 0
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-    return count
 
-
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -125,21 +118,25 @@ def run_plugin(data):
         "touch": 0,
     })
     
-    for msg in messages:
-        sender = msg.get("from")
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
         
-        text = extract_text(msg)
         if not text.strip():
-            continue
+            return
         
-        user_languages[sender]["words"] += count_markers(text, WORDS_OF_AFFIRMATION)
-        user_languages[sender]["time"] += count_markers(text, QUALITY_TIME)
-        user_languages[sender]["gifts"] += count_markers(text, GIFTS)
-        user_languages[sender]["service"] += count_markers(text, ACTS_OF_SERVICE)
-        user_languages[sender]["touch"] += count_markers(text, PHYSICAL_TOUCH)
+        languages = user_languages[sender]
+        for language, count in features.counts(row).items():
+            languages[language] += count
     
+    return Scan(on_message, partial(render_results, user_languages))
+
+
+def render_results(user_languages):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_languages:
         st.warning("Не удалось проанализировать сообщения.")
         return
@@ -4,32 +4,16 @@ Message Length Balance Analyzer
 Кто пишет больше, развёрнутее, инвестирует больше усилий в общение.
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Scan
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
 
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -59,28 +43,31 @@ def run_plugin(data):
     
     monthly_stats = defaultdict(lambda: defaultdict(lambda: {'chars': 0, 'count': 0}))
     
-    for msg in messages:
-        sender = msg.get('from')
+    month_keys = chat.month_keys
+    names = chat.media_type_names
+    media_types = [names[code] if code >= 0 else None for code in chat.media_types.tolist()]
+    has_photo = chat.has_photo
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
         
         # Голосовые сообщения
-        if msg.get('media_type') == 'voice_message':
+        if media_types[row] == 'voice_message':
             user_stats[sender]['voice_messages'] += 1
-            continue
+            return
         
         # Стикеры
-        if msg.get('media_type') == 'sticker':
+        if media_types[row] == 'sticker':
             user_stats[sender]['stickers'] += 1
-            continue
+            return
         
         # Фото
-        if msg.get('photo'):
+        if has_photo[row]:
             user_stats[sender]['photos'] += 1
         
-        text = get_text(msg)
         if not text:
-            continue
+            return
         
         text_len = len(text)
         words = text.split()
@@ -100,14 +87,16 @@ def run_plugin(data):
             user_stats[sender]['long_messages'] += 1
         
         # По месяцам
-        try:
-            dt = parse_date(msg['date'])
-            month = dt.strftime('%Y-%m')
+        month = month_keys[row]
+        if month:
             monthly_stats[month][sender]['chars'] += text_len
             monthly_stats[month][sender]['count'] += 1
-        except:
-            pass
     
+    return Scan(on_message, partial(render_results, user_stats, monthly_stats))
+
+
+def render_results(user_stats, monthly_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.warning("Не удалось проанализировать сообщения.")
         return
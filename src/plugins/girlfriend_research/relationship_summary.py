@@ -4,12 +4,19 @@ Relationship Summary
 Помогает принять решение о продолжении отношений.
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+from tgchatsanalyzer.datasets import get_dataset
+
+# Начала разговоров — те же разговоры после паузы 4 ч, что у плагина инициативы
+DATASETS = ("lexicon_scores", "conversation_starts@4h")
+
 # Импортируем маркеры из других модулей (упрощённые версии)
 POSITIVE_MARKERS = {
     'люблю', 'обожаю', 'счастлив', 'рад', 'прекрасн', 'спасибо',
@@ -42,29 +49,17 @@ INSECURITY_MARKERS = {
 }
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def count_markers(text, markers):
-    text_lower = text.lower()
-    return sum(1 for m in markers if m in text_lower)
+LEXICON = register_lexicon(Lexicon({
+    'positive': POSITIVE_MARKERS,
+    'negative': NEGATIVE_MARKERS,
+    'toxic': TOXIC_MARKERS,
+    'support': SUPPORT_MARKERS,
+    'control': CONTROL_MARKERS,
+    'insecurity': INSECURITY_MARKERS,
+}))
 
 
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -94,43 +89,29 @@ def run_plugin(data):
         'conversation_starts': 0,
     })
     
-    # Для анализа инициативы
-    messages_sorted = []
-    for msg in messages:
-        sender = msg.get('from')
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
         
-        text = get_text(msg)
         user_stats[sender]['total_messages'] += 1
         user_stats[sender]['total_chars'] += len(text)
         
-        user_stats[sender]['positive'] += count_markers(text, POSITIVE_MARKERS)
-        user_stats[sender]['negative'] += count_markers(text, NEGATIVE_MARKERS)
-        user_stats[sender]['toxic'] += count_markers(text, TOXIC_MARKERS)
-        user_stats[sender]['support'] += count_markers(text, SUPPORT_MARKERS)
-        user_stats[sender]['control'] += count_markers(text, CONTROL_MARKERS)
-        user_stats[sender]['insecurity'] += count_markers(text, INSECURITY_MARKERS)
+        for category, count in features.counts(row).items():
+            user_stats[sender][category] += count
         user_stats[sender]['questions'] += text.count('?')
-        
-        try:
-            dt = parse_date(msg['date'])
-            messages_sorted.append({'datetime': dt, 'sender': sender})
-        except:
-            pass
-    
-    # Анализ инициативы (кто начинает разговоры)
-    messages_sorted.sort(key=lambda x: x['datetime'])
-    if len(messages_sorted) > 1:
-        from datetime import timedelta
-        pause_threshold = timedelta(hours=4)
-        prev = messages_sorted[0]
-        user_stats[prev['sender']]['conversation_starts'] += 1
-        
-        for msg in messages_sorted[1:]:
-            if msg['datetime'] - prev['datetime'] >= pause_threshold:
-                user_stats[msg['sender']]['conversation_starts'] += 1
-            prev = msg
+    
+    return Scan(on_message, partial(render_results, chat, user_stats))
+
+
+def render_results(chat, user_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
+    starts = get_dataset(chat, "conversation_starts@4h")
+    for user, count in zip(chat.users, starts.tolist()):
+        if user in user_stats:
+            user_stats[user]['conversation_starts'] += count
     
     users = list(user_stats.keys())
     if len(users) < 2:
@@ -3,16 +3,14 @@ Response Time Analyzer
 Анализирует скорость ответа каждого участника
 Показывает кто отвечает быстрее и как это меняется со временем
 """
-from collections import defaultdict
-from datetime import datetime, timedelta
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer.datasets import get_dataset
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+DATASETS = ("turn_deltas",)
 
 
 def format_duration(seconds):
@@ -31,7 +29,52 @@ def format_duration(seconds):
         return f"{days}д {hours}ч" if hours else f"{days}д"
 
 
-def run_plugin(data):
+def within(turns, max_response_hours):
+    """Ответы не дольше порога — бинарный поиск по отсортированным временам"""
+    cut = np.searchsorted(turns['deltas'], max_response_hours * 3600, side='right')
+    return {key: turns[key][:cut] for key in ('deltas', 'responders', 'months', 'hours')}
+
+
+def group_stats(keys, deltas, n_groups):
+    """
+    Количество, среднее, медиана, минимум и максимум времени ответа по
+    группам keys (0..n_groups-1). deltas отсортированы, поэтому после
+    стабильной сортировки по группе каждая группа тоже отсортирована и
+    медиана, минимум и максимум берутся по индексам.
+    """
+    counts = np.bincount(keys, minlength=n_groups)
+    values = deltas[np.argsort(keys, kind='stable')].astype(float)
+    starts = np.cumsum(counts) - counts
+    has = counts > 0
+    
+    stats = {
+        'count': counts,
+        'mean': np.full(n_groups, np.nan),
+        'median': np.full(n_groups, np.nan),
+        'min': np.full(n_groups, np.nan),
+        'max': np.full(n_groups, np.nan),
+    }
+    stats['mean'][has] = np.bincount(keys, weights=deltas, minlength=n_groups)[has] / counts[has]
+    lo = starts[has] + (counts[has] - 1) // 2
+    hi = starts[has] + counts[has] // 2
+    stats['median'][has] = (values[lo] + values[hi]) / 2
+    stats['min'][has] = values[starts[has]]
+    stats['max'][has] = values[starts[has] + counts[has] - 1]
+    return stats
+
+
+def bucket_means(turns, buckets, n_users, n_buckets):
+    """Среднее время ответа по (пользователь, корзина); NaN — ответов не было"""
+    size = n_users * n_buckets
+    keys = turns['responders'] * n_buckets + buckets
+    counts = np.bincount(keys, minlength=size)
+    sums = np.bincount(keys, weights=turns['deltas'], minlength=size)
+    means = np.full(size, np.nan)
+    means[counts > 0] = sums[counts > 0] / counts[counts > 0]
+    return means.reshape(n_users, n_buckets)
+
+
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -48,83 +91,45 @@ def run_plugin(data):
         min_value=1, max_value=48, value=12,
         help="Если ответ пришёл позже — не считаем это ответом на предыдущее сообщение"
     )
-    max_response_time = timedelta(hours=max_response_hours)
-    
-    # Парсим и сортируем сообщения
-    messages_sorted = []
-    for msg in messages:
-        try:
-            dt = parse_date(msg["date"])
-            sender = msg.get("from")
-            if sender:
-                messages_sorted.append({
-                    'datetime': dt,
-                    'sender': sender,
-                    'month': dt.strftime('%Y-%m'),
-                    'hour': dt.hour
-                })
-        except:
-            continue
-    
-    messages_sorted.sort(key=lambda x: x['datetime'])
     
-    if len(messages_sorted) < 2:
+    # Ответы считаются один раз на чат, слайдер только отрезает префикс
+    all_turns = get_dataset(chat, "turn_deltas")
+    if all_turns['messages'] < 2:
         st.warning("Недостаточно сообщений для анализа.")
         return
     
-    # Собираем время ответов
-    response_times = defaultdict(list)
-    monthly_response_times = defaultdict(lambda: defaultdict(list))
-    hourly_response_times = defaultdict(lambda: defaultdict(list))
+    turns = within(all_turns, max_response_hours)
+    deltas, responders = turns['deltas'], turns['responders']
     
-    prev_msg = messages_sorted[0]
-    
-    for msg in messages_sorted[1:]:
-        if msg['sender'] != prev_msg['sender']:
-            # Это ответ на предыдущее сообщение
-            response_time = (msg['datetime'] - prev_msg['datetime']).total_seconds()
-            
-            if response_time <= max_response_time.total_seconds():
-                responder = msg['sender']
-                response_times[responder].append(response_time)
-                monthly_response_times[msg['month']][responder].append(response_time)
-                hourly_response_times[msg['hour']][responder].append(response_time)
-        
-        prev_msg = msg
-    
-    if not response_times:
+    if not len(deltas):
         st.warning("Не удалось вычислить время ответов.")
         return
     
+    n_users = len(chat.users)
+    user_stats = group_stats(responders, deltas, n_users)
+    codes = np.flatnonzero(user_stats['count']).tolist()
+    users = [chat.users[code] for code in codes]
+    
     # Основная статистика
     st.markdown("### 📊 Статистика времени ответа")
     
+    fast = np.bincount(responders[deltas < 300], minlength=n_users)
+    slow = np.bincount(responders[deltas > 3600], minlength=n_users)
+    
     table_data = []
-    for user, times in response_times.items():
-        if times:
-            avg_time = np.mean(times)
-            median_time = np.median(times)
-            min_time = min(times)
-            max_time = max(times)
-            
-            # Быстрые ответы (< 5 минут)
-            fast_responses = sum(1 for t in times if t < 300)
-            fast_ratio = fast_responses / len(times) * 100
-            
-            # Медленные ответы (> 1 час)
-            slow_responses = sum(1 for t in times if t > 3600)
-            slow_ratio = slow_responses / len(times) * 100
-            
-            table_data.append({
-                'Пользователь': user,
-                'Ответов': len(times),
-                'Среднее': format_duration(avg_time),
-                'Медиана': format_duration(median_time),
-                'Мин': format_duration(min_time),
-                'Макс': format_duration(max_time),
-                'Быстрых (<5м)': f"{fast_ratio:.0f}%",
-                'Медленных (>1ч)': f"{slow_ratio:.0f}%"
-            })
+    for code, user in zip(codes, users):
+        count = user_stats['count'][code]
+        table_data.append({
+            'Пользователь': user,
+            'Ответов': int(count),
+            'Среднее': format_duration(user_stats['mean'][code]),
+            'Медиана': format_duration(user_stats['median'][code]),
+            'Мин': format_duration(user_stats['min'][code]),
+            'Макс': format_duration(user_stats['max'][code]),
+            # Быстрые ответы (< 5 минут) и медленные (> 1 часа)
+            'Быстрых (<5м)': f"{fast[code] / count * 100:.0f}%",
+            'Медленных (>1ч)': f"{slow[code] / count * 100:.0f}%"
+        })
     
     df = pd.DataFrame(table_data)
     st.dataframe(df, hide_index=True)
@@ -132,22 +137,20 @@ def run_plugin(data):
     # Визуализация распределения
     st.markdown("### 📈 Распределение времени ответа")
     
-    users = list(response_times.keys())
-    
     fig, axes = plt.subplots(1, len(users), figsize=(6*len(users), 5))
     if len(users) == 1:
         axes = [axes]
     
-    for idx, user in enumerate(users):
-        times = response_times[user]
+    for idx, (code, user) in enumerate(zip(codes, users)):
         # Конвертируем в минуты для лучшей читаемости
-        times_minutes = [t / 60 for t in times]
+        times_minutes = deltas[responders == code] / 60
+        median = user_stats['median'][code]
         
         # Ограничиваем для визуализации
-        times_capped = [min(t, 120) for t in times_minutes]  # Кап на 2 часах
+        times_capped = np.minimum(times_minutes, 120)  # Кап на 2 часах
         
         axes[idx].hist(times_capped, bins=30, alpha=0.7, color='steelblue', edgecolor='white')
-        axes[idx].axvline(np.median(times_minutes), color='red', linestyle='--', label=f'Медиана: {format_duration(np.median(times)*60)}')
+        axes[idx].axvline(median / 60, color='red', linestyle='--', label=f'Медиана: {format_duration(median*60)}')
         axes[idx].set_xlabel('Минуты')
         axes[idx].set_ylabel('Количество')
         axes[idx].set_title(f'{user}')
@@ -161,11 +164,9 @@ def run_plugin(data):
         st.markdown("### ⚖️ Сравнение")
         
         user1, user2 = users
-        avg1 = np.mean(response_times[user1])
-        avg2 = np.mean(response_times[user2])
+        avg1, avg2 = (user_stats['mean'][code] for code in codes)
         
         faster = user1 if avg1 < avg2 else user2
-        slower = user2 if avg1 < avg2 else user1
         ratio = max(avg1, avg2) / min(avg1, avg2) if min(avg1, avg2) > 0 else 0
         
         col1, col2, col3 = st.columns(3)
@@ -192,22 +193,20 @@ def run_plugin(data):
             st.success("✅ Скорость ответов примерно одинакова — хороший признак!")
     
     # Динамика по месяцам
-    if len(monthly_response_times) > 1:
+    month_values = np.unique(turns['months'])
+    if len(month_values) > 1:
         st.markdown("### 📈 Динамика по месяцам")
         
-        months = sorted(monthly_response_times.keys())
+        months = np.datetime_as_string(month_values.astype('datetime64[M]')).tolist()
+        monthly_means = bucket_means(
+            turns, np.searchsorted(month_values, turns['months']), n_users, len(month_values)
+        )
         
         fig2, ax = plt.subplots(figsize=(12, 5))
         
-        for user in users:
-            avg_times = []
-            for month in months:
-                times = monthly_response_times[month].get(user, [])
-                avg = np.mean(times) / 60 if times else None  # В минутах
-                avg_times.append(avg)
-            
-            # Интерполяция для пропущенных месяцев
-            ax.plot(months, avg_times, marker='o', label=user, linewidth=2)
+        for code, user in zip(codes, users):
+            # Пропущенные месяцы (NaN) рисуются разрывом
+            ax.plot(months, monthly_means[code] / 60, marker='o', label=user, linewidth=2)
         
         ax.set_xlabel('Месяц')
         ax.set_ylabel('Среднее время ответа (минуты)')
@@ -219,12 +218,8 @@ def run_plugin(data):
         
         # Анализ тренда
         st.markdown("#### 📉 Анализ тренда")
-        for user in users:
-            all_avgs = []
-            for month in months:
-                times = monthly_response_times[month].get(user, [])
-                if times:
-                    all_avgs.append(np.mean(times))
+        for code, user in zip(codes, users):
+            all_avgs = monthly_means[code][~np.isnan(monthly_means[code])]
             
             if len(all_avgs) >= 4:
                 first_half = np.mean(all_avgs[:len(all_avgs)//2])
@@ -245,15 +240,10 @@ def run_plugin(data):
     fig3, ax = plt.subplots(figsize=(12, 5))
     
     hours = list(range(24))
+    hourly_means = bucket_means(turns, turns['hours'], n_users, 24)
     
-    for user in users:
-        avg_by_hour = []
-        for h in hours:
-            times = hourly_response_times[h].get(user, [])
-            avg = np.mean(times) / 60 if times else None  # В минутах
-            avg_by_hour.append(avg)
-        
-        ax.plot(hours, avg_by_hour, marker='o', label=user, linewidth=2)
+    for code, user in zip(codes, users):
+        ax.plot(hours, hourly_means[code] / 60, marker='o', label=user, linewidth=2)
     
     ax.set_xlabel('Час')
     ax.set_ylabel('Среднее время ответа (минуты)')
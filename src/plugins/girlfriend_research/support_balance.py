@@ -4,11 +4,16 @@ Support Balance Analyzer
 Здоровые отношения — взаимная поддержка.
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 # Фразы поддержки и утешения
 SUPPORT_PHRASES = {
     # Прямая поддержка
@@ -67,37 +72,18 @@ INTEREST_QUESTIONS = {
 }
 
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+CATEGORIES = {
+    '💬 Поддержка': SUPPORT_PHRASES,
+    '💊 Забота': CARE_PHRASES,
+    '❓ Интерес': INTEREST_QUESTIONS,
+}
 
-def count_markers(text, markers):
-    """Считает маркеры в тексте"""
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
+# Эмодзи ищутся тем же автоматом, но в таблицы категорий не попадают
+EMOJI_CATEGORY = 'emojis'
+LEXICON = register_lexicon(Lexicon({**CATEGORIES, EMOJI_CATEGORY: SUPPORT_EMOJIS}))
 
 
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -112,11 +98,7 @@ def run_plugin(data):
     В здоровых отношениях поддержка взаимна.
     """)
     
-    categories = {
-        '💬 Поддержка': SUPPORT_PHRASES,
-        '💊 Забота': CARE_PHRASES,
-        '❓ Интерес': INTEREST_QUESTIONS,
-    }
+    categories = CATEGORIES
     
     # Собираем статистику
     user_stats = defaultdict(lambda: {
@@ -128,43 +110,48 @@ def run_plugin(data):
     
     monthly_stats = defaultdict(lambda: defaultdict(int))
     
-    for msg in messages:
-        sender = msg.get('from')
+    month_keys = chat.month_keys
+    
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
             
-        text = get_text(msg)
         if not text:
-            continue
+            return
         
         user_stats[sender]['total_messages'] += 1
         
         is_supportive = False
-        for cat_name, markers in categories.items():
-            count, found = count_markers(text, markers)
-            if count > 0:
-                is_supportive = True
-                user_stats[sender]['categories'][cat_name]['count'] += count
-                if len(user_stats[sender]['categories'][cat_name]['examples']) < 5:
-                    user_stats[sender]['categories'][cat_name]['examples'].append({
-                        'text': text[:100],
-                        'markers': found
-                    })
+        hits = features.hits(row)
+        emoji_count = len(hits.pop(EMOJI_CATEGORY, []))
+        for cat_name, found in hits.items():
+            count = len(found)
+            is_supportive = True
+            user_stats[sender]['categories'][cat_name]['count'] += count
+            if len(user_stats[sender]['categories'][cat_name]['examples']) < 5:
+                user_stats[sender]['categories'][cat_name]['examples'].append({
+                    'text': text[:100],
+                    'markers': found
+                })
         
         # Эмодзи поддержки
-        emoji_count = sum(1 for emoji in SUPPORT_EMOJIS if emoji in text)
         user_stats[sender]['emojis'] += emoji_count
         if emoji_count > 0:
             is_supportive = True
         
         if is_supportive:
             user_stats[sender]['support_messages'] += 1
-            try:
-                dt = parse_date(msg['date'])
-                monthly_stats[dt.strftime('%Y-%m')][sender] += 1
-            except:
-                pass
+            if month_keys[row]:
+                monthly_stats[month_keys[row]][sender] += 1
     
+    return Scan(on_message, partial(render_results, categories, user_stats, monthly_stats))
+
+
+def render_results(categories, user_stats, monthly_stats):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.warning("Не удалось проанализировать сообщения.")
         return
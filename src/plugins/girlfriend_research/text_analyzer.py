@@ -11,7 +11,9 @@ Text Analyzer - общий модуль для улучшенного анали
 """
 import re
 from collections import Counter, defaultdict
-from typing import List, Dict, Tuple, Set, Optional
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from tgchatsanalyzer import Lexicon
 
 
 def normalize_text(text: str) -> str:
@@ -21,11 +23,37 @@ def normalize_text(text: str) -> str:
     return text.strip()
 
 
+# Слова и эмодзи (эмодзи — отдельными токенами)
+WORD_RE = re.compile(r'[\w]+|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]')
+
+
 def extract_words(text: str) -> List[str]:
     """Извлекает слова из текста"""
     # Разделяем по не-буквам, но сохраняем эмодзи
-    words = re.findall(r'[\w]+|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', text.lower())
-    return words
+    return WORD_RE.findall(text.lower())
+
+
+class PreparedText(NamedTuple):
+    """
+    Текст, разобранный один раз для всех анализаторов: нормализованная
+    строка, слова, их позиции в ней и флаги отрицания перед словами.
+    """
+    text: str
+    lower: str
+    words: List[str]
+    starts: List[int]
+    negated: List[bool]
+
+
+def prepare_text(text: str) -> 'PreparedText':
+    """Нормализует и токенизирует текст (один раз на сообщение)"""
+    lower = normalize_text(text)
+    words = []
+    starts = []
+    for match in WORD_RE.finditer(lower):
+        words.append(match.group())
+        starts.append(match.start())
+    return PreparedText(text, lower, words, starts, negation_flags(words))
 
 
 def get_ngrams(words: List[str], n: int) -> List[str]:
@@ -35,19 +63,44 @@ def get_ngrams(words: List[str], n: int) -> List[str]:
     return [' '.join(words[i:i+n]) for i in range(len(words) - n + 1)]
 
 
-def check_negation(text: str, keyword: str, window: int = 3) -> bool:
-    """Проверяет, есть ли отрицание перед ключевым словом"""
-    negations = {'не', 'нет', 'ни', 'никогда', 'без', 'never', 'not', "don't", "doesn't", "didn't"}
-    
+NEGATIONS = frozenset({'не', 'нет', 'ни', 'никогда', 'без', 'never', 'not', "don't", "doesn't", "didn't"})
+NEGATION_WINDOW = 3
+
+
+def check_negation(text: str, keyword: str, window: int = NEGATION_WINDOW) -> bool:
+    """Проверяет, есть ли отрицание перед (первым) вхождением ключевого слова"""
     words = extract_words(text)
     try:
         idx = words.index(keyword)
-        # Проверяем слова перед ключевым
-        start = max(0, idx - window)
-        context = words[start:idx]
-        return any(neg in context for neg in negations)
     except ValueError:
         return False
+    return negation_flags(words, window)[idx]
+
+
+def negation_flags(words: List[str], window: int = NEGATION_WINDOW) -> List[bool]:
+    """
+    Для каждого слова: есть ли отрицание среди window слов перед ним.
+    Один проход с позицией последнего отрицания вместо поиска по окну.
+    """
+    flags = []
+    last = -window - 1
+    for i, word in enumerate(words):
+        flags.append(i - last <= window)
+        if word in NEGATIONS:
+            last = i
+    return flags
+
+
+def copy_result(value):
+    """
+    Копия результата анализа: словари и списки новые, строки, числа и
+    кортежи общие. Намного дешевле повторного анализа текста.
+    """
+    if isinstance(value, dict):
+        return {key: copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_result(item) for item in value]
+    return value
 
 
 class SentimentAnalyzer:
@@ -100,9 +153,22 @@ class SentimentAnalyzer:
         '🙄': 0.5, '😑': 0.5, '😩': 1, '😫': 1, '😣': 1, '😖': 1,
     }
     
-    def analyze(self, text: str) -> Dict:
+    def __init__(self):
+        # Слово -> (вес позитива, вес негатива): одна проверка словаря на слово
+        self._words = {}
+        for word, weight in self.POSITIVE_WORDS.items():
+            self._words[word] = (weight, 0)
+        for word, weight in self.NEGATIVE_WORDS.items():
+            self._words[word] = (self._words.get(word, (0, 0))[0], weight)
+        
+        # Все эмодзи одним регулярным выражением (составные, вроде ❤️, раньше одиночных)
+        emojis = sorted({**self.POSITIVE_EMOJIS, **self.NEGATIVE_EMOJIS}, key=len, reverse=True)
+        self._emoji_re = re.compile('|'.join(re.escape(e) for e in emojis))
+    
+    def analyze(self, text: str, prepared: Optional[PreparedText] = None) -> Dict:
         """
         Анализирует текст и возвращает оценку настроения.
+        prepared — уже готовый разбор текста (prepare_text), если есть.
         
         Returns:
             Dict с ключами:
@@ -111,41 +177,45 @@ class SentimentAnalyzer:
             - negative_words: list найденных негативных слов
             - confidence: float от 0 до 1 (уверенность в оценке)
         """
-        text_lower = normalize_text(text)
-        words = extract_words(text)
+        if prepared is None:
+            prepared = prepare_text(text)
         
         positive_score = 0.0
         negative_score = 0.0
         positive_found = []
         negative_found = []
         
-        # Анализ слов
-        for word in words:
-            if word in self.POSITIVE_WORDS:
-                # Проверяем отрицание
-                if check_negation(text_lower, word):
-                    negative_score += self.POSITIVE_WORDS[word]
+        # Анализ слов: отрицание проверяется для каждого вхождения отдельно
+        for word, negated in zip(prepared.words, prepared.negated):
+            weights = self._words.get(word)
+            if weights is None:
+                continue
+            positive, negative = weights
+            
+            if positive:
+                if negated:
+                    negative_score += positive
                     negative_found.append(f"не {word}")
                 else:
-                    positive_score += self.POSITIVE_WORDS[word]
+                    positive_score += positive
                     positive_found.append(word)
             
-            if word in self.NEGATIVE_WORDS:
-                if check_negation(text_lower, word):
-                    positive_score += self.NEGATIVE_WORDS[word] * 0.5  # Двойное отрицание слабее
+            if negative:
+                if negated:
+                    positive_score += negative * 0.5  # Двойное отрицание слабее
                     positive_found.append(f"не {word}")
                 else:
-                    negative_score += self.NEGATIVE_WORDS[word]
+                    negative_score += negative
                     negative_found.append(word)
         
         # Анализ эмодзи
-        for char in text:
-            if char in self.POSITIVE_EMOJIS:
-                positive_score += self.POSITIVE_EMOJIS[char]
-                positive_found.append(char)
-            if char in self.NEGATIVE_EMOJIS:
-                negative_score += self.NEGATIVE_EMOJIS[char]
-                negative_found.append(char)
+        for emoji in self._emoji_re.findall(text):
+            if emoji in self.POSITIVE_EMOJIS:
+                positive_score += self.POSITIVE_EMOJIS[emoji]
+                positive_found.append(emoji)
+            if emoji in self.NEGATIVE_EMOJIS:
+                negative_score += self.NEGATIVE_EMOJIS[emoji]
+                negative_found.append(emoji)
         
         # Вычисляем итоговый score
         total = positive_score + negative_score
@@ -165,12 +235,41 @@ class SentimentAnalyzer:
             'negative_score': negative_score,
             'confidence': confidence,
         }
+    
+    def analyze_many(self, texts: Iterable[str]) -> List[Dict]:
+        """
+        Анализ пачки текстов. Одинаковые тексты ("ок", "люблю") считаются
+        один раз, каждый получает свою копию результата.
+        """
+        cache = {}
+        results = []
+        for text in texts:
+            result = cache.get(text)
+            if result is None:
+                result = cache[text] = self.analyze(text)
+            results.append(copy_result(result))
+        return results
+
+
+class PatternHit(NamedTuple):
+    """Найденный паттерн: start — позиция в нормализованном тексте"""
+    category: Hashable
+    pattern: str
+    context: str
+    start: int
 
 
 class PatternMatcher:
-    """Улучшенный поиск паттернов с контекстом"""
+    """
+    Улучшенный поиск паттернов с контекстом.
+    
+    Все категории компилируются один раз: фразы — в общий автомат
+    Lexicon, одиночные слова — в словарь слово -> категории. Текст
+    токенизируется один раз, и его разбор (prepare_text) можно передать
+    сюда и в SentimentAnalyzer, чтобы не делать его повторно.
+    """
     
-    def __init__(self, patterns: Dict[str, Set[str]]):
+    def __init__(self, patterns: Dict[Hashable, Set[str]]):
         """
         patterns: Dict категория -> набор паттернов
         """
@@ -188,48 +287,57 @@ class PatternMatcher:
                     self.phrases[category].add(p.lower())
                 else:
                     self.single_words[category].add(p.lower())
+        
+        self._phrases = Lexicon(self.phrases)
+        self._words = defaultdict(list)
+        for category, words in self.single_words.items():
+            for word in words:
+                self._words[word].append(category)
+    
+    def matches(self, text: str, prepared: Optional[PreparedText] = None) -> List[PatternHit]:
+        """
+        Все совпадения с позициями: фразы — по одному разу (первое
+        вхождение), слова — каждое вхождение с учётом отрицания перед ним.
+        """
+        if prepared is None:
+            prepared = prepare_text(text)
+        lower, words = prepared.lower, prepared.words
+        
+        hits = []
+        seen = set()
+        for hit in self._phrases.find(lower):
+            key = (hit.category, hit.marker)
+            if key in seen:
+                continue
+            seen.add(key)
+            # Извлекаем контекст
+            start = max(0, hit.start - 30)
+            end = min(len(lower), hit.start + len(hit.marker) + 30)
+            hits.append(PatternHit(hit.category, hit.marker, lower[start:end], hit.start))
+        
+        for idx, word in enumerate(words):
+            categories = self._words.get(word)
+            if not categories:
+                continue
+            pattern = f"не {word}" if prepared.negated[idx] else word
+            context = ' '.join(words[max(0, idx - 3):idx + 4])
+            for category in categories:
+                hits.append(PatternHit(category, pattern, context, prepared.starts[idx]))
+        
+        return hits
     
-    def find_all(self, text: str) -> Dict[str, List[Tuple[str, str]]]:
+    def find_all(
+        self, text: str, prepared: Optional[PreparedText] = None
+    ) -> Dict[Hashable, List[Tuple[str, str]]]:
         """
         Находит все паттерны в тексте.
         
         Returns:
             Dict категория -> List[(найденный_паттерн, контекст)]
         """
-        text_lower = normalize_text(text)
-        words = extract_words(text)
-        
         results = defaultdict(list)
-        
-        for category in self.patterns:
-            # Проверяем фразы
-            for phrase in self.phrases[category]:
-                if phrase in text_lower:
-                    # Извлекаем контекст
-                    idx = text_lower.find(phrase)
-                    start = max(0, idx - 30)
-                    end = min(len(text_lower), idx + len(phrase) + 30)
-                    context = text_lower[start:end]
-                    results[category].append((phrase, context))
-            
-            # Проверяем одиночные слова
-            for word in words:
-                if word in self.single_words[category]:
-                    # Проверяем отрицание
-                    negated = check_negation(text_lower, word)
-                    pattern = f"не {word}" if negated else word
-                    
-                    # Извлекаем контекст
-                    try:
-                        idx = words.index(word)
-                        start = max(0, idx - 3)
-                        end = min(len(words), idx + 4)
-                        context = ' '.join(words[start:end])
-                    except:
-                        context = word
-                    
-                    results[category].append((pattern, context))
-        
+        for hit in self.matches(text, prepared):
+            results[hit.category].append((hit.pattern, hit.context))
         return dict(results)
     
     def count_by_category(self, text: str) -> Dict[str, int]:
@@ -291,20 +399,43 @@ class RelationshipAnalyzer:
     
     def __init__(self):
         self.sentiment = SentimentAnalyzer()
-        self.insecurity_matcher = PatternMatcher(self.INSECURITY_PATTERNS)
-        self.control_matcher = PatternMatcher(self.CONTROL_PATTERNS)
-        self.support_matcher = PatternMatcher(self.SUPPORT_PATTERNS)
+        # Один матчер на все аспекты: категории — пары (аспект, категория)
+        self.aspects = {
+            'insecurity': self.INSECURITY_PATTERNS,
+            'control': self.CONTROL_PATTERNS,
+            'support': self.SUPPORT_PATTERNS,
+        }
+        self.matcher = PatternMatcher({
+            (aspect, category): pattern_set
+            for aspect, patterns in self.aspects.items()
+            for category, pattern_set in patterns.items()
+        })
     
     def analyze_message(self, text: str) -> Dict:
         """Комплексный анализ одного сообщения"""
-        sentiment = self.sentiment.analyze(text)
-        
-        return {
-            'sentiment': sentiment,
-            'insecurity': self.insecurity_matcher.find_all(text),
-            'control': self.control_matcher.find_all(text),
-            'support': self.support_matcher.find_all(text),
+        # Текст нормализуется и токенизируется один раз для всех анализов
+        prepared = prepare_text(text)
+        result = {
+            'sentiment': self.sentiment.analyze(text, prepared),
+            **{aspect: {} for aspect in self.aspects},
         }
+        for (aspect, category), matches in self.matcher.find_all(text, prepared).items():
+            result[aspect][category] = matches
+        return result
+    
+    def analyze_many(self, texts: Iterable[str]) -> List[Dict]:
+        """
+        Анализ пачки сообщений (например, всего чата). Одинаковые тексты
+        разбираются один раз, каждый получает свою копию результата.
+        """
+        cache = {}
+        results = []
+        for text in texts:
+            result = cache.get(text)
+            if result is None:
+                result = cache[text] = self.analyze_message(text)
+            results.append(copy_result(result))
+        return results
     
     def analyze_conversation(self, messages: List[Dict]) -> Dict:
         """Анализ всей переписки"""
@@ -317,6 +448,8 @@ class RelationshipAnalyzer:
             'support': defaultdict(int),
         })
         
+        senders = []
+        texts = []
         for msg in messages:
             sender = msg.get('from')
             if not sender:
@@ -332,8 +465,10 @@ class RelationshipAnalyzer:
             if not text:
                 continue
             
-            analysis = self.analyze_message(text)
-            
+            senders.append(sender)
+            texts.append(text)
+        
+        for sender, analysis in zip(senders, self.analyze_many(texts)):
             user_stats[sender]['messages'] += 1
             
             if analysis['sentiment']['confidence'] > 0.3:
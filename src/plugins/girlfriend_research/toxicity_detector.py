@@ -8,9 +8,15 @@ Toxicity Detector
 - Обвинения
 """
 from collections import defaultdict
-from datetime import datetime
+from functools import partial
 import streamlit as st
 import pandas as pd
+import numpy as np
+
+from tgchatsanalyzer import Lexicon, Scan
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
 
 # Газлайтинг — попытки заставить сомневаться в своём восприятии
 GASLIGHTING_MARKERS = {
@@ -91,35 +97,20 @@ THREATS_MARKERS = {
 }
 
 
-def get_text(msg):
-    """Извлекает текст из сообщения"""
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+# Категории токсичности
+CATEGORIES = {
+    '🌫️ Газлайтинг': GASLIGHTING_MARKERS,
+    '💔 Обесценивание': DEVALUATION_MARKERS,
+    '😒 Пассивная агрессия': PASSIVE_AGGRESSION_MARKERS,
+    '🎯 Контроль': CONTROL_MARKERS,
+    '💢 Агрессия': DIRECT_AGGRESSION_MARKERS,
+    '⚠️ Угрозы/Шантаж': THREATS_MARKERS,
+}
 
-def find_markers(text, markers):
-    """Находит маркеры в тексте"""
-    text_lower = text.lower()
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            found.append(marker)
-    return found
+LEXICON = register_lexicon(Lexicon(CATEGORIES))
 
 
-def run_plugin(data):
+def scan_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -135,49 +126,36 @@ def run_plugin(data):
     Контекст имеет значение — иногда фразы используются в шутку или имеют другой смысл.
     """)
     
-    # Категории токсичности
-    categories = {
-        '🌫️ Газлайтинг': GASLIGHTING_MARKERS,
-        '💔 Обесценивание': DEVALUATION_MARKERS,
-        '😒 Пассивная агрессия': PASSIVE_AGGRESSION_MARKERS,
-        '🎯 Контроль': CONTROL_MARKERS,
-        '💢 Агрессия': DIRECT_AGGRESSION_MARKERS,
-        '⚠️ Угрозы/Шантаж': THREATS_MARKERS,
-    }
+    categories = CATEGORIES
     
     # Собираем статистику
     user_stats = defaultdict(lambda: {cat: {'count': 0, 'examples': []} for cat in categories})
-    monthly_stats = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
     
-    for msg in messages:
-        sender = msg.get('from')
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    def on_message(row, sender, text):
         if not sender:
-            continue
+            return
             
-        text = get_text(msg)
         if not text or len(text) < 3:
-            continue
+            return
         
         # Проверяем каждую категорию
-        for cat_name, markers in categories.items():
-            found = find_markers(text, markers)
-            if found:
-                user_stats[sender][cat_name]['count'] += len(found)
-                if len(user_stats[sender][cat_name]['examples']) < 5:
-                    user_stats[sender][cat_name]['examples'].append({
-                        'text': text[:150],
-                        'markers': found,
-                        'date': msg.get('date', '')[:10]
-                    })
-                
-                # Статистика по месяцам
-                try:
-                    dt = parse_date(msg['date'])
-                    month = dt.strftime('%Y-%m')
-                    monthly_stats[month][sender][cat_name] += len(found)
-                except:
-                    pass
+        for cat_name, found in features.hits(row).items():
+            user_stats[sender][cat_name]['count'] += len(found)
+            if len(user_stats[sender][cat_name]['examples']) < 5:
+                user_stats[sender][cat_name]['examples'].append({
+                    'text': text[:150],
+                    'markers': found,
+                    'date': chat.day_keys[row] or ''
+                })
     
+    return Scan(on_message, partial(render_results, chat, categories, user_stats, features))
+
+
+def render_results(chat, categories, user_stats, features):
+    """Отрисовка итогов после общего прохода по сообщениям"""
     if not user_stats:
         st.success("✅ Токсичных паттернов не обнаружено!")
         return
@@ -247,21 +225,25 @@ def run_plugin(data):
                         else:
                             st.caption(f"{cat_name}: {count}")
     
-    # Динамика по месяцам
-    if len(monthly_stats) > 2:
+    # Динамика по месяцам: маркеры из общего куба отправитель × день
+    n = len(chat)
+    # Как в on_message: сообщения короче 3 символов не учитываются
+    row_totals = features.categories.totals(np.arange(n), n).sum(axis=1) * (chat.text_lengths >= 3)
+    cube = chat.cube
+    month_labels, monthly_totals = cube.rollup(cube.totals(row_totals), 'month')
+    # Месяцы, в которых нашлись маркеры
+    active_months = np.flatnonzero(monthly_totals.sum(axis=0) > 0)
+    if len(active_months) > 2:
         st.markdown("### 📈 Динамика токсичности по месяцам")
         
         import matplotlib.pyplot as plt
         
-        months = sorted(monthly_stats.keys())
+        months = [month_labels[i] for i in active_months]
         
         fig, ax = plt.subplots(figsize=(12, 5))
         
         for user in users:
-            totals = []
-            for month in months:
-                total = sum(monthly_stats[month][user].values())
-                totals.append(total)
+            totals = monthly_totals[chat.user_codes[user], active_months]
             ax.plot(months, totals, marker='o', label=user, linewidth=2)
         
         ax.set_xlabel('Месяц')
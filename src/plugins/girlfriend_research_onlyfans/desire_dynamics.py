@@ -3,13 +3,18 @@ Desire Dynamics 🔥
 Динамика желания и страсти в отношениях.
 Как меняется сексуальный интерес со временем.
 """
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+from tgchatsanalyzer.periodicity import moving_average
+
+DATASETS = ("lexicon_scores",)
+
 
 # Маркеры желания
 DESIRE_MARKERS = {
@@ -39,33 +44,10 @@ REJECTION_MARKERS = {
 }
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+LEXICON = register_lexicon(Lexicon({**DESIRE_MARKERS, 'rejection': REJECTION_MARKERS}))
 
 
-def count_markers(text, markers):
-    text_lower = text.lower()
-    count = 0
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-    return count
-
-
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -84,58 +66,50 @@ def run_plugin(data):
     - ❌ Отторжение — отказы и отмазки
     """)
     
-    # Собираем данные по месяцам
-    monthly_data = defaultdict(lambda: defaultdict(lambda: {
-        'messages': 0,
-        'high': 0,
-        'medium': 0,
-        'low': 0,
-        'rejection': 0,
-    }))
+    # Маркеры по отправителям и дням из общего куба, затем свёртка в месяцы и недели
+    cube = chat.cube
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    counts = cube.totals(features.categories)
+    names = features.category_names
     
-    weekly_data = defaultdict(lambda: defaultdict(lambda: {
-        'desire_score': 0,
-        'messages': 0,
-    }))
+    # Desire score каждого дня
+    weights = np.zeros(len(names))
+    for category, weight in (('high', 3), ('medium', 1.5), ('low', -0.5), ('rejection', -2)):
+        weights[names.index(category)] = weight
+    daily_score = counts @ weights
     
-    for msg in messages:
-        sender = msg.get('from')
-        if not sender:
-            continue
-        
-        text = get_text(msg)
-        if not text:
-            continue
-        
-        try:
-            dt = parse_date(msg['date'])
-            month = dt.strftime('%Y-%m')
-            week = dt.strftime('%Y-W%W')
-        except:
-            continue
-        
-        monthly_data[month][sender]['messages'] += 1
-        weekly_data[week][sender]['messages'] += 1
-        
-        # Считаем маркеры
-        high = count_markers(text, DESIRE_MARKERS['high'])
-        medium = count_markers(text, DESIRE_MARKERS['medium'])
-        low = count_markers(text, DESIRE_MARKERS['low'])
-        rejection = count_markers(text, REJECTION_MARKERS)
-        
-        monthly_data[month][sender]['high'] += high
-        monthly_data[month][sender]['medium'] += medium
-        monthly_data[month][sender]['low'] += low
-        monthly_data[month][sender]['rejection'] += rejection
-        
-        # Desire score
-        desire_score = high * 3 + medium * 1.5 - low * 0.5 - rejection * 2
-        weekly_data[week][sender]['desire_score'] += desire_score
+    month_labels, monthly_messages = cube.rollup(cube.text_messages, 'month')
+    _, monthly_counts = cube.rollup(counts, 'month')
+    week_labels, weekly_messages = cube.rollup(cube.text_messages, 'week')
+    _, weekly_scores = cube.rollup(daily_score, 'week')
+    
+    # Периоды и участники, у которых были сообщения с текстом
+    active_months = np.flatnonzero(monthly_messages.sum(axis=0) > 0)
+    active_weeks = np.flatnonzero(weekly_messages.sum(axis=0) > 0)
+    codes = np.flatnonzero(monthly_messages.sum(axis=1) > 0)
+    
+    monthly_data = {}
+    for i in active_months.tolist():
+        monthly_data[month_labels[i]] = {
+            chat.users[code]: {
+                'messages': int(monthly_messages[code, i]),
+                **{name: int(monthly_counts[code, i, c]) for c, name in enumerate(names)},
+            }
+            for code in codes.tolist() if monthly_messages[code, i]
+        }
+    
+    weekly_data = {}
+    for i in active_weeks.tolist():
+        weekly_data[week_labels[i]] = {
+            chat.users[code]: {
+                'desire_score': float(weekly_scores[code, i]),
+                'messages': int(weekly_messages[code, i]),
+            }
+            for code in codes.tolist() if weekly_messages[code, i]
+        }
     
-    users = set()
-    for month_data in monthly_data.values():
-        users.update(month_data.keys())
-    users = list(users)
+    users = [chat.users[code] for code in codes.tolist()]
     
     if not users:
         st.warning("Не удалось проанализировать.")
@@ -268,7 +242,7 @@ def run_plugin(data):
             
             # Сглаживание
             if len(values) > 3:
-                values_smooth = np.convolve(values, np.ones(3)/3, mode='valid')
+                values_smooth = moving_average(values, 3)
                 ax3.plot(range(len(values_smooth)), values_smooth, linewidth=2, label=user, alpha=0.7)
         
         ax3.axhline(y=0, color='gray', linestyle='--', alpha=0.5)
@@ -3,12 +3,16 @@ Flirt Style Analyzer 😏
 Анализ стиля флирта и соблазнения.
 """
 from collections import defaultdict
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 
 # Стили флирта
 FLIRT_STYLES = {
@@ -77,22 +81,10 @@ def get_text(msg):
     return str(text) if text else ''
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+LEXICON = register_lexicon(Lexicon(FLIRT_STYLES))
 
-def count_markers(text, markers):
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
 
-
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -121,7 +113,10 @@ def run_plugin(data):
         'examples': {style: [] for style in FLIRT_STYLES},
     })
     
-    for msg in messages:
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    for row, msg in enumerate(messages):
         sender = msg.get('from')
         if not sender:
             continue
@@ -132,15 +127,13 @@ def run_plugin(data):
         
         user_stats[sender]['messages'] += 1
         
-        for style, markers in FLIRT_STYLES.items():
-            count, found = count_markers(text, markers)
-            if count > 0:
-                user_stats[sender]['styles'][style] += count
-                if len(user_stats[sender]['examples'][style]) < 5:
-                    user_stats[sender]['examples'][style].append({
-                        'text': text[:100],
-                        'found': found
-                    })
+        for style, found in features.hits(row).items():
+            user_stats[sender]['styles'][style] += len(found)
+            if len(user_stats[sender]['examples'][style]) < 5:
+                user_stats[sender]['examples'][style].append({
+                    'text': text[:100],
+                    'found': found
+                })
     
     users = list(user_stats.keys())
     
@@ -3,12 +3,16 @@ Horny Meter 🔥
 Измеритель уровня возбуждения и сексуального интереса в переписке.
 """
 from collections import defaultdict
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+DATASETS = ("lexicon_scores",)
+
 
 # Прямые сексуальные маркеры (высокий вес)
 EXPLICIT_MARKERS = {
@@ -82,22 +86,14 @@ def get_text(msg):
     return str(text) if text else ''
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def count_markers(text, markers):
-    text_lower = text.lower()
-    count = 0
-    found = []
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-            found.append(marker)
-    return count, found
+LEXICON = register_lexicon(Lexicon({
+    'explicit': EXPLICIT_MARKERS,
+    'flirty': FLIRTY_MARKERS,
+    'romantic': ROMANTIC_MARKERS,
+}))
 
 
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -125,12 +121,10 @@ def run_plugin(data):
         'flirty_examples': [],
     })
     
-    # По времени
-    hourly_horny = defaultdict(lambda: defaultdict(float))
-    daily_horny = defaultdict(float)
-    monthly_horny = defaultdict(lambda: defaultdict(float))
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
     
-    for msg in messages:
+    for row, msg in enumerate(messages):
         sender = msg.get('from')
         if not sender:
             continue
@@ -142,9 +136,12 @@ def run_plugin(data):
         user_stats[sender]['messages'] += 1
         
         # Считаем маркеры
-        explicit_count, explicit_found = count_markers(text, EXPLICIT_MARKERS)
-        flirty_count, flirty_found = count_markers(text, FLIRTY_MARKERS)
-        romantic_count, _ = count_markers(text, ROMANTIC_MARKERS)
+        hits = features.hits(row)
+        explicit_found = hits.get('explicit', [])
+        flirty_found = hits.get('flirty', [])
+        explicit_count = len(explicit_found)
+        flirty_count = len(flirty_found)
+        romantic_count = len(hits.get('romantic', []))
         
         user_stats[sender]['explicit'] += explicit_count
         user_stats[sender]['flirty'] += flirty_count
@@ -162,23 +159,37 @@ def run_plugin(data):
                 'markers': flirty_found
             })
         
-        # Horny score
-        horny_score = explicit_count * 3 + flirty_count * 1.5 + romantic_count * 0.5
-        
-        try:
-            dt = parse_date(msg['date'])
-            hourly_horny[dt.hour][sender] += horny_score
-            daily_horny[dt.date()] += horny_score
-            monthly_horny[dt.strftime('%Y-%m')][sender] += horny_score
-        except:
-            pass
-    
     users = list(user_stats.keys())
     
     if not users:
         st.warning("Не удалось проанализировать.")
         return
     
+    # Horny score каждого сообщения по числу найденных маркеров
+    n = len(chat)
+    names = features.category_names
+    weights = np.zeros(len(names))
+    for category, weight in (('explicit', 3), ('flirty', 1.5), ('romantic', 0.5)):
+        weights[names.index(category)] = weight
+    
+    # По времени: часы — bincount по строкам, месяцы — из общего куба отправитель × день
+    dated = np.flatnonzero(chat.senders[:chat.n_dated] >= 0)
+    row_scores = features.categories.totals(np.arange(n), n)[dated] @ weights
+    n_users = len(chat.users)
+    hourly_horny = np.bincount(
+        chat.hours[dated].astype(np.int64) * n_users + chat.senders[dated],
+        weights=row_scores, minlength=24 * n_users,
+    ).reshape(24, n_users)
+    
+    cube = chat.cube
+    month_labels, monthly_scores = cube.rollup(cube.totals(features.categories) @ weights, 'month')
+    _, monthly_messages = cube.rollup(cube.text_messages, 'month')
+    # Месяцы, в которых были сообщения с текстом
+    active_months = np.flatnonzero(monthly_messages.sum(axis=0) > 0)
+    months = [month_labels[i] for i in active_months]
+    monthly_scores = monthly_scores[:, active_months]
+    codes = chat.user_codes
+    
     # Основная статистика
     st.markdown("### 📊 Статистика по участникам")
     
@@ -256,7 +267,7 @@ def run_plugin(data):
     hours = list(range(24))
     
     for user in users[:2]:
-        values = [hourly_horny[h].get(user, 0) for h in hours]
+        values = hourly_horny[:, codes[user]]
         ax3.plot(hours, values, marker='o', label=user, linewidth=2)
     
     ax3.set_xlabel('Час')
@@ -274,20 +285,18 @@ def run_plugin(data):
     st.pyplot(fig3)
     
     # Находим пиковые часы
-    total_by_hour = [sum(hourly_horny[h].values()) for h in hours]
+    total_by_hour = hourly_horny.sum(axis=1)
     peak_hour = hours[np.argmax(total_by_hour)]
     st.info(f"🔥 Самый горячий час: **{peak_hour}:00**")
     
     # Динамика по месяцам
-    if len(monthly_horny) > 1:
+    if len(months) > 1:
         st.markdown("### 📈 Динамика по месяцам")
         
-        months = sorted(monthly_horny.keys())
-        
         fig4, ax4 = plt.subplots(figsize=(12, 5))
         
         for user in users[:2]:
-            values = [monthly_horny[m].get(user, 0) for m in months]
+            values = monthly_scores[codes[user]]
             ax4.plot(months, values, marker='o', label=user, linewidth=2)
         
         ax4.set_xlabel('Месяц')
@@ -301,7 +310,7 @@ def run_plugin(data):
         
         # Тренд
         for user in users:
-            values = [monthly_horny[m].get(user, 0) for m in months]
+            values = monthly_scores[codes[user]].tolist()
             if len(values) >= 4:
                 first_half = sum(values[:len(values)//2])
                 second_half = sum(values[len(values)//2:])
@@ -11,6 +11,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 import calendar
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+from tgchatsanalyzer.periodicity import daily_series
+
+DATASETS = ("lexicon_scores",)
+
 
 # Интимные маркеры
 INTIMACY_MARKERS = {
@@ -23,33 +29,10 @@ INTIMACY_MARKERS = {
 }
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
-
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+LEXICON = register_lexicon(Lexicon({'intimacy': INTIMACY_MARKERS}))
 
-def count_markers(text, markers):
-    text_lower = text.lower()
-    count = 0
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-    return count
 
-
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -61,21 +44,16 @@ def run_plugin(data):
     st.markdown("Визуализация интимной активности на календаре")
     
     # Собираем данные по дням
-    daily_score = defaultdict(float)
-    
-    for msg in messages:
-        text = get_text(msg)
-        if not text:
-            continue
-        
-        try:
-            dt = parse_date(msg['date'])
-            date_key = dt.date()
-        except:
-            continue
-        
-        score = count_markers(text, INTIMACY_MARKERS)
-        daily_score[date_key] += score
+    n = len(chat)
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    scores = features.categories.totals(np.arange(n), n)[:, 0]
+    has_text = chat.text_lengths > 0
+    
+    # Дневные суммы одним проходом по массивам; в календарь попадают дни с текстом
+    series = daily_series(chat.days, np.column_stack((has_text, scores)), mask=has_text)
+    active = series.values[:, 0] > 0
+    daily_score = dict(zip(series.dates[active].astype(object).tolist(), series.values[active, 1].tolist()))
     
     if not daily_score:
         st.info("Нет данных для отображения.")
@@ -16,13 +16,18 @@ Ovulation Detector 🌡️
 
 Алгоритм ищет циклические паттерны за 28-35 дней периоды.
 """
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+from tgchatsanalyzer.periodicity import daily_series, find_peaks, peak_threshold
+
+DATASETS = ("lexicon_scores",)
+
 
 # Маркеры повышенного либидо / овуляции (с весами)
 HORNY_MARKERS = {
@@ -80,34 +85,36 @@ HIGH_ENERGY_MARKERS = {
 }
 
 
-def get_text(msg):
-    text = msg.get('text', '')
-    if isinstance(text, list):
-        parts = []
-        for part in text:
-            if isinstance(part, str):
-                parts.append(part)
-            elif isinstance(part, dict) and 'text' in part:
-                parts.append(part['text'])
-        return ' '.join(parts)
-    return str(text) if text else ''
+# Веса маркеров суммируются автоматом за один проход
+LEXICON = register_lexicon(Lexicon({
+    'horny': HORNY_MARKERS,
+    'pms': PMS_MARKERS,
+    'energy': HIGH_ENERGY_MARKERS,
+}))
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+# Колонки дневного ряда
+COLUMNS = ('messages', 'chars', 'horny', 'pms', 'energy')
 
 
-def count_markers_weighted(text, markers_dict):
-    """Считает маркеры с учётом весов"""
-    text_lower = text.lower()
-    total = 0
-    for marker, weight in markers_dict.items():
-        if marker in text_lower:
-            total += weight
-    return total
+def compute_plugin(chat):
+    """Дневные ряды маркеров по каждому участнику (выполняется в пуле процессов)"""
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    n = len(chat)
+    scores = features.scores.totals(np.arange(n), n)
+    categories = [features.category_names.index(c) for c in COLUMNS[2:]]
+    
+    values = np.column_stack((np.ones(n), chat.text_lengths, scores[:, categories]))
+    
+    daily_stats = {}
+    for code in np.unique(chat.senders[chat.senders >= 0]).tolist():
+        daily_stats[chat.users[code]] = daily_series(chat.days, values, mask=chat.senders == code)
+    
+    return daily_stats
 
 
-def run_plugin(data):
+def render_plugin(data, chat, result):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -149,67 +156,21 @@ def run_plugin(data):
         peak_window = st.slider("Окно поиска пика (дней)", 5, 15, 10,
                                 help="Пик должен быть максимумом в этом окне")
     
-    # Собираем данные по дням
-    daily_stats = defaultdict(lambda: {
-        'messages': 0,
-        'chars': 0,
-        'horny': 0,
-        'pms': 0,
-        'energy': 0,
-    })
-    
-    for msg in messages:
-        sender = msg.get('from')
-        if sender != target_user:
-            continue
-        
-        try:
-            dt = parse_date(msg['date'])
-            date_key = dt.date()
-        except:
-            continue
-        
-        text = get_text(msg)
-        
-        daily_stats[date_key]['messages'] += 1
-        daily_stats[date_key]['chars'] += len(text)
-        daily_stats[date_key]['horny'] += count_markers_weighted(text, HORNY_MARKERS)
-        daily_stats[date_key]['pms'] += count_markers_weighted(text, PMS_MARKERS)
-        daily_stats[date_key]['energy'] += count_markers_weighted(text, HIGH_ENERGY_MARKERS)
+    # Дневной ряд посчитан заранее по всем участникам: непрерывный, пустые дни — нули
+    series = result.get(target_user)
     
-    if len(daily_stats) < 28:
+    if series is None or (series.values[:, 0] > 0).sum() < 28:
         st.warning("Нужно минимум 28 дней данных для анализа цикла.")
         return
     
-    # Создаём DataFrame с непрерывным индексом дат
-    dates = sorted(daily_stats.keys())
-    all_dates = pd.date_range(start=dates[0], end=dates[-1], freq='D')
+    df = pd.DataFrame(series.values, columns=COLUMNS, index=pd.DatetimeIndex(series.dates, name='date'))
+    df['messages'] = df['messages'].astype(int)
+    df['chars'] = df['chars'].astype(int)
     
-    df_data = []
-    for date in all_dates:
-        date_key = date.date()
-        stats = daily_stats.get(date_key, {'messages': 0, 'chars': 0, 'horny': 0, 'pms': 0, 'energy': 0})
-        
-        # Нормализуем по количеству сообщений (избегаем деления на 0)
-        msg_count = max(stats['messages'], 1)
-        
-        # Индекс либидо: horny + energy - pms, нормализованный
-        raw_libido = stats['horny'] + stats['energy'] * 0.5 - stats['pms'] * 1.5
-        
-        df_data.append({
-            'date': date,
-            'messages': stats['messages'],
-            'chars': stats['chars'],
-            'horny': stats['horny'],
-            'pms': stats['pms'],
-            'energy': stats['energy'],
-            'libido_raw': raw_libido,
-            # Нормализованный индекс (для дней с сообщениями)
-            'libido_norm': raw_libido / np.sqrt(msg_count) if stats['messages'] > 0 else np.nan,
-        })
-    
-    df = pd.DataFrame(df_data)
-    df = df.set_index('date')
+    # Индекс либидо: horny + energy - pms, нормализованный
+    df['libido_raw'] = df['horny'] + df['energy'] * 0.5 - df['pms'] * 1.5
+    # Нормализованный индекс (для дней с сообщениями)
+    df['libido_norm'] = (df['libido_raw'] / np.sqrt(df['messages'].clip(lower=1))).where(df['messages'] > 0)
     
     # Интерполяция пропусков
     df['libido_filled'] = df['libido_norm'].interpolate(method='linear', limit=3)
@@ -246,38 +207,13 @@ def run_plugin(data):
     
     def find_cycle_peaks(values, min_distance=25, window=10):
         """
-        Улучшенный алгоритм поиска пиков цикла.
-        
-        Пик должен быть:
+        Пик цикла должен быть:
         1. Максимумом в окне ±window дней
-        2. Выше 75-го перцентиля
+        2. Выше 70-го перцентиля положительных значений
         3. На расстоянии min_distance от предыдущего пика
         """
-        values = np.array(values)
-        n = len(values)
-        
-        # Порог - 75-й перцентиль положительных значений
-        positive_values = values[values > 0]
-        if len(positive_values) < 10:
-            threshold = np.mean(values) if np.mean(values) > 0 else 0
-        else:
-            threshold = np.percentile(positive_values, 70)
-        
-        peaks = []
-        
-        for i in range(window, n - window):
-            # Проверяем что это локальный максимум в окне
-            left_max = np.max(values[max(0, i-window):i])
-            right_max = np.max(values[i+1:min(n, i+window+1)])
-            
-            if values[i] >= left_max and values[i] >= right_max:
-                # Проверяем порог
-                if values[i] >= threshold:
-                    # Проверяем расстояние от предыдущего пика
-                    if not peaks or (i - peaks[-1]) >= min_distance:
-                        peaks.append(i)
-        
-        return peaks, threshold
+        threshold = peak_threshold(values)
+        return find_peaks(values, window, min_distance, threshold), threshold
     
     # Находим пики
     libido_values = df['libido_smooth'].values
@@ -360,16 +296,14 @@ def run_plugin(data):
     # Тепловая карта по дням месяца
     st.markdown("### 🗓️ Тепловая карта: день месяца vs месяц")
     
-    months = sorted(set(d.strftime('%Y-%m') for d in df.index))
+    # Ряд непрерывный, поэтому месяцы идут подряд от первого до последнего
+    month_codes = df.index.year * 12 + df.index.month - 1
+    month_rows = month_codes - month_codes.min()
+    months = [f"{code // 12}-{code % 12 + 1:02d}" for code in range(month_codes.min(), month_codes.max() + 1)]
     
     if len(months) >= 2:
-        heatmap_data = np.zeros((len(months), 31))
-        heatmap_data[:] = np.nan
-        
-        for date, row in df.iterrows():
-            month_idx = months.index(date.strftime('%Y-%m'))
-            day = date.day - 1
-            heatmap_data[month_idx, day] = row['libido_smooth']
+        heatmap_data = np.full((len(months), 31), np.nan)
+        heatmap_data[month_rows, df.index.day - 1] = df['libido_smooth'].values
         
         fig3, ax3 = plt.subplots(figsize=(14, max(4, len(months) * 0.5)))
         
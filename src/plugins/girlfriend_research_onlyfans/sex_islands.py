@@ -6,12 +6,18 @@ Sex Islands Detector 🏝️
 окружённые "океаном" обычного общения.
 """
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+from tgchatsanalyzer.segments import split_by_gap
+
+DATASETS = ("lexicon_scores",)
+
 
 # Сексуальные маркеры
 SEX_MARKERS = {
@@ -72,20 +78,14 @@ def get_text(msg):
     return str(text) if text else ''
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
+LEXICON = register_lexicon(Lexicon({
+    'sex': SEX_MARKERS,
+    'foreplay': FOREPLAY_MARKERS,
+    'afterglow': AFTERGLOW_MARKERS,
+}))
 
-def count_markers(text, markers):
-    text_lower = text.lower()
-    count = 0
-    for marker in markers:
-        if marker in text_lower:
-            count += 1
-    return count
 
-
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -104,7 +104,12 @@ def run_plugin(data):
     # Собираем данные с точным временем
     messages_data = []
     
-    for msg in messages:
+    datetimes = chat.datetimes
+    hours = chat.hours.tolist()
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    for row, msg in enumerate(messages):
         sender = msg.get('from')
         if not sender:
             continue
@@ -113,14 +118,14 @@ def run_plugin(data):
         if not text:
             continue
         
-        try:
-            dt = parse_date(msg['date'])
-        except:
+        dt = datetimes[row]
+        if dt is None:
             continue
         
-        sex_score = count_markers(text, SEX_MARKERS) * 3
-        foreplay_score = count_markers(text, FOREPLAY_MARKERS) * 1.5
-        afterglow_score = count_markers(text, AFTERGLOW_MARKERS) * 1
+        counts = features.counts(row)
+        sex_score = counts.get('sex', 0) * 3
+        foreplay_score = counts.get('foreplay', 0) * 1.5
+        afterglow_score = counts.get('afterglow', 0) * 1
         
         total_score = sex_score + foreplay_score + afterglow_score
         
@@ -128,7 +133,7 @@ def run_plugin(data):
             messages_data.append({
                 'datetime': dt,
                 'date': dt.date(),
-                'hour': dt.hour,
+                'hour': hours[row],
                 'sender': sender,
                 'text': text[:100],
                 'sex_score': sex_score,
@@ -150,25 +155,16 @@ def run_plugin(data):
     st.markdown("### 🏝️ Обнаруженные острова")
     
     # Группируем сообщения в острова (если между ними < 4 часов)
-    islands = []
-    current_island = []
-    
-    for _, row in df.iterrows():
-        if not current_island:
-            current_island = [row]
-        else:
-            time_diff = (row['datetime'] - current_island[-1]['datetime']).total_seconds() / 3600
-            if time_diff < 4:  # Меньше 4 часов — тот же остров
-                current_island.append(row)
-            else:
-                # Новый остров
-                if len(current_island) >= 2 or sum(r['total_score'] for r in current_island) > 5:
-                    islands.append(current_island)
-                current_island = [row]
-    
-    # Добавляем последний остров
-    if current_island and (len(current_island) >= 2 or sum(r['total_score'] for r in current_island) > 5):
-        islands.append(current_island)
+    timestamps = df['datetime'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    groups = split_by_gap(timestamps, 4 * 3600)
+    group_scores = groups.sums(df['total_score'].to_numpy(dtype=float))
+    keep = (groups.sizes >= 2) | (group_scores > 5)
+    
+    records = df.to_dict('records')
+    islands = [
+        records[lo:hi]
+        for lo, hi in zip(groups.starts[keep].tolist(), groups.stops[keep].tolist())
+    ]
     
     st.info(f"🏝️ Найдено **{len(islands)}** островов секса")
     
@@ -3,13 +3,18 @@ Sexting Analyzer 📱
 Анализ секстинга и интимной переписки.
 """
 from collections import defaultdict
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import re
 
+from tgchatsanalyzer import Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+from tgchatsanalyzer.segments import runs
+
+DATASETS = ("lexicon_scores",)
+
 
 # Паттерны секстинга
 SEXTING_PATTERNS = {
@@ -64,35 +69,24 @@ def get_text(msg):
     return str(text) if text else ''
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+LEXICON = register_lexicon(Lexicon({**SEXTING_PATTERNS, 'emojis': SEXTING_EMOJIS}))
 
 
-def analyze_sexting(text):
-    """Анализирует текст на признаки секстинга"""
-    text_lower = text.lower()
+def analyze_sexting(text, hits=None):
+    """Анализирует текст на признаки секстинга (hits — уже найденные маркеры, если есть)"""
+    if hits is None:
+        hits = LEXICON.hits(text)
     
     scores = {}
     found = {}
     
-    for category, patterns in SEXTING_PATTERNS.items():
-        scores[category] = 0
-        found[category] = []
-        for pattern in patterns:
-            if pattern in text_lower:
-                scores[category] += 1
-                found[category].append(pattern)
-    
-    # Эмодзи
-    emoji_score = 0
-    emoji_found = []
-    for emoji, weight in SEXTING_EMOJIS.items():
-        if emoji in text:
-            emoji_score += weight
-            emoji_found.append(emoji)
-    
-    scores['emojis'] = emoji_score
-    found['emojis'] = emoji_found
+    for category in SEXTING_PATTERNS:
+        found[category] = hits.get(category, [])
+        scores[category] = len(found[category])
+    
+    # Эмодзи (с весами)
+    found['emojis'] = hits.get('emojis', [])
+    scores['emojis'] = sum(SEXTING_EMOJIS[emoji] for emoji in found['emojis'])
     
     # Длинные сообщения с интимным контентом (описания)
     if sum(scores.values()) > 0 and len(text) > 100:
@@ -110,7 +104,7 @@ def analyze_sexting(text):
     }
 
 
-def run_plugin(data):
+def run_plugin(data, chat):
     messages = data.get("messages", [])
     chat_name = data.get("name", "Chat")
     
@@ -132,10 +126,15 @@ def run_plugin(data):
         'examples': [],
     })
     
-    sexting_sessions = []  # Сессии секстинга
-    current_session = []
+    # Сессии секстинга — подряд идущие сообщения с секстингом
+    is_sexting = []
+    session_entries = []
     
-    for msg in messages:
+    datetimes = chat.datetimes
+    # Маркеры лексикона по всем сообщениям (один общий проход на все плагины)
+    features = lexicon_features(chat, LEXICON)
+    
+    for row, msg in enumerate(messages):
         sender = msg.get('from')
         if not sender:
             continue
@@ -146,7 +145,7 @@ def run_plugin(data):
         
         user_stats[sender]['messages'] += 1
         
-        analysis = analyze_sexting(text)
+        analysis = analyze_sexting(text, features.hits(row))
         
         if analysis['is_sexting']:
             user_stats[sender]['sexting_messages'] += 1
@@ -163,25 +162,23 @@ def run_plugin(data):
                 })
             
             # Добавляем в сессию
-            try:
-                dt = parse_date(msg['date'])
-                current_session.append({
-                    'datetime': dt,
-                    'sender': sender,
-                    'score': analysis['total'],
-                    'text': text[:100],
-                })
-            except:
-                pass
+            dt = datetimes[row]
+            session_entries.append({
+                'datetime': dt,
+                'sender': sender,
+                'score': analysis['total'],
+                'text': text[:100],
+            } if dt is not None else None)
         else:
-            # Проверяем завершение сессии
-            if len(current_session) >= 3:
-                sexting_sessions.append(current_session)
-            current_session = []
-    
-    # Добавляем последнюю сессию
-    if len(current_session) >= 3:
-        sexting_sessions.append(current_session)
+            session_entries.append(None)
+        is_sexting.append(analysis['is_sexting'])
+    
+    sexting_sessions = []
+    streaks = runs(np.array(is_sexting, dtype=bool))
+    for lo, hi in zip(streaks.starts.tolist(), streaks.stops.tolist()):
+        session = [entry for entry in session_entries[lo:hi] if entry is not None]
+        if len(session) >= 3:
+            sexting_sessions.append(session)
     
     users = list(user_stats.keys())
     
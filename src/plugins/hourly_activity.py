@@ -1,38 +1,22 @@
-from collections import defaultdict
-from datetime import datetime
+import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
 
 
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
-
-
-def run_plugin(data):
-    messages = data.get("messages", [])
+def run_plugin(data, chat):
     chat_name = data.get("name", "Chat")
 
-    if not messages:
+    if not len(chat):
         st.warning("No messages in chat.")
         return
 
-    # Parse message dates
-    for msg in messages:
-        try:
-            dt = parse_date(msg["date"])
-            msg["parsed_date"] = dt
-            msg["date_only"] = dt.date()
-        except Exception:
-            msg["parsed_date"] = None
-            msg["date_only"] = None
-
-    valid_dates = [msg["date_only"] for msg in messages if msg["date_only"] is not None]
-    if not valid_dates:
+    # Dates come precomputed from the chat store
+    if not chat.n_dated:
         st.warning("No valid dates in messages.")
         return
 
-    min_date = min(valid_dates)
-    max_date = max(valid_dates)
+    min_date = chat.days[0].astype(object)
+    max_date = chat.days[chat.n_dated - 1].astype(object)
 
     st.subheader(f"Hourly Activity — {chat_name}")
 
@@ -59,28 +43,21 @@ def run_plugin(data):
         st.error("Start date cannot be after end date.")
         return
 
-    # Filter messages by date
-    filtered_msgs = [
-        msg
-        for msg in messages
-        if msg["date_only"] is not None and start_date <= msg["date_only"] <= end_date
-    ]
+    # Per-user hourly counts for the range: difference of two prefix sums
+    cube = chat.cube
+    counts_matrix = cube.hourly.between(*cube.day_range(start_date, end_date))
 
-    if not filtered_msgs:
+    if not counts_matrix.any():
         st.warning("No messages in selected date range.")
         return
 
-    # Count activity by hour (shifted to start at 4am)
-    user_hour_counts = defaultdict(lambda: [0] * 24)
-
-    for msg in filtered_msgs:
-        try:
-            sender = msg["from"]
-            hour = msg["parsed_date"].hour
-            shifted_hour = (hour - 4) % 24
-            user_hour_counts[sender][shifted_hour] += 1
-        except Exception:
-            continue
+    # Shift hours to start at 4am
+    counts_matrix = counts_matrix[:, (np.arange(24) + 4) % 24]
+    user_hour_counts = {
+        chat.users[code]: counts_matrix[index].tolist()
+        for index, code in enumerate(cube.senders)
+        if counts_matrix[index].any()
+    }
 
     if not user_hour_counts:
         st.warning("No data for chart.")
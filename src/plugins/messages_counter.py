@@ -1,19 +1,14 @@
-from collections import defaultdict
-
 import streamlit as st
 
 
-def run_plugin(data):
-    messages = data.get("messages", [])
-    if not messages:
+def run_plugin(data, chat):
+    if not len(chat):
         st.warning("No messages in chat.")
         return
 
-    count = defaultdict(int)
-    for msg in messages:
-        if "from" in msg:
-            count[msg["from"]] += 1
+    count = chat.message_counts
 
     st.write("### Messages per User")
-    for user, c in count.items():
-        st.write(f"**{user}**: {c} messages")
+    for code, user in enumerate(chat.users):
+        if count[code]:
+            st.write(f"**{user}**: {count[code]} messages")
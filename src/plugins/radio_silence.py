@@ -1,10 +1,8 @@
-from datetime import datetime
 import streamlit as st
 import pandas as pd
 
-
-def parse_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S")
+from tgchatsanalyzer import to_datetimes
+from tgchatsanalyzer.segments import gap_positions
 
 
 def human_readable_duration(seconds):
@@ -21,28 +19,18 @@ def human_readable_duration(seconds):
         return f"{int(seconds)}s"
 
 
-def run_plugin(data):
-    messages = data.get("messages", [])
+def run_plugin(data, chat):
     chat_name = data.get("name", "Chat")
 
-    if not messages:
+    if not len(chat):
         st.warning("No messages in chat.")
         return
 
     st.subheader(f"Chat Gaps — {chat_name}")
     st.markdown("Periods with **no messages for 30+ hours**.")
 
-    # Sort messages by time
-    messages_sorted = sorted(messages, key=lambda m: m.get("date"))
-
-    # Extract timestamps
-    timestamps = []
-    for msg in messages_sorted:
-        try:
-            dt = parse_date(msg["date"])
-            timestamps.append(dt)
-        except Exception:
-            continue
+    # Timestamps in the chat store are already sorted
+    timestamps = chat.timestamps[: chat.n_dated]
 
     if len(timestamps) < 2:
         st.warning("Not enough messages for analysis.")
@@ -50,22 +38,21 @@ def run_plugin(data):
 
     # Analyze gaps between messages
     SILENCE_THRESHOLD = 30 * 3600  # 30 hours in seconds
-    silence_periods = []
+    gap_ends = gap_positions(timestamps, SILENCE_THRESHOLD)
+    deltas = timestamps[gap_ends] - timestamps[gap_ends - 1]
 
-    for i in range(1, len(timestamps)):
-        prev_time = timestamps[i - 1]
-        curr_time = timestamps[i]
-        delta = (curr_time - prev_time).total_seconds()
-
-        if delta >= SILENCE_THRESHOLD:
-            silence_periods.append(
-                {
-                    "Start": prev_time.strftime("%Y-%m-%d %H:%M"),
-                    "End": curr_time.strftime("%Y-%m-%d %H:%M"),
-                    "Duration": human_readable_duration(delta),
-                    "Seconds": int(delta),
-                }
-            )
+    silence_periods = []
+    starts = to_datetimes(timestamps[gap_ends - 1])
+    ends = to_datetimes(timestamps[gap_ends])
+    for prev_time, curr_time, delta in zip(starts, ends, deltas.tolist()):
+        silence_periods.append(
+            {
+                "Start": prev_time.strftime("%Y-%m-%d %H:%M"),
+                "End": curr_time.strftime("%Y-%m-%d %H:%M"),
+                "Duration": human_readable_duration(delta),
+                "Seconds": int(delta),
+            }
+        )
 
     if not silence_periods:
         st.success("No gaps longer than 30 hours. Chat is active!")
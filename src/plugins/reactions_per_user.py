@@ -1,33 +1,34 @@
 from collections import defaultdict, Counter
+import numpy as np
 import streamlit as st
 import pandas as pd
 
 
-def run_plugin(data):
-    messages = data.get("messages", [])
+def run_plugin(data, chat):
     chat_name = data.get("name", "Chat")
 
-    if not messages:
+    if not len(chat):
         st.warning("No messages to analyze.")
         return
 
     st.subheader(f"Reactions — {chat_name}")
 
-    # Counters
-    total_emoji_counts = Counter()
-    user_emoji_counts = defaultdict(Counter)
-
-    for msg in messages:
-        for reaction in msg.get("reactions", []):
-            emoji = reaction.get("emoji")
-            count = reaction.get("count", 0)
-            total_emoji_counts[emoji] += count
+    # Counters over the reactions table of the chat store
+    emojis = chat.reaction_emojis
+    known = emojis >= 0
+    totals = np.bincount(
+        emojis[known], weights=chat.reaction_amounts[known], minlength=len(chat.emojis)
+    )
+    total_emoji_counts = Counter(
+        {emoji: int(totals[code]) for code, emoji in enumerate(chat.emojis)}
+    )
 
-            # Use recent for user attribution
-            for entry in reaction.get("recent", []):
-                user = entry.get("from")
-                if user and emoji:
-                    user_emoji_counts[user][emoji] += 1
+    # Use recent for user attribution
+    user_emoji_counts = defaultdict(Counter)
+    recent_emojis = emojis[chat.recent_reactions]
+    for user, emoji in zip(chat.recent_users.tolist(), recent_emojis.tolist()):
+        if emoji >= 0:
+            user_emoji_counts[chat.users[user]][chat.emojis[emoji]] += 1
 
     # Top reactions
     st.markdown("### 🔝 Top Reactions")
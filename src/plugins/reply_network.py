@@ -4,18 +4,17 @@ import networkx as nx
 import matplotlib.pyplot as plt
 
 
-def run_plugin(data):
-    messages = data.get("messages", [])
+def run_plugin(data, chat):
     chat_name = data.get("name", "Chat")
 
-    if not messages:
+    if not len(chat):
         st.warning("No messages to analyze.")
         return
 
     st.subheader(f"Reply Network — {chat_name}")
 
     # Get all participants
-    participants = sorted(set(msg.get("from") for msg in messages if msg.get("from")))
+    participants = sorted(chat.participants)
     if not participants:
         st.warning("Could not identify participants.")
         return
@@ -26,28 +25,13 @@ def run_plugin(data):
         st.info("Select at least one user.")
         return
 
-    # Map: message ID -> sender
-    id_to_user = {}
-    for msg in messages:
-        msg_id = msg.get("id")
-        sender = msg.get("from")
-        if msg_id is not None and sender in selected_users:
-            id_to_user[msg_id] = sender
-
-    # Count replies
+    # Count replies (the reply graph is built once per chat)
+    selected = set(selected_users)
     interaction_counts = defaultdict(lambda: defaultdict(int))
-    for msg in messages:
-        sender = msg.get("from")
-        reply_id = msg.get("reply_to_message_id")
-
-        if sender in selected_users and reply_id:
-            replied_user = id_to_user.get(reply_id)
-            if (
-                replied_user
-                and replied_user in selected_users
-                and replied_user != sender
-            ):
-                interaction_counts[sender][replied_user] += 1
+    for source, target, count in chat.reply_graph.edges():
+        sender, replied_user = chat.users[source], chat.users[target]
+        if sender in selected and replied_user in selected:
+            interaction_counts[sender][replied_user] += count
 
     if not interaction_counts:
         st.info("No replies between selected users.")
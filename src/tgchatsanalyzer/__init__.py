@@ -0,0 +1,8 @@
+# TG Chats Analyzer — общая инфраструктура для плагинов
+# Колоночное хранилище сообщений и вспомогательные функции
+
+from tgchatsanalyzer.engine import Scan, run_scan, scan_messages
+from tgchatsanalyzer.lexicon import Hit, Lexicon
+from tgchatsanalyzer.store import ChatStore, ChatStoreBuilder, flatten_text, to_datetimes
+
+__all__ = ["ChatStore", "ChatStoreBuilder", "Hit", "Lexicon", "Scan", "flatten_text", "run_scan", "scan_messages", "to_datetimes"]
@@ -0,0 +1,580 @@
+"""
+Batch Runner
+Запуск плагинов по многим экспортам без Streamlit.
+
+Каждый экспорт загружается через дисковый кэш (ChatCache), плагины
+выполняются так же, как в приложении, но вместо streamlit им подставлен
+записывающий модуль: виджеты возвращают значения по умолчанию, таблицы
+сохраняются в Parquet (или CSV), графики — в PNG, текст и метрики — в
+report.md. Чаты обрабатываются параллельно в пуле процессов:
+
+    python -m tgchatsanalyzer.batch exports/ --out results \\
+        --plugins messages_counter topic_analysis --workers 4
+
+Результат: results/<путь экспорта>/<плагин>/ с файлами плагина,
+summary.json по каждому чату и общий results/summary.json с
+пропускной способностью (чатов в минуту).
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+from tgchatsanalyzer.cache import DEFAULT_CACHE_DIR, ChatCache
+from tgchatsanalyzer.datasets import prepare_datasets
+from tgchatsanalyzer.engine import SCAN_FUNCTION, run_scan
+from tgchatsanalyzer.plugins import import_plugin, inspect_plugin, plugin_module_name
+from tgchatsanalyzer.pool import (
+    DEFAULT_WORKERS,
+    compute_args,
+    compute_function,
+    is_compute_plugin,
+    render_result,
+)
+
+PLUGINS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins")
+FORMATS = ("parquet", "csv")
+
+
+class StopPlugin(Exception):
+    """st.stop() внутри плагина: штатное завершение отрисовки"""
+
+
+class SessionState(dict):
+    """st.session_state: словарь с доступом через атрибуты"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+class Container:
+    """Колонка, вкладка, expander, sidebar: вывод уходит в тот же отчёт"""
+
+    def __init__(self, stub: 'RecordingStreamlit'):
+        self._stub = stub
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._stub, name)
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+class RecordingStreamlit:
+    """
+    Замена модуля streamlit для запуска без приложения.
+    Вывод плагина записывается в каталог, заданный begin().
+    """
+
+    def __init__(self, table_format: str = "parquet"):
+        self.table_format = table_format
+        self.session_state = SessionState()
+        self.sidebar = Container(self)
+        self.begin(None)
+
+    def begin(self, directory: Optional[str]):
+        """Начинает запись вывода очередного плагина в directory"""
+        self.directory = directory
+        self.lines: List[str] = []
+        self.tables: List[str] = []
+        self.figures: List[str] = []
+        self.metrics: Dict[str, str] = {}
+        self.session_state.clear()
+
+    def finish(self):
+        """Сохраняет накопленный текст в report.md"""
+        if self.directory is not None and self.lines:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, "report.md"), "w", encoding="utf-8") as f:
+                f.write("\n\n".join(self.lines) + "\n")
+
+    def _path(self, stem: str, count: int, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{stem}_{count:02d}.{extension}")
+
+    # --- текст ---
+
+    def _text(self, body, prefix: str = ""):
+        self.lines.append(f"{prefix}{body}")
+
+    def markdown(self, body, *args, **kwargs):
+        self._text(body)
+
+    def title(self, body, *args, **kwargs):
+        self._text(body, "# ")
+
+    def header(self, body, *args, **kwargs):
+        self._text(body, "## ")
+
+    def subheader(self, body, *args, **kwargs):
+        self._text(body, "### ")
+
+    def caption(self, body, *args, **kwargs):
+        self._text(body, "_")
+
+    text = code = latex = markdown
+
+    def info(self, body, *args, **kwargs):
+        self._text(body, "ℹ️ ")
+
+    def success(self, body, *args, **kwargs):
+        self._text(body, "✅ ")
+
+    def warning(self, body, *args, **kwargs):
+        self._text(body, "⚠️ ")
+
+    def error(self, body, *args, **kwargs):
+        self._text(body, "❌ ")
+
+    def exception(self, exc, *args, **kwargs):
+        self._text(exc, "❌ ")
+
+    def divider(self, *args, **kwargs):
+        self._text("---")
+
+    def metric(self, label, value, delta=None, *args, **kwargs):
+        self.metrics[str(label)] = str(value)
+        self._text(f"**{label}**: {value}" + (f" ({delta})" if delta is not None else ""))
+
+    def write(self, *args, **kwargs):
+        import pandas as pd
+
+        for arg in args:
+            if isinstance(arg, (pd.DataFrame, pd.Series)):
+                self.dataframe(arg)
+            else:
+                self._text(arg)
+
+    # --- таблицы и графики ---
+
+    def dataframe(self, data=None, *args, **kwargs):
+        import pandas as pd
+
+        if data is None:
+            return Container(self)
+        data = getattr(data, "data", data)  # pandas Styler
+        frame = data.to_frame() if isinstance(data, pd.Series) else pd.DataFrame(data)
+        count = len(self.tables) + 1
+        path = None
+        if self.table_format == "parquet":
+            path = self._path("table", count, "parquet")
+            try:
+                frame.to_parquet(path)
+            except ImportError:
+                # Нет pyarrow: дальше пишем только CSV
+                self.table_format = "csv"
+                path = None
+            except (ValueError, TypeError):
+                # Нестроковые имена колонок или смешанные типы
+                path = None
+        if path is None:
+            path = self._path("table", count, "csv")
+            frame.to_csv(path)
+        self.tables.append(os.path.basename(path))
+        return Container(self)
+
+    table = dataframe
+
+    def pyplot(self, fig=None, *args, **kwargs):
+        import matplotlib.pyplot as plt
+
+        # st.pyplot() и устаревший st.pyplot(plt) рисуют текущую фигуру
+        if fig is None or fig is plt:
+            fig = plt.gcf()
+        path = self._path("figure", len(self.figures) + 1, "png")
+        fig.savefig(path, bbox_inches="tight")
+        plt.close(fig)
+        self.figures.append(os.path.basename(path))
+
+    # --- виджеты: значения по умолчанию ---
+
+    def _widget(self, key, value):
+        if key is None:
+            return value
+        return self.session_state.setdefault(key, value)
+
+    def slider(self, label, min_value=None, max_value=None, value=None, *args, key=None, **kwargs):
+        if value is None:
+            value = min_value if min_value is not None else 0
+        return self._widget(key, value)
+
+    def select_slider(self, label, options=(), value=None, *args, key=None, **kwargs):
+        options = list(options)
+        if value is None and options:
+            value = options[0]
+        return self._widget(key, value)
+
+    def selectbox(self, label, options=(), index=0, *args, key=None, **kwargs):
+        options = list(options)
+        value = options[index] if options and index is not None else None
+        return self._widget(key, value)
+
+    radio = selectbox
+
+    def multiselect(self, label, options=(), default=None, *args, key=None, **kwargs):
+        if default is None:
+            value = []
+        elif isinstance(default, (list, tuple)):
+            value = list(default)
+        else:
+            value = [default]
+        return self._widget(key, value)
+
+    def checkbox(self, label, value=False, *args, key=None, **kwargs):
+        return self._widget(key, value)
+
+    toggle = checkbox
+
+    def number_input(self, label, min_value=None, max_value=None, value="min", *args, key=None, **kwargs):
+        if value == "min" or value is None:
+            value = min_value if min_value is not None else 0.0
+        return self._widget(key, value)
+
+    def text_input(self, label, value="", *args, key=None, **kwargs):
+        return self._widget(key, value)
+
+    text_area = text_input
+
+    def date_input(self, label, value="today", *args, key=None, **kwargs):
+        if value is None or value == "today":
+            value = datetime.date.today()
+        return self._widget(key, value)
+
+    def button(self, *args, **kwargs):
+        return False
+
+    download_button = form_submit_button = button
+
+    def file_uploader(self, *args, **kwargs):
+        return None
+
+    # --- разметка ---
+
+    def columns(self, spec, *args, **kwargs):
+        count = spec if isinstance(spec, int) else len(spec)
+        return [Container(self) for _ in range(count)]
+
+    def tabs(self, labels, *args, **kwargs):
+        return [Container(self) for _ in labels]
+
+    def expander(self, *args, **kwargs):
+        return Container(self)
+
+    container = empty = spinner = form = popover = status = expander
+
+    def progress(self, *args, **kwargs):
+        return Container(self)
+
+    # --- служебное ---
+
+    def stop(self):
+        raise StopPlugin()
+
+    @staticmethod
+    def _decorator(func=None, **kwargs):
+        # @st.cache_data и @st.cache_data(ttl=...): кэширует уже приложение
+        if callable(func):
+            return func
+        return lambda inner: inner
+
+    cache_data = cache_resource = cache = _decorator
+
+    def __getattr__(self, name):
+        # set_page_config, rerun, toast и прочее — без эффекта
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _noop
+
+
+_stub: Optional[RecordingStreamlit] = None
+
+
+def install_stub(table_format: str = "parquet") -> RecordingStreamlit:
+    """
+    Подставляет RecordingStreamlit вместо модуля streamlit (один раз
+    на процесс) и включает безоконный бэкенд matplotlib.
+    Вызывать до импорта плагинов.
+    """
+    global _stub
+    if _stub is None:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        # Эмодзи в подписях: в PNG они просто пропадут
+        warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+        _stub = RecordingStreamlit(table_format)
+        sys.modules["streamlit"] = _stub
+    _stub.table_format = table_format
+    return _stub
+
+
+def discover_plugins(directory: str = PLUGINS_DIR) -> Dict[str, str]:
+    """Плагины каталога (рекурсивно): имя файла без .py -> путь"""
+    plugins = {}
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(("_", ".")))
+        for file_name in sorted(files):
+            if not file_name.endswith(".py") or file_name.startswith("_"):
+                continue
+            path = os.path.join(root, file_name)
+            try:
+                info = inspect_plugin(path)
+            except (OSError, SyntaxError, ValueError):
+                continue
+            if info.entry is not None:
+                plugins.setdefault(info.name, path)
+    return plugins
+
+
+def find_exports(paths: Sequence[str]) -> List[str]:
+    """JSON-файлы экспортов: пути к файлам как есть, каталоги — рекурсивно"""
+    exports = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                exports.extend(
+                    os.path.join(root, file_name)
+                    for file_name in sorted(files)
+                    if file_name.lower().endswith(".json")
+                )
+        else:
+            exports.append(path)
+    return exports
+
+
+def run_plugin(stub: RecordingStreamlit, plugin_path: str, chat, directory: str) -> Dict:
+    """
+    Выполняет один плагин над чатом так же, как приложение, записывая
+    вывод в directory. Возвращает сводку: статус, время, файлы, метрики.
+    """
+    stub.begin(directory)
+    started = time.perf_counter()
+    error = None
+    try:
+        module = import_plugin(plugin_path, plugin_module_name(plugin_path))
+        data = chat.as_data()
+        if is_compute_plugin(module):
+            result = compute_function(module)(chat, *compute_args(module, chat))
+            render_result(module, data, chat, result)
+        elif hasattr(module, SCAN_FUNCTION):
+            run_scan(getattr(module, SCAN_FUNCTION)(data, chat), chat)
+        elif hasattr(module, "run_plugin"):
+            if inspect_plugin(plugin_path).accepts_chat:
+                module.run_plugin(data, chat)
+            else:
+                module.run_plugin(data)
+        else:
+            raise AttributeError("Функция run_plugin не найдена в плагине")
+    except StopPlugin:
+        pass
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        stub.error(f"Ошибка плагина: {exc}")
+        stub.lines.append("```\n" + traceback.format_exc() + "```")
+    finally:
+        import matplotlib.pyplot as plt
+
+        plt.close("all")
+    stub.finish()
+    return {
+        "status": "error" if error else "ok",
+        "error": error,
+        "seconds": round(time.perf_counter() - started, 3),
+        "tables": stub.tables,
+        "figures": stub.figures,
+        "metrics": stub.metrics,
+    }
+
+
+def process_export(
+    export_path: str,
+    plugins: Dict[str, str],
+    directory: str,
+    cache_directory: str = DEFAULT_CACHE_DIR,
+    table_format: str = "parquet",
+) -> Dict:
+    """Загружает один экспорт, выполняет плагины и пишет directory/summary.json"""
+    stub = install_stub(table_format)
+    started = time.perf_counter()
+    summary = {"export": export_path, "plugins": {}}
+    try:
+        with open(export_path, "rb") as f:
+            chat = ChatCache(cache_directory).load(f)
+    except Exception as exc:
+        summary.update(status="error", error=f"Ошибка загрузки: {type(exc).__name__}: {exc}")
+    else:
+        summary["messages"] = len(chat)
+        summary["load_seconds"] = round(time.perf_counter() - started, 3)
+        # Плагины импортируются заранее, чтобы их наборы и лексиконы
+        # посчитались в фоне одним графом; ошибки импорта покажет run_plugin
+        datasets = []
+        for plugin_path in plugins.values():
+            try:
+                import_plugin(plugin_path, plugin_module_name(plugin_path))
+                datasets.extend(inspect_plugin(plugin_path).datasets)
+            except Exception:
+                pass
+        prepare_datasets(chat, datasets)
+        for name, plugin_path in plugins.items():
+            summary["plugins"][name] = run_plugin(
+                stub, plugin_path, chat, os.path.join(directory, name)
+            )
+        failed = [name for name, result in summary["plugins"].items() if result["status"] != "ok"]
+        summary.update(status="error" if failed else "ok", failed=failed)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def _output_directory(out: str, export_path: str, roots: Sequence[str]) -> str:
+    """Каталог результатов: путь экспорта относительно корня без .json"""
+    export_path = os.path.abspath(export_path)
+    relative = os.path.basename(export_path)
+    for root in roots:
+        root = os.path.abspath(root)
+        if os.path.isdir(root) and export_path.startswith(root + os.sep):
+            relative = os.path.relpath(export_path, root)
+            break
+    return os.path.join(out, os.path.splitext(relative)[0])
+
+
+def _init_worker(table_format: str):
+    install_stub(table_format)
+
+
+def run_batch(
+    paths: Sequence[str],
+    plugins: Dict[str, str],
+    out: str,
+    workers: int = DEFAULT_WORKERS,
+    cache_directory: str = DEFAULT_CACHE_DIR,
+    table_format: str = "parquet",
+    log=print,
+) -> Dict:
+    """
+    Обрабатывает все экспорты из paths, по чату на задачу пула процессов
+    (workers=1 — в текущем процессе). Возвращает и сохраняет в
+    out/summary.json общую сводку с пропускной способностью.
+    """
+    exports = find_exports(paths)
+    jobs = [
+        (export_path, plugins, _output_directory(out, export_path, paths), cache_directory, table_format)
+        for export_path in exports
+    ]
+    started = time.perf_counter()
+    summaries = {}
+
+    def report(summary):
+        summaries[summary["export"]] = summary
+        plugins_failed = len(summary.get("failed", []))
+        state = summary.get("error") or f"{len(summary['plugins'])} плагинов, ошибок: {plugins_failed}"
+        log(f"[{len(summaries)}/{len(jobs)}] {summary['export']}: {state} ({summary['seconds']:.1f} с)")
+
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        for job in jobs:
+            report(process_export(*job))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(table_format,)
+        ) as executor:
+            futures = [executor.submit(process_export, *job) for job in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    seconds = time.perf_counter() - started
+    chats_per_minute = len(jobs) / seconds * 60 if seconds > 0 else 0.0
+    total = {
+        "chats": len(jobs),
+        "failed": sorted(export for export, summary in summaries.items() if summary["status"] != "ok"),
+        "plugins": sorted(plugins),
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "chats_per_minute": round(chats_per_minute, 2),
+    }
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(total, f, ensure_ascii=False, indent=2)
+    log(f"Готово: {len(jobs)} чатов за {seconds:.1f} с ({chats_per_minute:.1f} чатов/мин)")
+    return total
+
+
+def select_plugins(names: Optional[Sequence[str]], directory: str = PLUGINS_DIR) -> Dict[str, str]:
+    """Плагины по именам файлов (без .py) или путям; без имён — все встроенные"""
+    available = discover_plugins(directory)
+    if not names:
+        return available
+    selected = {}
+    for name in names:
+        if name.endswith(".py") and os.path.isfile(name):
+            selected[os.path.splitext(os.path.basename(name))[0]] = os.path.abspath(name)
+        elif name in available:
+            selected[name] = available[name]
+        else:
+            raise KeyError(name)
+    return selected
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tgchatsanalyzer.batch",
+        description="Запуск плагинов по экспортам Telegram без Streamlit",
+    )
+    parser.add_argument("paths", nargs="*", help="JSON-файлы экспортов или каталоги с ними")
+    parser.add_argument("--out", default="batch_results", help="каталог результатов")
+    parser.add_argument(
+        "--plugins", nargs="*", metavar="NAME",
+        help="имена плагинов (файл без .py) или пути к файлам; по умолчанию все встроенные",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="процессов в пуле")
+    parser.add_argument("--format", choices=FORMATS, default="parquet", help="формат таблиц")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="каталог кэша чатов")
+    parser.add_argument("--list", action="store_true", help="показать доступные плагины и выйти")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, path in discover_plugins().items():
+            print(f"{name:30s} {inspect_plugin(path).title}")
+        return 0
+    if not args.paths:
+        parser.error("укажите файлы экспортов или каталоги")
+    try:
+        plugins = select_plugins(args.plugins)
+    except KeyError as exc:
+        parser.error(f"плагин {exc.args[0]!r} не найден (см. --list)")
+
+    total = run_batch(
+        args.paths, plugins, args.out,
+        workers=args.workers, cache_directory=args.cache_dir, table_format=args.format,
+    )
+    return 1 if total["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Chat Cache
+Дисковый кэш распарсенных чатов, ключ — хэш содержимого файла.
+
+Каждый чат хранится в отдельной папке: числовые колонки ChatStore —
+в .npy (открываются через memory map), тексты — UTF-8 буфером и
+смещениями TextStore (тоже memory map, без декодирования),
+справочники — в meta.json. Повторное открытие известного экспорта
+стоит отображения файлов в память вместо полного парсинга JSON.
+Размер кэша ограничен, старые записи вытесняются по LRU.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Callable, Optional
+
+import numpy as np
+
+from tgchatsanalyzer.loader import load_chat
+from tgchatsanalyzer.store import ChatStore
+from tgchatsanalyzer.texts import TextStore
+
+# Меняется при изменении набора или формата колонок ChatStore
+FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TGCHATS_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "tgchatsanalyzer"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("TGCHATS_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+HASH_CHUNK = 1 << 20
+
+
+def content_hash(fileobj) -> str:
+    """Хэш содержимого файла (позиция чтения восстанавливается)"""
+    digest = hashlib.blake2b(digest_size=16)
+    start = fileobj.tell()
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(HASH_CHUNK)
+        if not chunk:
+            break
+        digest.update(chunk)
+    fileobj.seek(start)
+    return f"v{FORMAT_VERSION}-{digest.hexdigest()}"
+
+
+class ChatCache:
+    """Кэш ChatStore на диске с ограничением размера и LRU-вытеснением"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[ChatStore]:
+        """Открывает чат из кэша или возвращает None"""
+        entry = self._entry(key)
+        if not os.path.isdir(entry):
+            return None
+        try:
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                columns = json.load(f)
+            for column in ChatStore.ARRAY_COLUMNS:
+                columns[column] = np.load(os.path.join(entry, f"{column}.npy"), mmap_mode="r")
+
+            columns["texts"] = TextStore(
+                np.load(os.path.join(entry, "texts.npy"), mmap_mode="r"),
+                np.load(os.path.join(entry, "text_offsets.npy"), mmap_mode="r"),
+            )
+        except (OSError, ValueError, KeyError):
+            # Повреждённая запись — удаляем и парсим заново
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # Отмечаем использование для LRU
+        os.utime(entry)
+        return ChatStore(**columns)
+
+    def put(self, key: str, chat: ChatStore) -> bool:
+        """Сохраняет чат в кэш (атомарно через временную папку); False — не удалось"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+            try:
+                for column in ChatStore.ARRAY_COLUMNS:
+                    np.save(os.path.join(tmp, f"{column}.npy"), np.asarray(getattr(chat, column)))
+                texts = chat.texts.compact()
+                np.save(os.path.join(tmp, "texts.npy"), texts.buffer)
+                np.save(os.path.join(tmp, "text_offsets.npy"), texts.offsets)
+                meta = {column: getattr(chat, column) for column in ChatStore.META_COLUMNS}
+                with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(tmp, self._entry(key))
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+        except OSError:
+            # Кэш — оптимизация: без места на диске просто работаем без него
+            return False
+        self.evict(keep=key)
+        return True
+
+    def evict(self, keep: Optional[str] = None):
+        """Удаляет давно использованные записи, пока кэш больше лимита"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = self._entry(name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+            )
+            entries.append((os.path.getmtime(path), name, size))
+            total += size
+
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self._entry(name), ignore_errors=True)
+            total -= size
+
+    def load(self, fileobj, progress: Optional[Callable[[float], None]] = None) -> ChatStore:
+        """Возвращает чат из кэша, а при промахе парсит файл и кэширует"""
+        key = content_hash(fileobj)
+        chat = self.get(key)
+        if chat is None:
+            fileobj.seek(0)
+            chat = load_chat(fileobj, progress=progress)
+            # Без записи на диске ключа нет: воркеры пула открыть чат не смогут
+            if not self.put(key, chat):
+                return chat
+        chat.cache_key = key
+        return chat
@@ -0,0 +1,244 @@
+"""
+Activity Cube
+Плотные массивы отправитель × день для календарных и трендовых плагинов.
+
+Плагины, рисующие динамику по дням, неделям и месяцам, раньше
+собирали defaultdict по строковым ключам дат и сортировали ключи.
+Куб считается по колонкам ChatStore одним bincount: строка —
+код отправителя, столбец — день от первого дня переписки, пустые дни —
+нули. Неделя, месяц и день недели получаются сворачиванием оси дней:
+
+    cube = chat.cube
+    months, counts = cube.rollup(cube.messages, 'month')   # counts[code, month]
+    features = lexicon_features(chat, LEXICON)
+    scores = cube.totals(features.categories)              # отправитель × день × категория
+
+Для фильтра по датам есть накопленные по дням суммы: профиль по часам
+за любой диапазон — разность двух срезов, O(отправители × 24) при любой
+длине чата:
+
+    lo, hi = cube.day_range(start_date, end_date)
+    cube.hourly.between(lo, hi)              # cube.senders × час
+    cube.weekday_hourly.between(lo, hi)      # день недели × час
+
+Строки hourly — только писавшие участники: i-я строка относится к коду
+cube.senders[i]. Накопленные суммы хранятся в int32 и занимают
+(дни + 1) × группы × 24 ячеек; если это больше PREFIX_SUMS_MAX_CELLS,
+вместо них считается bincount по строкам диапазона на каждый запрос.
+
+В куб входят сообщения с датой и отправителем.
+"""
+from functools import cached_property
+from typing import List, NamedTuple, Tuple, Union
+
+import numpy as np
+
+from tgchatsanalyzer.features import SparseRows
+
+PERIODS = ('day', 'week', 'month', 'weekday')
+
+# 1 << 25 ячеек int32 — 128 МБ; больше — без накопленных сумм
+PREFIX_SUMS_MAX_CELLS = 1 << 25
+
+
+class Rollup(NamedTuple):
+    """Метки периодов и значения, свёрнутые по оси дней (ось 1)"""
+    labels: List
+    values: np.ndarray
+
+
+class PrefixSums:
+    """
+    Накопленные суммы по первой оси (дни): cumulative[d] — сумма за дни
+    [0, d). Сумма за дни [lo, hi) — разность двух срезов.
+    """
+
+    def __init__(self, cumulative: np.ndarray):
+        self.cumulative = cumulative
+
+    @classmethod
+    def count(cls, days: np.ndarray, keys: np.ndarray, n_days: int, shape: Tuple[int, ...]) -> 'PrefixSums':
+        """
+        Считает вхождения ключей keys (номер ячейки shape) по дням days
+        сразу в буфер накопленных сумм int32 — без плотного int64-тензора
+        и промежуточных копий.
+        """
+        cumulative = np.zeros((n_days + 1,) + shape, dtype=np.int32)
+        cells, counts = np.unique((days + 1) * int(np.prod(shape)) + keys, return_counts=True)
+        cumulative.reshape(-1)[cells] = counts
+        np.cumsum(cumulative, axis=0, out=cumulative)
+        return cls(cumulative)
+
+    def __len__(self):
+        return len(self.cumulative) - 1
+
+    def between(self, lo: int, hi: int) -> np.ndarray:
+        """Сумма за дни [lo, hi); границы обрезаются по длине"""
+        lo = min(max(lo, 0), len(self))
+        hi = min(max(hi, lo), len(self))
+        return self.cumulative[hi] - self.cumulative[lo]
+
+
+class RangeCounts:
+    """
+    Тот же between, что у PrefixSums, но без накопленных сумм: bincount
+    по строкам диапазона на каждый запрос. days должны быть отсортированы.
+    """
+
+    def __init__(self, days: np.ndarray, keys: np.ndarray, n_days: int, shape: Tuple[int, ...]):
+        self.days = days
+        self.keys = keys
+        self.n_days = n_days
+        self.shape = shape
+
+    def __len__(self):
+        return self.n_days
+
+    def between(self, lo: int, hi: int) -> np.ndarray:
+        """Сумма за дни [lo, hi); границы обрезаются по длине"""
+        lo = min(max(lo, 0), len(self))
+        hi = min(max(hi, lo), len(self))
+        i, j = np.searchsorted(self.days, [lo, hi])
+        counts = np.bincount(self.keys[i:j], minlength=int(np.prod(self.shape)))
+        return counts.reshape(self.shape)
+
+
+class ActivityCube:
+    """
+    Отправитель × день: messages — сообщения, text_messages — сообщения
+    с текстом, chars — символы текста. Любая колонка по строкам чата
+    сворачивается в такой же куб через totals.
+    """
+
+    def __init__(self, chat):
+        self.n_rows = len(chat)
+        self.n_users = len(chat.users)
+        self.rows = np.flatnonzero(chat.senders[:chat.n_dated] >= 0)
+        days = chat.days[self.rows]
+        if len(days):
+            self.start = days[0]
+            offsets = (days - self.start).astype(np.int64)
+            self.n_days = int(offsets[-1]) + 1
+        else:
+            self.start = np.datetime64('NaT', 'D')
+            offsets = np.zeros(0, dtype=np.int64)
+            self.n_days = 0
+        self.cells = chat.senders[self.rows].astype(np.int64) * self.n_days + offsets
+        self._text_lengths = chat.text_lengths
+        self._timestamps = chat.timestamps
+
+    @property
+    def shape(self):
+        return self.n_users, self.n_days
+
+    def totals(self, values: Union[np.ndarray, SparseRows]) -> np.ndarray:
+        """
+        Суммы по ячейкам отправитель × день. values — колонка длины
+        len(chat) (результат n_users × n_days) или разреженная матрица
+        строки × колонки, например features.scores (n_users × n_days × колонки).
+        """
+        n_cells = self.n_users * self.n_days
+        if isinstance(values, SparseRows):
+            groups = np.full(self.n_rows, -1, dtype=np.int64)
+            groups[self.rows] = self.cells
+            return values.totals(groups, n_cells).reshape(self.n_users, self.n_days, values.n_columns)
+        values = np.asarray(values)
+        sums = np.bincount(self.cells, weights=values[self.rows], minlength=n_cells)
+        if values.dtype.kind in 'biu':
+            sums = sums.astype(np.int64)
+        return sums.reshape(self.n_users, self.n_days)
+
+    @cached_property
+    def messages(self) -> np.ndarray:
+        return self.totals(np.ones(self.n_rows, dtype=np.int64))
+
+    @cached_property
+    def text_messages(self) -> np.ndarray:
+        return self.totals(self._text_lengths > 0)
+
+    @cached_property
+    def chars(self) -> np.ndarray:
+        return self.totals(self._text_lengths)
+
+    @cached_property
+    def dates(self) -> np.ndarray:
+        """Дни куба как datetime64[D]"""
+        return self.start + np.arange(self.n_days)
+
+    def period_ids(self, period: str):
+        """Номер периода для каждого дня и метки периодов"""
+        days = self.dates
+        if period == 'day':
+            return np.arange(self.n_days), np.datetime_as_string(days).tolist()
+        if period == 'month':
+            months = days.astype('datetime64[M]')
+            if not len(months):
+                return np.zeros(0, dtype=np.int64), []
+            ids = (months - months[0]).astype(np.int64)
+            return ids, np.datetime_as_string(months[0] + np.arange(ids[-1] + 1)).tolist()
+        if period == 'week':
+            # Как strftime('%Y-W%W'): недели с понедельника, неделя 00 — до первого понедельника
+            years = days.astype('datetime64[Y]')
+            year_day = (days - years.astype('datetime64[D]')).astype(np.int64)
+            weeks = (year_day + 7 - self.weekdays) // 7
+            keys = np.char.add(
+                np.char.add(np.datetime_as_string(years), '-W'),
+                np.char.zfill(weeks.astype(str), 2),
+            )
+            labels, ids = np.unique(keys, return_inverse=True)
+            return ids.reshape(-1), labels.tolist()
+        if period == 'weekday':
+            return self.weekdays, list(range(7))
+        raise ValueError(f"Неизвестный период {period!r}, ожидается один из {PERIODS}")
+
+    @cached_property
+    def weekdays(self) -> np.ndarray:
+        """День недели каждого дня куба: 0 — понедельник"""
+        # 1970-01-01 — четверг
+        return (self.dates.astype(np.int64) + 3) % 7
+
+    def day_range(self, start, end) -> Tuple[int, int]:
+        """Дни куба [lo, hi) для дат с start по end включительно"""
+        if not self.n_days:
+            return 0, 0
+        lo = int((np.datetime64(start, 'D') - self.start).astype(np.int64))
+        hi = int((np.datetime64(end, 'D') - self.start).astype(np.int64)) + 1
+        return min(max(lo, 0), self.n_days), min(max(hi, 0), self.n_days)
+
+    @cached_property
+    def hours(self) -> np.ndarray:
+        """Час суток каждой строки куба (как chat.hours)"""
+        return (self._timestamps[self.rows] // 3600 % 24).astype(np.int64)
+
+    @cached_property
+    def senders(self) -> np.ndarray:
+        """Коды участников, у которых есть сообщения в кубе, по возрастанию"""
+        return np.unique(self.cells // max(self.n_days, 1))
+
+    def _day_counts(self, groups: np.ndarray, n_groups: int) -> Union[PrefixSums, RangeCounts]:
+        # День × группа × час; days неубывают — строки куба идут по времени
+        days = self.cells % max(self.n_days, 1)
+        keys = groups * 24 + self.hours
+        if (self.n_days + 1) * n_groups * 24 > PREFIX_SUMS_MAX_CELLS:
+            return RangeCounts(days, keys, self.n_days, (n_groups, 24))
+        return PrefixSums.count(days, keys, self.n_days, (n_groups, 24))
+
+    @cached_property
+    def hourly(self) -> Union[PrefixSums, RangeCounts]:
+        """Сообщения по дням отправитель × час: between(lo, hi) — (len(senders), 24)"""
+        groups = np.searchsorted(self.senders, self.cells // max(self.n_days, 1))
+        return self._day_counts(groups, len(self.senders))
+
+    @cached_property
+    def weekday_hourly(self) -> Union[PrefixSums, RangeCounts]:
+        """Сообщения по дням день недели × час всех отправителей: (7, 24)"""
+        return self._day_counts(self.weekdays[self.cells % max(self.n_days, 1)], 7)
+
+    def rollup(self, values: np.ndarray, period: str) -> Rollup:
+        """Сворачивает ось дней (ось 1) куба values по неделям, месяцам или дням недели"""
+        ids, labels = self.period_ids(period)
+        values = np.asarray(values)
+        moved = np.moveaxis(values, 1, 0)
+        sums = np.zeros((len(labels),) + moved.shape[1:], dtype=values.dtype)
+        np.add.at(sums, ids, moved)
+        return Rollup(labels, np.moveaxis(sums, 0, 1))
@@ -0,0 +1,256 @@
+"""
+Derived Datasets
+Именованные производные данные чата и планировщик их расчёта.
+
+Разные плагины считали одно и то же: ответы со временем реакции,
+разговоры после паузы, маркеры лексиконов. Теперь производные данные
+регистрируются под именем вместе с зависимостями, плагин объявляет, что
+ему нужно, и получает готовый результат:
+
+    DATASETS = ("turn_deltas", "conversation_starts@4h")   # в модуле плагина
+
+    turns = get_dataset(chat, "turn_deltas")
+
+Имя с параметром (sessions@4h) — тот же набор с другим аргументом.
+Приложение собирает DATASETS выбранных плагинов и вызывает
+prepare_datasets: наборы образуют граф (DAG), каждый узел считается в
+пуле потоков, как только готовы его зависимости, независимые узлы —
+одновременно. Результат считается один раз и хранится в самом чате;
+get_dataset до окончания расчёта просто ждёт его.
+
+Свой набор регистрируется декоратором:
+
+    @dataset("reply_pairs", requires=("timeline",))
+    def reply_pairs(chat, timeline):
+        ...
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tgchatsanalyzer.features import lexicon_features, registered_lexicons
+
+DEFAULT_THREADS = int(os.environ.get("TGCHATS_DATASET_THREADS", "0")) or min(os.cpu_count() or 1, 4)
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class Dataset(NamedTuple):
+    """
+    Зарегистрированный набор: func(chat, *зависимости) или, если
+    parametric, func(chat, параметр, *зависимости). В requires
+    параметрического набора {param} заменяется параметром имени.
+    """
+    name: str
+    func: Callable
+    requires: Tuple[str, ...]
+    parametric: bool
+
+
+_registry: Dict[str, Dataset] = {}
+# Кэш чата (словарь имя -> Future) меняется под этим замком
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def dataset(name: str, requires: Iterable[str] = (), parametric: bool = False):
+    """Декоратор: регистрирует функцию как производный набор name"""
+    def register(func: Callable) -> Callable:
+        _registry[name] = Dataset(name, func, tuple(requires), parametric)
+        return func
+    return register
+
+
+def parse_duration(value: str) -> float:
+    """Длительность из параметра имени: 90s, 30m, 4h, 2d или секунды числом"""
+    unit = value[-1:].lower()
+    if unit in DURATION_UNITS:
+        return float(value[:-1]) * DURATION_UNITS[unit]
+    return float(value)
+
+
+def _resolve(name: str) -> Tuple[Dataset, Tuple, Tuple[str, ...]]:
+    """Набор, аргументы функции (параметр) и имена зависимостей"""
+    base, separator, param = name.partition("@")
+    spec = _registry.get(base)
+    if spec is None:
+        raise KeyError(f"Неизвестный набор данных {name!r}")
+    if bool(separator) != spec.parametric:
+        raise ValueError(
+            f"Набор {base!r} " + (f"требует параметр: {base}@..." if spec.parametric else "без параметра")
+        )
+    if spec.parametric:
+        return spec, (param,), tuple(r.format(param=param) for r in spec.requires)
+    return spec, (), spec.requires
+
+
+def plan(names: Iterable[str]) -> List[str]:
+    """
+    Наборы names со всеми зависимостями в порядке расчёта (зависимости
+    раньше). Неизвестное имя — KeyError, цикл — ValueError.
+    """
+    order: List[str] = []
+    state: Dict[str, bool] = {}  # False — в обходе, True — готов
+
+    def visit(name: str, path: Tuple[str, ...]):
+        done = state.get(name)
+        if done:
+            return
+        if done is False:
+            raise ValueError("Цикл в зависимостях наборов: " + " -> ".join(path + (name,)))
+        state[name] = False
+        for requirement in _resolve(name)[2]:
+            visit(requirement, path + (name,))
+        state[name] = True
+        order.append(name)
+
+    for name in names:
+        visit(name, ())
+    return order
+
+
+def _claim(chat, name: str) -> Tuple[Future, bool]:
+    """Future набора в кэше чата и True, если считать его должен вызывающий"""
+    with _lock:
+        cache = chat.__dict__.setdefault("_datasets", {})
+        future = cache.get(name)
+        if future is None:
+            future = cache[name] = Future()
+            return future, True
+        return future, False
+
+
+def _compute(chat, name: str, future: Future):
+    try:
+        spec, args, requires = _resolve(name)
+        inputs = [get_dataset(chat, requirement) for requirement in requires]
+        future.set_result(spec.func(chat, *args, *inputs))
+    except BaseException as exc:
+        # Ошибку получат все ждущие, а следующий запрос попробует снова
+        with _lock:
+            chat.__dict__["_datasets"].pop(name, None)
+        future.set_exception(exc)
+
+
+def get_dataset(chat, name: str):
+    """Набор name для чата: из кэша чата или считается сейчас вместе с зависимостями"""
+    future, owner = _claim(chat, name)
+    if owner:
+        try:
+            plan([name])
+        except (KeyError, ValueError) as exc:
+            with _lock:
+                chat.__dict__["_datasets"].pop(name, None)
+            future.set_exception(exc)
+        else:
+            _compute(chat, name, future)
+    return future.result()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix="dataset")
+        return _executor
+
+
+def prepare_datasets(
+    chat, names: Iterable[str], executor: Optional[ThreadPoolExecutor] = None
+) -> Dict[str, Future]:
+    """
+    Запускает расчёт names и их зависимостей в пуле потоков и сразу
+    возвращает Future по каждому набору графа. Узел уходит в пул, когда
+    готовы все его зависимости. Неизвестные имена пропускаются — ошибку
+    покажет get_dataset в самом плагине.
+    """
+    valid = []
+    for name in dict.fromkeys(names):
+        try:
+            plan([name])
+        except (KeyError, ValueError):
+            continue
+        valid.append(name)
+    executor = executor or _get_executor()
+
+    futures: Dict[str, Future] = {}
+    for name in plan(valid):
+        future, owner = _claim(chat, name)
+        futures[name] = future
+        if not owner:
+            continue
+        waiting = [futures[requirement] for requirement in _resolve(name)[2]]
+        waiting = [dependency for dependency in waiting if not dependency.done()]
+        if not waiting:
+            executor.submit(_compute, chat, name, future)
+            continue
+
+        remaining = [len(waiting)]
+        counter_lock = threading.Lock()
+
+        def on_ready(_, name=name, future=future, remaining=remaining, counter_lock=counter_lock):
+            with counter_lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                executor.submit(_compute, chat, name, future)
+
+        for dependency in waiting:
+            dependency.add_done_callback(on_ready)
+    return futures
+
+
+# --- встроенные наборы ---
+
+@dataset("timeline")
+def timeline(chat):
+    """Сообщения с датой и отправителем (Timeline)"""
+    return chat.timeline
+
+
+@dataset("cube")
+def cube(chat):
+    """Куб отправитель × день (ActivityCube)"""
+    return chat.cube
+
+
+@dataset("turn_deltas", requires=("timeline",))
+def turn_deltas(chat, timeline):
+    """
+    Все ответы чата (смены отправителя): кто ответил, за сколько секунд,
+    месяц и час ответа. Массивы отсортированы по времени ответа, так что
+    любой порог — это префикс.
+    """
+    turns = timeline.turns
+    deltas = timeline.deltas[turns]
+    order = np.argsort(deltas, kind='stable')
+    rows = timeline.rows[turns][order]
+    return {
+        'messages': len(timeline),
+        'deltas': deltas[order],
+        'responders': timeline.senders[turns][order].astype(np.int64),
+        # Месяцы с 1970-01
+        'months': chat.months[rows].astype(np.int64),
+        'hours': chat.hours[rows].astype(np.int64),
+    }
+
+
+@dataset("sessions", requires=("timeline",), parametric=True)
+def sessions(chat, pause, timeline):
+    """Разговоры: индексы Timeline, новый начинается после паузы не меньше pause"""
+    return timeline.sessions(parse_duration(pause))
+
+
+@dataset("conversation_starts", requires=("timeline", "sessions@{param}"), parametric=True)
+def conversation_starts(chat, pause, timeline, sessions):
+    """Сколько разговоров начал каждый участник (по кодам отправителей)"""
+    return np.bincount(timeline.senders[sessions.starts], minlength=len(chat.users))
+
+
+@dataset("lexicon_scores")
+def lexicon_scores(chat):
+    """Маркеры всех зарегистрированных лексиконов за один проход"""
+    return {lexicon: lexicon_features(chat, lexicon) for lexicon in registered_lexicons()}
@@ -0,0 +1,76 @@
+"""
+Scan Engine
+Один проход по сообщениям на все выбранные плагины.
+
+Плагин с функцией scan_plugin(data, chat) вместо run_plugin делится на
+две части: подготовка (заголовок, виджеты, пустая статистика) и
+возвращаемый Scan с обработчиком одного сообщения (map) и отрисовкой
+результата (reduce/render). Движок вызывает обработчики всех плагинов
+в одном цикле по строкам ChatStore, так что двенадцать плагинов стоят
+одного обхода чата, а не двенадцати.
+
+    def scan_plugin(data, chat):
+        st.subheader("Мой анализ")
+        counts = defaultdict(int)
+
+        def on_message(row, sender, text):
+            if sender:
+                counts[sender] += 1
+
+        def render():
+            st.write(dict(counts))
+
+        return Scan(on_message, render)
+"""
+from typing import Callable, Iterable, NamedTuple, Optional
+
+SCAN_FUNCTION = "scan_plugin"
+
+
+class Scan(NamedTuple):
+    """
+    Подписка плагина на общий проход.
+
+    on_message(row, sender, text) вызывается для каждой строки ChatStore
+    по порядку времени: sender — имя отправителя или None, text —
+    склеенный текст. Остальные колонки доступны через chat по row.
+    render() вызывается после прохода и выводит результат.
+    """
+    on_message: Callable[[int, Optional[str], str], None]
+    render: Callable[[], None]
+
+
+def scan_messages(
+    chat,
+    handlers: Iterable[Callable[[int, Optional[str], str], None]],
+    on_error: Optional[Callable[[Callable, Exception], None]] = None,
+):
+    """
+    Прогоняет все строки чата через обработчики за один проход.
+    Если задан on_error, упавший обработчик отключается до конца прохода,
+    а остальные продолжают работу; иначе исключение пробрасывается.
+    """
+    active = list(handlers)
+    if not active:
+        return
+    users = chat.users
+    for row, (code, text) in enumerate(zip(chat.senders.tolist(), chat.texts)):
+        sender = users[code] if code >= 0 else None
+        for handler in active:
+            try:
+                handler(row, sender, text)
+            except Exception as exc:
+                if on_error is None:
+                    raise
+                on_error(handler, exc)
+                active = [h for h in active if h is not handler]
+        if not active:
+            return
+
+
+def run_scan(scan: Optional[Scan], chat):
+    """Выполняет один scan-плагин отдельно от остальных"""
+    if scan is None:
+        return
+    scan_messages(chat, [scan.on_message])
+    scan.render()
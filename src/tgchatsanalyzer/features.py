@@ -0,0 +1,215 @@
+"""
+Lexicon Features
+Маркеры всех лексиконов по всем сообщениям чата за один проход.
+
+Каждый лексиконный плагин раньше сам приводил к нижнему регистру и
+сканировал каждое сообщение своим автоматом. Теперь плагин регистрирует
+лексикон при импорте, а при первом обращении к чату все
+зарегистрированные лексиконы собираются в один автомат и проходят по
+текстам один раз. Результат — разреженные матрицы сообщение × маркер и
+сообщение × категория (CSR на NumPy), общие для всех плагинов:
+
+    LEXICON = register_lexicon(Lexicon(CATEGORIES))
+
+    features = lexicon_features(chat, LEXICON)
+    features.hits(row)          # как LEXICON.hits(chat.texts[row])
+    features.categories.totals(chat.senders, len(chat.users))  # по отправителям
+"""
+import threading
+import weakref
+from array import array
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from tgchatsanalyzer.lexicon import Lexicon
+
+# Лексиконы загруженных плагинов; выгруженный модуль забирает свой с собой
+_registry: 'weakref.WeakSet[Lexicon]' = weakref.WeakSet()
+_lock = threading.Lock()
+# Проход по текстам чата один, даже если маркеры запросили из нескольких потоков
+_extract_lock = threading.Lock()
+
+
+def register_lexicon(lexicon: Lexicon) -> Lexicon:
+    """Добавляет лексикон в общий проход по чатам и возвращает его же"""
+    with _lock:
+        _registry.add(lexicon)
+    return lexicon
+
+
+def registered_lexicons() -> List[Lexicon]:
+    """Лексиконы, которые войдут в общий проход"""
+    with _lock:
+        return list(_registry)
+
+
+class SparseRows(NamedTuple):
+    """
+    Разреженная матрица строки сообщений × колонки в формате CSR:
+    значения строки row — values[indptr[row]:indptr[row + 1]] в колонках
+    columns с тем же срезом.
+    """
+    indptr: np.ndarray
+    columns: np.ndarray
+    values: np.ndarray
+    n_columns: int
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def row(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = self.indptr[row], self.indptr[row + 1]
+        return self.columns[lo:hi], self.values[lo:hi]
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Номер строки для каждого ненулевого элемента"""
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+    def totals(self, groups: np.ndarray, n_groups: int) -> np.ndarray:
+        """
+        Суммы по группам строк (например, отправителям или месяцам):
+        плотная матрица n_groups × n_columns, строки с группой -1 пропускаются.
+        """
+        groups = np.asarray(groups)[self.rows]
+        keep = groups >= 0
+        keys = groups[keep].astype(np.int64) * self.n_columns + self.columns[keep]
+        sums = np.bincount(
+            keys, weights=self.values[keep], minlength=n_groups * self.n_columns
+        )
+        return sums.reshape(n_groups, self.n_columns)
+
+    def column_totals(self) -> np.ndarray:
+        return np.bincount(self.columns, weights=self.values, minlength=self.n_columns)
+
+
+def _csr(rows: np.ndarray, columns: np.ndarray, values: np.ndarray, n_rows: int, n_columns: int):
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return SparseRows(indptr, columns, values, n_columns)
+
+
+class LexiconFeatures:
+    """
+    Маркеры одного лексикона по сообщениям чата.
+
+    markers — сообщение × маркер (1, если маркер встретился; маркеры
+    строки идут в порядке первого вхождения), categories — сообщение ×
+    категория с числом разных маркеров (как Lexicon.counts), scores —
+    та же разреженность с суммой весов (как Lexicon.score).
+    """
+
+    def __init__(self, lexicon: Lexicon, markers: SparseRows):
+        self.lexicon = lexicon
+        self.markers = markers
+        self.category_names: Tuple[Hashable, ...] = lexicon.categories
+        category_ids = {name: i for i, name in enumerate(self.category_names)}
+
+        # Пары (маркер, категория, вес) в порядке маркеров
+        pair_counts = []
+        pair_categories = []
+        pair_weights = []
+        for targets in lexicon._targets:
+            pair_counts.append(len(targets))
+            for category, weight in targets:
+                pair_categories.append(category_ids[category])
+                pair_weights.append(weight)
+        pair_counts = np.array(pair_counts, dtype=np.int64)
+        pair_starts = np.cumsum(pair_counts) - pair_counts
+        pair_categories = np.array(pair_categories, dtype=np.int64)
+        pair_weights = np.array(pair_weights, dtype=np.float64)
+
+        # Раскрываем каждое вхождение маркера во все его категории
+        repeats = pair_counts[markers.columns]
+        pairs = np.repeat(pair_starts[markers.columns], repeats)
+        pairs += np.arange(len(pairs)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        rows = np.repeat(markers.rows, repeats)
+
+        n_categories = len(self.category_names)
+        keys, inverse = np.unique(rows * n_categories + pair_categories[pairs], return_inverse=True)
+        key_rows, key_columns = np.divmod(keys, max(n_categories, 1))
+        n_rows = len(markers)
+        self.categories = _csr(
+            key_rows, key_columns, np.bincount(inverse, minlength=len(keys)), n_rows, n_categories
+        )
+        self.scores = _csr(
+            key_rows, key_columns,
+            np.bincount(inverse, weights=pair_weights[pairs], minlength=len(keys)),
+            n_rows, n_categories,
+        )
+
+    def hits(self, row: int) -> Dict[Hashable, List[str]]:
+        """Найденные маркеры по категориям (как Lexicon.hits для текста строки)"""
+        lexicon = self.lexicon
+        result: Dict[Hashable, List[str]] = {}
+        for marker_id in self.markers.row(row)[0].tolist():
+            marker = lexicon._markers[marker_id]
+            for category, _ in lexicon._targets[marker_id]:
+                result.setdefault(category, []).append(marker)
+        return result
+
+    def counts(self, row: int) -> Dict[Hashable, int]:
+        """Число разных маркеров по категориям (как Lexicon.counts)"""
+        columns, values = self.categories.row(row)
+        names = self.category_names
+        return {names[c]: v for c, v in zip(columns.tolist(), values.tolist())}
+
+    def score(self, row: int) -> Dict[Hashable, float]:
+        """Сумма весов найденных маркеров по категориям (как Lexicon.score)"""
+        columns, values = self.scores.row(row)
+        names = self.category_names
+        return {names[c]: v for c, v in zip(columns.tolist(), values.tolist())}
+
+
+def _extract(texts, lexicons: List[Lexicon]) -> List[SparseRows]:
+    """Один проход общим автоматом, затем разбор по лексиконам"""
+    merged = Lexicon({i: lexicon._markers for i, lexicon in enumerate(lexicons)})
+    # Номер маркера общего автомата -> номер в каждом лексиконе (-1, если его там нет)
+    local_ids = []
+    for lexicon in lexicons:
+        ids = {marker: i for i, marker in enumerate(lexicon._markers)}
+        local_ids.append(np.array([ids.get(m, -1) for m in merged._markers], dtype=np.int64))
+
+    rows = array('q')
+    markers = array('q')
+    for row, text in enumerate(texts):
+        if not text:
+            continue
+        found = merged._distinct(text)
+        if found:
+            rows.extend([row] * len(found))
+            markers.extend(found)
+
+    rows = np.frombuffer(rows, dtype=np.int64)
+    markers = np.frombuffer(markers, dtype=np.int64)
+    result = []
+    for lexicon, local in zip(lexicons, local_ids):
+        columns = local[markers] if len(local) else np.zeros(0, dtype=np.int64)
+        keep = columns >= 0
+        result.append(_csr(
+            rows[keep], columns[keep], np.ones(int(keep.sum()), dtype=np.int64),
+            len(texts), len(lexicon),
+        ))
+    return result
+
+
+def lexicon_features(chat, lexicon: Lexicon) -> LexiconFeatures:
+    """
+    Маркеры лексикона по сообщениям чата. При первом обращении за
+    один проход считаются все зарегистрированные и ещё не посчитанные
+    для этого чата лексиконы.
+    """
+    cache = chat.__dict__.setdefault('_lexicon_features', weakref.WeakKeyDictionary())
+    features = cache.get(lexicon)
+    if features is None:
+        with _extract_lock:
+            features = cache.get(lexicon)
+            if features is None:
+                pending = [lex for lex in registered_lexicons() if lex not in cache]
+                if lexicon not in pending:
+                    pending.append(lexicon)
+                for lex, markers in zip(pending, _extract(chat.texts, pending)):
+                    cache[lex] = LexiconFeatures(lex, markers)
+                features = cache[lexicon]
+    return features
@@ -0,0 +1,154 @@
+"""
+Lexicon Matcher
+Поиск маркеров из словарей плагинов за один проход по тексту.
+
+Плагины хранят лексиконы как {категория: набор маркеров} или
+{категория: {маркер: вес}} и раньше проверяли каждый маркер через
+`marker in text_lower` — O(маркеров × длина текста) на сообщение.
+Lexicon один раз собирает из всех категорий автомат Ахо–Корасик и
+находит все вхождения всех маркеров одним проходом по тексту.
+
+Семантика совпадает со старыми count_markers/find_markers: маркер ищется
+как подстрока в тексте, приведённом к нижнему регистру, и засчитывается
+один раз на сообщение, сколько бы раз ни встретился.
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+Markers = Union[Iterable[str], Mapping]
+
+
+class Hit(NamedTuple):
+    """Одно вхождение маркера (start — позиция в тексте в нижнем регистре)"""
+    category: str
+    marker: str
+    weight: float
+    start: int
+
+
+class Lexicon:
+    """
+    Скомпилированный набор категорий маркеров.
+
+    Собирается один раз (обычно на уровне модуля плагина) и дальше
+    используется для всех сообщений:
+
+        LEXICON = Lexicon({'positive': POSITIVE, 'negative': NEGATIVE})
+        LEXICON.hits(text)    # {'positive': ['люблю', ...], ...}
+        LEXICON.score(text)   # {'positive': 2.0, ...} — сумма весов
+        LEXICON.find(text)    # все вхождения с позициями
+    """
+
+    def __init__(self, categories: Mapping):
+        self.categories: Tuple[str, ...] = tuple(categories)
+
+        self._markers: List[str] = []
+        # Для каждого маркера — категории, в которых он есть, и веса
+        self._targets: List[List[Tuple[str, float]]] = []
+        marker_ids: Dict[str, int] = {}
+
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for category, markers in categories.items():
+            weights = markers if isinstance(markers, Mapping) else dict.fromkeys(markers, 1)
+            for marker, weight in weights.items():
+                if not marker:
+                    continue
+                marker_id = marker_ids.get(marker)
+                if marker_id is None:
+                    marker_id = marker_ids[marker] = len(self._markers)
+                    self._markers.append(marker)
+                    self._targets.append([])
+
+                    state = 0
+                    for ch in marker:
+                        nxt = goto[state].get(ch)
+                        if nxt is None:
+                            nxt = goto[state][ch] = len(goto)
+                            goto.append({})
+                            out.append([])
+                        state = nxt
+                    out[state].append(marker_id)
+                self._targets[marker_id].append((category, weight))
+
+        self._compile(goto, out)
+
+    def _compile(self, goto: List[Dict[str, int]], out: List[List[int]]):
+        """
+        Достраивает суффиксные ссылки и превращает бор в автомат.
+
+        Переходы хранятся разреженно: в _delta[state] лежат только те,
+        что ведут не туда же, куда переход из корня. Иначе сканер
+        берёт переход из корня (или сбрасывается в корень).
+        """
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+
+        queue = list(root.values())
+        for state in queue:
+            fallback = fail[state]
+            # Наследуем переходы суффикса и дополняем своими
+            delta[state] = {**delta[fallback], **goto[state]} if fallback else dict(goto[state])
+            for ch, child in goto[state].items():
+                # Суффиксная ссылка ребёнка: переход из суффикса родителя
+                target = delta[fallback].get(ch)
+                fail[child] = target if target is not None else root.get(ch, 0)
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+
+        self._root = root
+        self._delta = delta
+        self._out = [tuple(ids) for ids in out]
+
+    def __len__(self):
+        return len(self._markers)
+
+    def _scan(self, text_lower: str) -> List[Tuple[int, int]]:
+        """Все вхождения как (позиция конца, id маркера)"""
+        root_get = self._root.get
+        delta, out = self._delta, self._out
+        found = []
+        state = 0
+        for end, ch in enumerate(text_lower):
+            nxt = delta[state].get(ch)
+            state = nxt if nxt is not None else root_get(ch, 0)
+            if out[state]:
+                for marker_id in out[state]:
+                    found.append((end, marker_id))
+        return found
+
+    def _distinct(self, text: str) -> List[int]:
+        """id найденных маркеров без повторов, в порядке первого вхождения"""
+        return list(dict.fromkeys(marker_id for _, marker_id in self._scan(text.lower())))
+
+    def find(self, text: str) -> List[Hit]:
+        """Все вхождения всех маркеров, упорядоченные по концу вхождения"""
+        hits = []
+        for end, marker_id in self._scan(text.lower()):
+            marker = self._markers[marker_id]
+            start = end - len(marker) + 1
+            for category, weight in self._targets[marker_id]:
+                hits.append(Hit(category, marker, weight, start))
+        return hits
+
+    def hits(self, text: str) -> Dict[str, List[str]]:
+        """Найденные маркеры по категориям (каждый маркер один раз)"""
+        result: Dict[str, List[str]] = {}
+        for marker_id in self._distinct(text):
+            marker = self._markers[marker_id]
+            for category, _ in self._targets[marker_id]:
+                result.setdefault(category, []).append(marker)
+        return result
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Число разных маркеров по категориям"""
+        return {category: len(found) for category, found in self.hits(text).items()}
+
+    def score(self, text: str) -> Dict[str, float]:
+        """Сумма весов найденных маркеров по категориям"""
+        result: Dict[str, float] = {}
+        for marker_id in self._distinct(text):
+            for category, weight in self._targets[marker_id]:
+                result[category] = result.get(category, 0) + weight
+        return result
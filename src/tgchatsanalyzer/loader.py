@@ -0,0 +1,164 @@
+"""
+Streaming Loader
+Потоковая загрузка экспорта Telegram (result.json) без json.load.
+
+Массив "messages" читается по одному сообщению: каждое сообщение
+декодируется, проецируется в колонки ChatStoreBuilder и сразу
+отбрасывается. Пиковая память определяется колонками, а не полным
+деревом словарей.
+"""
+import codecs
+import json
+import os
+from typing import Callable, Dict, Iterator, Optional
+
+from tgchatsanalyzer.store import ChatStore, ChatStoreBuilder
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789.eE+-'
+
+_decoder = json.JSONDecoder()
+
+
+class _StreamReader:
+    """Буфер над бинарным файлом с инкрементальным декодированием UTF-8"""
+
+    def __init__(self, fileobj, chunk_size: int, progress: Optional[Callable[[float], None]]):
+        self._file = fileobj
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+        self._total = _remaining_size(fileobj)
+        self._read_bytes = 0
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Дочитывает следующий кусок; False, если файл закончился"""
+        if self.eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self._read_bytes += len(chunk)
+        if not chunk:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self._utf8.decode(b'', final=True)
+        else:
+            # Отбрасываем уже разобранную часть буфера
+            self.buf = self.buf[self.pos:] + self._utf8.decode(chunk)
+        self.pos = 0
+        if self._progress and self._total:
+            self._progress(min(1.0, self._read_bytes / self._total))
+        return True
+
+    def skip_ws(self):
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_ws()
+        return self.buf[self.pos] if self.pos < len(self.buf) else ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            found = self.buf[self.pos:self.pos + 20] or 'конец файла'
+            raise ValueError(f"Ожидался '{char}', найдено: {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Декодирует одно JSON-значение, дочитывая файл при необходимости"""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # Число на границе куска может быть обрезано (после '.' или 'e'
+                # raw_decode вернёт только начало) — нужен символ не из числа
+                if self.eof or (end < len(self.buf) and self.buf[end] not in NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def _remaining_size(fileobj) -> int:
+    try:
+        start = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        end = fileobj.tell()
+        fileobj.seek(start)
+        return end - start
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def iter_export(
+    fileobj,
+    header: Dict,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Iterator[Dict]:
+    """
+    Потоково обходит экспорт чата и выдаёт сообщения из массива "messages".
+    Остальные поля верхнего уровня (name, type, id, ...) складываются в header.
+    """
+    reader = _StreamReader(fileobj, chunk_size, progress)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError('Ожидался ключ объекта')
+        reader.expect(':')
+
+        if key == 'messages' and reader.peek() == '[':
+            reader.pos += 1
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    msg = reader.value()
+                    if isinstance(msg, dict):
+                        yield msg
+                    sep = reader.peek()
+                    reader.pos += 1
+                    if sep == ']':
+                        break
+                    if sep != ',':
+                        raise ValueError("Ожидался ',' или ']' в списке сообщений")
+        else:
+            header[key] = reader.value()
+
+        sep = reader.peek()
+        reader.pos += 1
+        if sep == '}':
+            return
+        if sep != ',':
+            raise ValueError("Ожидался ',' или '}' в объекте экспорта")
+
+
+def load_chat(
+    fileobj,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[float], None]] = None,
+) -> ChatStore:
+    """
+    Загружает экспорт Telegram прямо в ChatStore, не держа в памяти
+    весь JSON. progress получает долю прочитанного файла от 0 до 1.
+    """
+    header: Dict = {}
+    builder = ChatStoreBuilder()
+    for msg in iter_export(fileobj, header, chunk_size, progress):
+        builder.add(msg)
+    return builder.build(header.get('name', 'Chat'), header)
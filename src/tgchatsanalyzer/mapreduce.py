@@ -0,0 +1,90 @@
+"""
+Chunked Map-Reduce
+Агрегация по диапазонам строк чата в нескольких процессах.
+
+Плагин описывает агрегат как функцию модуля mapper(chat, lo, hi),
+которая считает частичный результат по строкам [lo, hi): Counter,
+словарь сумм, массив NumPy или их вложенные словари. map_reduce режет
+чат на чанки, раздаёт их воркерам пула (колонки воркеры открывают из
+дискового кэша) и складывает частичные результаты через merge:
+
+    def count_chunk(chat, lo, hi):
+        return Counter(chat.senders[lo:hi].tolist())
+
+    counts = map_reduce(chat, count_chunk)
+
+Небольшие чаты (один чанк), чаты без записи в кэше и вызовы внутри
+воркера считаются последовательно в текущем процессе. Если запись
+исчезла из кэша уже после отправки, чанк досчитывается здесь же.
+"""
+import os
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from tgchatsanalyzer.pool import ChatNotCached, PluginPool, get_default_pool
+
+DEFAULT_CHUNK_ROWS = int(os.environ.get("TGCHATS_CHUNK_ROWS", "200000"))
+
+
+def chunk_bounds(n_rows: int, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> List[Tuple[int, int]]:
+    """Диапазоны [lo, hi) примерно равной длины, не длиннее chunk_rows"""
+    chunks = max(1, -(-n_rows // max(chunk_rows, 1)))
+    edges = np.linspace(0, n_rows, chunks + 1).astype(int).tolist()
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def merge(left, right):
+    """
+    Складывает два частичных результата.
+    Counter и числа суммируются, массивы — поэлементно, списки
+    склеиваются, словари сливаются по ключам рекурсивно, у объектов
+    с методом merge (например, TokenCounts) вызывается left.merge(right).
+    """
+    if hasattr(left, 'merge'):
+        return left.merge(right)
+    if isinstance(left, Counter):
+        left.update(right)
+        return left
+    if isinstance(left, dict):
+        for key, value in right.items():
+            left[key] = merge(left[key], value) if key in left else value
+        return left
+    if isinstance(left, list):
+        return left + right
+    if isinstance(left, (np.ndarray, int, float, np.number)):
+        return left + right
+    raise TypeError(f"Не умею складывать {type(left).__name__}")
+
+
+def _chunk_result(future, mapper: Callable, chat, lo: int, hi: int):
+    """Частичный результат из пула или, если посчитать там не вышло, здесь же"""
+    if future is not None:
+        try:
+            return future.result()
+        except ChatNotCached:
+            pass
+    return mapper(chat, lo, hi)
+
+
+def map_reduce(
+    chat,
+    mapper: Callable,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    pool: Optional[PluginPool] = None,
+):
+    """Считает mapper по чанкам чата (в пуле, если он есть) и сливает результаты"""
+    bounds = chunk_bounds(len(chat), chunk_rows)
+    pool = pool or get_default_pool()
+
+    futures = None
+    if pool is not None and len(bounds) > 1:
+        futures = [pool.submit_chunk(mapper, chat, lo, hi) for lo, hi in bounds]
+
+    result = None
+    for index, (lo, hi) in enumerate(bounds):
+        future = futures[index] if futures else None
+        part = _chunk_result(future, mapper, chat, lo, hi)
+        result = part if index == 0 else merge(result, part)
+    return result
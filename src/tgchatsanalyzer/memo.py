@@ -0,0 +1,174 @@
+"""
+Result Memo
+Запоминание результатов расчётов плагинов между перезапусками скрипта.
+
+Любой виджет Streamlit перезапускает весь скрипт, и без кэша каждый
+выбранный плагин заново считает свои данные. Результат запоминается
+по ключу (хэш чата, хэш файла с функцией, имя функции, параметры):
+
+    stats = memoize(chat, collect_stats, max_hours)
+
+Пересчитывается только плагин, у которого поменялся вход: другой чат,
+правка кода плагина или новое значение его слайдера. Записи хранятся в
+памяти с LRU-ограничением, а при заданной папке — ещё и на диске (для
+чатов из дискового кэша, у которых есть хэш содержимого).
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("TGCHATS_MEMO_ENTRIES", "64"))
+DEFAULT_MEMO_DIR = os.environ.get("TGCHATS_MEMO_DIR") or None
+
+_MISSING = object()
+
+# Хэши исходников по (путь, mtime, размер): файл читается один раз
+_source_hashes = {}
+
+
+def source_hash(func: Callable) -> str:
+    """Хэш содержимого файла, в котором определена функция"""
+    path = getattr(sys.modules.get(func.__module__), "__file__", None)
+    if not path:
+        return func.__module__
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return func.__module__
+    stamp = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _source_hashes.get(stamp)
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+        _source_hashes[stamp] = digest
+    return digest
+
+
+def chat_key(chat) -> Tuple[str, bool]:
+    """
+    Ключ чата и можно ли хранить его результаты на диске.
+    Без хэша содержимого чат различается только в пределах процесса.
+    """
+    key = getattr(chat, "cache_key", None)
+    if key:
+        return key, True
+    # id() может достаться новому чату после сборки старого, поэтому метка
+    token = getattr(chat, "_memo_token", None)
+    if token is None:
+        token = chat._memo_token = uuid.uuid4().hex
+    return token, False
+
+
+def memo_key(chat, func: Callable, params: Tuple = ()) -> Tuple[str, bool]:
+    """Ключ результата func(chat, *params)"""
+    key, persistent = chat_key(chat)
+    raw = repr((key, source_hash(func), func.__qualname__, params))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest(), persistent
+
+
+class ResultCache:
+    """LRU-кэш результатов в памяти с необязательной копией на диске"""
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, directory: Optional[str] = DEFAULT_MEMO_DIR
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                return default
+            self._remember(key, value)
+            return value
+        return default
+
+    def put(self, key: str, value, persistent: bool = False):
+        self._remember(key, value)
+        if self.directory and persistent:
+            self._save(key, value)
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _save(self, key: str, value):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Непиклящийся результат или нет места — живём с кэшем в памяти
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Общий кэш процесса: модуль импортируется один раз и переживает перезапуски скрипта
+results = ResultCache()
+
+
+def memoize(chat, func: Callable, *params, cache: Optional[ResultCache] = None):
+    """Возвращает func(chat, *params), считая его только при новом ключе"""
+    cache = cache or results
+    key, persistent = memo_key(chat, func, params)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = func(chat, *params)
+        cache.put(key, value, persistent)
+    return value
+
+
+def memoize_future(chat, func: Callable, submit: Callable[[], Future], *params) -> Future:
+    """
+    Как memoize, но расчёт запускает submit() (например, в пуле процессов):
+    при попадании возвращается готовый Future, иначе результат
+    запоминается, когда будет готов.
+    """
+    key, persistent = memo_key(chat, func, params)
+    value = results.get(key, _MISSING)
+    if value is not _MISSING:
+        future = Future()
+        future.set_result(value)
+        return future
+
+    def remember(done: Future):
+        if not done.cancelled() and done.exception() is None:
+            results.put(key, done.result(), persistent)
+
+    future = submit()
+    future.add_done_callback(remember)
+    return future
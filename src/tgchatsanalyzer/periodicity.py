@@ -0,0 +1,142 @@
+"""
+Periodicity
+Дневные ряды и поиск пиков для плагинов, ищущих циклы во времени.
+
+Дневные суммы считаются одним bincount по номеру дня, без словарей
+по датам: ряд непрерывный от первого до последнего дня, пустые дни —
+нули. Максимумы в скользящем окне считаются за O(n) блочным методом
+van Herk / Gil-Werman (префиксные и суффиксные максимумы блоков), так
+что проверка «значение — максимум в окне ±window» не зависит от
+ширины окна:
+
+    series = daily_series(chat.days, scores, mask=chat.senders == code)
+    peaks = find_peaks(series.values, window=10, min_distance=25,
+                       threshold=peak_threshold(series.values))
+    series.dates[peaks]
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class DailySeries(NamedTuple):
+    """
+    Непрерывный дневной ряд: values[i] — сумма за день start + i.
+    values одномерный или двумерный (день × показатель).
+    """
+    start: np.datetime64
+    values: np.ndarray
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Дни ряда как datetime64[D]"""
+        return self.start + np.arange(len(self.values))
+
+
+def daily_series(days: np.ndarray, values, mask: Optional[np.ndarray] = None) -> DailySeries:
+    """
+    Суммы values по календарным дням (days — datetime64, NaT пропускаются).
+    mask отбирает строки, например сообщения одного участника.
+    """
+    days = np.asarray(days).astype('datetime64[D]')
+    values = np.broadcast_to(np.asarray(values, dtype=np.float64), days.shape + np.shape(values)[1:])
+    keep = ~np.isnat(days)
+    if mask is not None:
+        keep &= np.asarray(mask, dtype=bool)
+    days = days[keep]
+    values = values[keep]
+    if not len(days):
+        return DailySeries(np.datetime64('NaT', 'D'), np.zeros((0,) + values.shape[1:]))
+
+    start = days.min()
+    offsets = (days - start).astype(np.int64)
+    n_days = int(offsets.max()) + 1
+    if values.ndim == 1:
+        sums = np.bincount(offsets, weights=values, minlength=n_days)
+    else:
+        sums = np.stack([
+            np.bincount(offsets, weights=values[:, column], minlength=n_days)
+            for column in range(values.shape[1])
+        ], axis=1)
+    return DailySeries(start, sums)
+
+
+def sliding_max(values: np.ndarray, width: int) -> np.ndarray:
+    """
+    Максимумы всех окон длины width: result[j] = max(values[j:j + width]).
+    Длина результата — len(values) - width + 1.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if width <= 0 or width > n:
+        raise ValueError("width должна быть от 1 до длины ряда")
+    n_blocks = -(-n // width)
+    padded = np.full(n_blocks * width, -np.inf)
+    padded[:n] = values
+    blocks = padded.reshape(n_blocks, width)
+    prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    # Окно [j, j + width) покрывает хвост блока с j и начало следующего
+    starts = np.arange(n - width + 1)
+    return np.maximum(suffix[starts], prefix[starts + width - 1])
+
+
+def neighbour_max(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Максимумы соседей слева и справа: left[i] = max(values[i - window:i]),
+    right[i] = max(values[i + 1:i + window + 1]); за краем ряда — -inf.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    padding = np.full(window, -np.inf)
+    maxima = sliding_max(np.concatenate((padding, values, padding)), window)
+    return maxima[:n], maxima[window + 1:window + 1 + n]
+
+
+def peak_threshold(values: np.ndarray, percentile: float = 70, min_positive: int = 10) -> float:
+    """
+    Порог пика: перцентиль положительных значений, а если их меньше
+    min_positive — среднее ряда (но не меньше нуля).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    positive = values[values > 0]
+    if len(positive) < min_positive:
+        mean = float(np.mean(values)) if len(values) else 0.0
+        return mean if mean > 0 else 0
+    return float(np.percentile(positive, percentile))
+
+
+def find_peaks(
+    values: np.ndarray, window: int, min_distance: int = 1, threshold: float = -np.inf
+) -> List[int]:
+    """
+    Пики ряда: значение не меньше всех соседей в окне ±window (окно
+    целиком внутри ряда) и не меньше threshold; из пиков ближе
+    min_distance друг к другу остаётся более ранний.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if window <= 0 or n <= 2 * window:
+        return []
+    left, right = neighbour_max(values, window)
+    candidates = (values >= left) & (values >= right) & (values >= threshold)
+    candidates[:window] = False
+    candidates[n - window:] = False
+
+    peaks: List[int] = []
+    for index in np.flatnonzero(candidates).tolist():
+        if not peaks or index - peaks[-1] >= min_distance:
+            peaks.append(index)
+    return peaks
+
+
+def moving_average(values: np.ndarray, width: int) -> np.ndarray:
+    """Среднее по окнам длины width (как np.convolve(..., mode='valid'))"""
+    values = np.asarray(values, dtype=np.float64)
+    if width <= 0 or width > len(values):
+        return np.zeros(0)
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    return (sums[width:] - sums[:-width]) / width
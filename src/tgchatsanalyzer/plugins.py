@@ -0,0 +1,185 @@
+"""
+Plugin Catalog
+Сведения о плагинах без их выполнения и фоновый прогрев импорта.
+
+inspect_plugin разбирает файл плагина через ast: заголовок и описание
+из docstring, точку входа (compute_plugin или compute / scan_plugin /
+run_plugin) и колонки чата, которые плагин читает (явный INPUTS = (...)
+в модуле или все обращения вида chat.<колонка>). Модуль не импортируется,
+так что боковая панель не платит за matplotlib и pandas каждого плагина.
+
+warm_up импортирует выбранные плагины и их тяжёлые зависимости в
+фоновом потоке, пока пользователь загружает файл чата.
+"""
+import ast
+import hashlib
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+# Порядок важен: разделённый плагин (compute_plugin/render_plugin или
+# compute/render из API v2) запускается как разделённый; у точки входа
+# API v2 обязательна пара, чтобы вспомогательная compute не считалась ею
+ENTRY_POINTS = (
+    ("compute", ("compute_plugin",)),
+    ("compute", ("compute", "render")),
+    ("scan", ("scan_plugin",)),
+    ("run", ("run_plugin",)),
+)
+
+# Библиотеки, которые импортирует почти каждый плагин
+HEAVY_MODULES = ("numpy", "pandas", "matplotlib.pyplot")
+
+# Импорт модуля плагина из основного и фонового потоков по очереди
+_import_lock = threading.RLock()
+
+_infos: Dict[Tuple[str, int, int], "PluginInfo"] = {}
+
+
+class PluginInfo(NamedTuple):
+    """Статические сведения о файле плагина"""
+    path: str
+    name: str
+    title: str
+    description: str
+    # compute, scan, run или None, если точки входа нет
+    entry: Optional[str]
+    accepts_chat: bool
+    inputs: Tuple[str, ...]
+    # Производные наборы из DATASETS = (...) (см. tgchatsanalyzer.datasets)
+    datasets: Tuple[str, ...] = ()
+
+
+def _positional_args(func: ast.FunctionDef) -> int:
+    args = func.args
+    if args.vararg is not None:
+        return sys.maxsize
+    return len(args.posonlyargs) + len(args.args)
+
+
+def _declared_names(tree: ast.Module, variable: str) -> Optional[Tuple[str, ...]]:
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == variable for target in node.targets
+        ):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                return None
+            # DATASETS = "turn_deltas" без запятой — одно имя, а не буквы
+            return (value,) if isinstance(value, str) else tuple(value)
+    return None
+
+
+def _chat_attributes(tree: ast.Module) -> Tuple[str, ...]:
+    found = {
+        node.attr
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "chat"
+    }
+    return tuple(sorted(found))
+
+
+def inspect_plugin(path: str) -> PluginInfo:
+    """Разбирает файл плагина, не выполняя его (результат кэшируется по mtime)"""
+    stat = os.stat(path)
+    stamp = (path, stat.st_mtime_ns, stat.st_size)
+    info = _infos.get(stamp)
+    if info is not None:
+        return info
+
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    docstring = (ast.get_docstring(tree) or "").strip()
+    title, _, description = docstring.partition("\n")
+
+    functions = {
+        node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)
+    }
+    entry = None
+    accepts_chat = False
+    for kind, function_names in ENTRY_POINTS:
+        if all(name in functions for name in function_names):
+            entry = kind
+            accepts_chat = kind != "run" or _positional_args(functions[function_names[0]]) >= 2
+            break
+
+    inputs = _declared_names(tree, "INPUTS")
+    if inputs is None:
+        inputs = _chat_attributes(tree)
+
+    info = PluginInfo(
+        path=path,
+        name=os.path.splitext(os.path.basename(path))[0],
+        title=title.strip(),
+        description=description.strip(),
+        entry=entry,
+        accepts_chat=accepts_chat,
+        inputs=inputs,
+        datasets=_declared_names(tree, "DATASETS") or (),
+    )
+    _infos[stamp] = info
+    return info
+
+
+def plugin_module_name(path: str) -> str:
+    """
+    Имя модуля плагина в sys.modules. Одно на файл во всём приложении:
+    main, пул, прогрев и пакетный режим импортируют плагин один раз.
+    """
+    digest = hashlib.md5(os.path.abspath(path).encode()).hexdigest()[:12]
+    return f"plugin_{os.path.splitext(os.path.basename(path))[0]}_{digest}"
+
+
+def import_plugin(path: str, module_name: str):
+    """
+    Импортирует файл плагина под именем module_name (один раз на процесс).
+    Ошибки импорта пробрасываются, недогруженный модуль не остаётся в
+    sys.modules.
+    """
+    with _import_lock:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        if spec is None:
+            raise ImportError(f"Не удалось создать спецификацию плагина {path}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+        return module
+
+
+def warm_up(paths: Iterable[str], module_name: Callable[[str], str]) -> threading.Thread:
+    """
+    Импортирует тяжёлые библиотеки и плагины в фоновом потоке.
+    Ошибки молча пропускаются: настоящий запуск плагина покажет их сам.
+    """
+    paths = list(paths)
+
+    def run():
+        for name in HEAVY_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass
+        for path in paths:
+            try:
+                import_plugin(path, module_name(path))
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=run, name="plugin-warm-up", daemon=True)
+    thread.start()
+    return thread
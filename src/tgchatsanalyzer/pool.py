@@ -0,0 +1,287 @@
+"""
+Plugin Pool
+Вычислительная часть плагинов в отдельных процессах.
+
+Тяжёлый плагин может разделить работу на две функции:
+
+    def compute_plugin(chat):
+        # только расчёт, без st.*; результат должен пиклиться
+        return {...}
+
+    def render_plugin(data, chat, result):
+        # заголовок, виджеты и графики
+        ...
+
+Plugin API v2 отделяет и виджеты, и данные для отрисовки:
+
+    PARAMS = {"pause_hours": 4}          # значения по умолчанию
+
+    def controls(chat):
+        # заголовок и виджеты над результатом; возвращает params
+        return {"pause_hours": st.slider("Пауза", 1, 24, 4)}
+
+    def compute(chat, params):
+        # чистый расчёт: DataFrame, массивы, данные для графиков
+        return {...}
+
+    def render(result):
+        # только отрисовка result
+        ...
+
+Результат запоминается по чату, файлу плагина и params, поэтому другой
+плагин получает его через shared_result без повторного расчёта.
+
+Расчёт выполняется в ProcessPoolExecutor, пока основной поток
+Streamlit занят остальными плагинами. Чат воркерам не пиклится:
+воркер открывает ту же запись дискового кэша (ChatCache) по
+chat.cache_key, и числовые колонки отображаются в память из одних и тех
+же .npy-файлов. Окно периода (ChatStore.window) передаётся ключом
+с границами строк и в воркере снова становится видом на эти файлы.
+Если у чата нет записи в кэше (не записалась или уже вытеснена) или
+пул недоступен, расчёт выполняется в текущем процессе.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from tgchatsanalyzer.cache import ChatCache
+from tgchatsanalyzer.memo import memoize
+from tgchatsanalyzer.plugins import import_plugin, plugin_module_name
+from tgchatsanalyzer.store import ChatStore, split_window_key
+
+COMPUTE_FUNCTION = "compute_plugin"
+RENDER_FUNCTION = "render_plugin"
+
+# Plugin API v2
+COMPUTE_V2_FUNCTION = "compute"
+RENDER_V2_FUNCTION = "render"
+CONTROLS_FUNCTION = "controls"
+PARAMS_ATTRIBUTE = "PARAMS"
+
+DEFAULT_WORKERS = int(os.environ.get("TGCHATS_WORKERS", "0")) or min(os.cpu_count() or 1, 8)
+
+# Чаты, открытые в воркере: один и тот же чат приходит во многих задачах
+_worker_chats: Dict[str, ChatStore] = {}
+
+# Пул приложения; в самих воркерах его нет, и чанки считаются на месте
+_default_pool: Optional['PluginPool'] = None
+
+
+class ChatNotCached(LookupError):
+    """Воркер не нашёл чат в дисковом кэше (не записался или вытеснен)"""
+
+
+def load_plugin(plugin_path: str):
+    """Импортирует модуль плагина по пути (один раз на процесс)"""
+    return import_plugin(plugin_path, plugin_module_name(plugin_path))
+
+
+def is_v2_plugin(plugin_module) -> bool:
+    """Плагин в стиле API v2: compute(chat, params) и render(result)"""
+    return callable(getattr(plugin_module, COMPUTE_V2_FUNCTION, None)) and callable(
+        getattr(plugin_module, RENDER_V2_FUNCTION, None)
+    )
+
+
+def is_compute_plugin(plugin_module) -> bool:
+    """Плагин разделён на расчёт и отрисовку (compute_plugin/render_plugin или API v2)"""
+    if hasattr(plugin_module, COMPUTE_FUNCTION) and hasattr(plugin_module, RENDER_FUNCTION):
+        return True
+    return is_v2_plugin(plugin_module)
+
+
+def compute_function(plugin_module) -> Callable:
+    """Функция расчёта: compute_plugin(chat) или compute(chat, params)"""
+    if hasattr(plugin_module, COMPUTE_FUNCTION):
+        return getattr(plugin_module, COMPUTE_FUNCTION)
+    return getattr(plugin_module, COMPUTE_V2_FUNCTION)
+
+
+def compute_args(plugin_module, chat=None, params: Optional[Dict] = None) -> Tuple:
+    """
+    Аргументы расчёта после chat: () для compute_plugin, (params,) для
+    compute. params — PARAMS плагина, поверх них значения виджетов
+    controls(chat) (если передан chat) и явно переданные params.
+    """
+    if hasattr(plugin_module, COMPUTE_FUNCTION):
+        return ()
+    merged = dict(getattr(plugin_module, PARAMS_ATTRIBUTE, None) or {})
+    controls = getattr(plugin_module, CONTROLS_FUNCTION, None)
+    if chat is not None and controls is not None:
+        merged.update(controls(chat) or {})
+    merged.update(params or {})
+    return (merged,)
+
+
+def render_result(plugin_module, data, chat, result):
+    """render_plugin(data, chat, result) или render(result)"""
+    if hasattr(plugin_module, RENDER_FUNCTION):
+        getattr(plugin_module, RENDER_FUNCTION)(data, chat, result)
+    else:
+        getattr(plugin_module, RENDER_V2_FUNCTION)(result)
+
+
+def shared_result(chat, plugin_path: str, params: Optional[Dict] = None) -> Any:
+    """
+    Результат расчёта другого плагина для этого чата: из памяти, если его
+    уже посчитал сам плагин с теми же params, иначе считается здесь же.
+    """
+    plugin_module = load_plugin(plugin_path)
+    if not is_compute_plugin(plugin_module):
+        raise TypeError(f"Плагин {plugin_path} не разделён на расчёт и отрисовку")
+    return memoize(
+        chat, compute_function(plugin_module), *compute_args(plugin_module, params=params)
+    )
+
+
+def _open_chat(cache_directory: str, key: str) -> ChatStore:
+    chat = _worker_chats.get(key)
+    if chat is None:
+        # Окно периода открывается как вид на чат из кэша
+        base, bounds = split_window_key(key)
+        chat = _worker_chats.get(base)
+        if chat is None:
+            chat = ChatCache(cache_directory).get(base)
+            if chat is None:
+                raise ChatNotCached(f"Чат {base} не найден в кэше")
+            chat.cache_key = base
+            # Держим только последний чат, чтобы не копить тексты в памяти
+            _worker_chats.clear()
+            _worker_chats[base] = chat
+        if bounds is not None:
+            chat = _worker_chats[key] = chat.window(*bounds)
+    return chat
+
+
+def _compute_in_worker(plugin_path: str, cache_directory: str, key: str, *args):
+    chat = _open_chat(cache_directory, key)
+    return compute_function(load_plugin(plugin_path))(chat, *args)
+
+
+def _map_in_worker(
+    module_file: str, function_name: str, cache_directory: str, key: str, lo: int, hi: int
+):
+    chat = _open_chat(cache_directory, key)
+    return getattr(load_plugin(module_file), function_name)(chat, lo, hi)
+
+
+def set_default_pool(pool: Optional['PluginPool']):
+    """Назначает пул, которым пользуются map_reduce и другие помощники"""
+    global _default_pool
+    _default_pool = pool
+
+
+def get_default_pool() -> Optional['PluginPool']:
+    return _default_pool
+
+
+def _compute_into(future: Future, plugin_module, chat, *args):
+    try:
+        future.set_result(compute_function(plugin_module)(chat, *args))
+    except Exception as exc:
+        future.set_exception(exc)
+
+
+def compute_inline(plugin_module, chat, *args) -> Future:
+    """Выполняет расчёт плагина в текущем процессе, результат — готовый Future"""
+    future = Future()
+    _compute_into(future, plugin_module, chat, *args)
+    return future
+
+
+def _inline_on_cache_miss(worker_future: Future, plugin_module, chat, *args) -> Future:
+    """
+    Future расчёта в воркере; если воркер не нашёл чат в кэше, расчёт
+    повторяется в текущем процессе (в отдельном потоке, чтобы не
+    задерживать остальные результаты пула).
+    """
+    future = Future()
+
+    def on_done(done: Future):
+        if done.cancelled():
+            future.cancel()
+            return
+        exc = done.exception()
+        if isinstance(exc, ChatNotCached):
+            threading.Thread(
+                target=_compute_into, args=(future, plugin_module, chat, *args), daemon=True
+            ).start()
+        elif exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(done.result())
+
+    worker_future.add_done_callback(on_done)
+    return future
+
+
+class PluginPool:
+    """
+    Пул процессов для compute_plugin.
+
+    Процессы запускаются при первой задаче и переиспользуются между
+    перезапусками скрипта, поэтому пул стоит держать в st.cache_resource.
+    """
+
+    def __init__(self, cache_directory: str, max_workers: int = DEFAULT_WORKERS):
+        self.cache_directory = cache_directory
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 1:
+            return None
+        if self._executor is None:
+            # spawn: Streamlit многопоточен, fork из потока небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def submit(self, plugin_path: str, plugin_module, chat: ChatStore, *args) -> Future:
+        """
+        Ставит расчёт плагина в очередь (args — см. compute_args, должны
+        пиклиться); без ключа кэша считает сразу, а если воркер не нашёл
+        запись на диске — в текущем процессе.
+        """
+        key = getattr(chat, "cache_key", None)
+        executor = self._get_executor() if key else None
+        if executor is None:
+            return compute_inline(plugin_module, chat, *args)
+        try:
+            worker_future = executor.submit(
+                _compute_in_worker, plugin_path, self.cache_directory, key, *args
+            )
+        except RuntimeError:
+            # Пул сломан (упавший воркер) — пересоздадим при следующем запуске
+            self.shutdown()
+            return compute_inline(plugin_module, chat, *args)
+        return _inline_on_cache_miss(worker_future, plugin_module, chat, *args)
+
+    def submit_chunk(self, mapper, chat: ChatStore, lo: int, hi: int) -> Optional[Future]:
+        """
+        Ставит mapper(chat, lo, hi) в очередь. Функция передаётся как
+        (файл модуля, имя), поэтому подходит и функция плагина,
+        загруженного по пути. None — если в пуле посчитать нельзя.
+        """
+        key = getattr(chat, "cache_key", None)
+        module_file = getattr(sys.modules.get(mapper.__module__), "__file__", None)
+        executor = self._get_executor() if key and module_file else None
+        if executor is None:
+            return None
+        try:
+            return executor.submit(
+                _map_in_worker, module_file, mapper.__name__, self.cache_directory, key, lo, hi
+            )
+        except RuntimeError:
+            self.shutdown()
+            return None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
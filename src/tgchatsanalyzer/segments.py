@@ -0,0 +1,111 @@
+"""
+Segments
+Паузы, смены собеседника и сессии по массивам времени и отправителей.
+
+Плагины, которые делят переписку на разговоры, раньше сортировали
+сообщения и сравнивали соседей в цикле Python. Здесь то же самое
+делается векторно: разности времени — np.diff, границы сессий — маска
+по порогу, номера сессий — cumsum.
+
+    timeline = chat.timeline              # сообщения с датой и отправителем
+    sessions = timeline.sessions(4 * 3600)
+    first_senders = timeline.senders[sessions.starts]
+
+Разбиения Timeline запоминаются по порогу, так что при движении
+слайдера повторный расчёт не нужен.
+"""
+from functools import cached_property
+from typing import Dict, NamedTuple
+
+import numpy as np
+
+
+class Sessions(NamedTuple):
+    """
+    Разбиение последовательности на отрезки [starts[i], stops[i]).
+    Позиции — индексы в исходном массиве, а не строки чата.
+    """
+    starts: np.ndarray
+    stops: np.ndarray
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.stops - self.starts
+
+    def ids(self) -> np.ndarray:
+        """Номер отрезка для каждого элемента"""
+        ids = np.zeros(int(self.stops[-1]) if len(self.stops) else 0, dtype=np.int64)
+        ids[self.starts[1:]] = 1
+        return np.cumsum(ids)
+
+    def sums(self, values: np.ndarray) -> np.ndarray:
+        """Сумма values по каждому отрезку"""
+        if not len(self.starts):
+            return np.zeros(0, dtype=np.asarray(values).dtype)
+        return np.add.reduceat(values, self.starts)
+
+
+def gap_positions(timestamps: np.ndarray, threshold: float) -> np.ndarray:
+    """Позиции i, перед которыми пауза не меньше threshold (t[i] - t[i-1] >= threshold)"""
+    return np.flatnonzero(np.diff(timestamps) >= threshold) + 1
+
+
+def split_by_gap(timestamps: np.ndarray, threshold: float) -> Sessions:
+    """Сессии: новая начинается после паузы не меньше threshold"""
+    n = len(timestamps)
+    if not n:
+        return Sessions(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    breaks = gap_positions(timestamps, threshold)
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [n]))
+    return Sessions(starts, stops)
+
+
+def runs(mask: np.ndarray) -> Sessions:
+    """Отрезки подряд идущих True"""
+    padded = np.concatenate(([False], np.asarray(mask, dtype=bool), [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return Sessions(edges[::2], edges[1::2])
+
+
+class Timeline:
+    """
+    Сообщения с датой и отправителем в порядке времени: rows — строки
+    ChatStore, timestamps и senders — их время и код отправителя.
+    """
+
+    def __init__(self, rows: np.ndarray, timestamps: np.ndarray, senders: np.ndarray):
+        self.rows = rows
+        self.timestamps = timestamps
+        self.senders = senders
+        self._sessions: Dict[float, Sessions] = {}
+
+    @classmethod
+    def from_chat(cls, chat) -> 'Timeline':
+        rows = np.flatnonzero(chat.senders[:chat.n_dated] >= 0)
+        return cls(rows, chat.timestamps[rows], chat.senders[rows])
+
+    def __len__(self):
+        return len(self.rows)
+
+    @cached_property
+    def deltas(self) -> np.ndarray:
+        """Пауза перед каждым сообщением в секундах (у первого — 0)"""
+        deltas = np.zeros(len(self), dtype=np.int64)
+        deltas[1:] = np.diff(self.timestamps)
+        return deltas
+
+    @cached_property
+    def turns(self) -> np.ndarray:
+        """Позиции сообщений, на которых сменился отправитель (ответы)"""
+        return np.flatnonzero(self.senders[1:] != self.senders[:-1]) + 1
+
+    def sessions(self, threshold: float) -> Sessions:
+        """Разговоры, разделённые паузами не меньше threshold секунд"""
+        sessions = self._sessions.get(threshold)
+        if sessions is None:
+            sessions = self._sessions[threshold] = split_by_gap(self.timestamps, threshold)
+        return sessions
@@ -0,0 +1,666 @@
+"""
+Chat Store
+Колоночное представление чата, которое строится один раз на загруженный
+чат и передаётся плагинам вместе с исходным словарём.
+
+Вместо того чтобы каждый плагин заново обходил data["messages"],
+склеивал текст и парсил даты, плагины читают готовые NumPy-колонки.
+"""
+from array import array
+from collections.abc import Sequence
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tgchatsanalyzer.cube import ActivityCube
+from tgchatsanalyzer.segments import Timeline
+from tgchatsanalyzer.texts import TextBuilder
+
+NO_SENDER = -1
+NO_REPLY = -1
+# cache_key окна чата: "<ключ чата>@<lo>:<hi>"
+WINDOW_SEPARATOR = '@'
+
+
+def flatten_text(text) -> str:
+    """Склеивает текст сообщения (строка или список сущностей) в одну строку"""
+    if isinstance(text, list):
+        parts = []
+        for part in text:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and 'text' in part:
+                parts.append(part['text'])
+        return ' '.join(parts)
+    return str(text) if text else ''
+
+
+def parse_dates(date_strings: List[Optional[str]]) -> np.ndarray:
+    """
+    Парсит список ISO-дат Telegram в datetime64[s] одним вызовом.
+    Некорректные и отсутствующие даты превращаются в NaT.
+    """
+    try:
+        return np.array(date_strings, dtype='datetime64[s]')
+    except (ValueError, TypeError):
+        pass
+
+    result = np.empty(len(date_strings), dtype='datetime64[s]')
+    for i, value in enumerate(date_strings):
+        try:
+            result[i] = np.datetime64(value, 's')
+        except (ValueError, TypeError):
+            result[i] = np.datetime64('NaT')
+    return result
+
+
+def to_datetimes(timestamps: np.ndarray) -> List[datetime]:
+    """Переводит массив секунд в список datetime (для подписей и таблиц)"""
+    return np.asarray(timestamps, dtype='int64').astype('datetime64[s]').astype(object).tolist()
+
+
+class _Interner:
+    """Присваивает строкам плотные целочисленные коды"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value) -> int:
+        if not value:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class ChatStoreBuilder:
+    """
+    Накопитель колонок: принимает сообщения по одному и собирает ChatStore.
+    Используется и для готового словаря, и для потоковой загрузки.
+
+    Числовые поля копятся в компактных array.array, даты парсятся пачками,
+    так что память растёт только на спроецированные поля, а не на
+    исходные словари сообщений.
+    """
+
+    DATE_BATCH = 65536
+
+    def __init__(self):
+        self._users = _Interner()
+        self._emojis = _Interner()
+        self._media_types = _Interner()
+
+        self._ids = array('q')
+        self._timestamps = array('q')
+        self._pending_dates: List[Optional[str]] = []
+        self._senders = array('i')
+        self._from_ids: Dict[int, str] = {}
+        self._reply_to = array('q')
+        self._texts = TextBuilder()
+        self._media = array('h')
+        self._photo = array('b')
+        self._file = array('b')
+
+        self._reaction_rows = array('i')
+        self._reaction_emojis = array('i')
+        self._reaction_amounts = array('i')
+        self._recent_reactions = array('i')
+        self._recent_users = array('i')
+
+        self._mention_rows = array('i')
+        self._mention_names: List[str] = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, msg: Dict):
+        """Добавляет одно сообщение экспорта Telegram"""
+        row = len(self._ids)
+
+        msg_id = msg.get('id')
+        self._ids.append(msg_id if isinstance(msg_id, int) else -1)
+
+        self._pending_dates.append(msg.get('date'))
+        if len(self._pending_dates) >= self.DATE_BATCH:
+            self._flush_dates()
+
+        sender = self._users.code(msg.get('from'))
+        self._senders.append(sender)
+        if sender >= 0 and sender not in self._from_ids and msg.get('from_id'):
+            self._from_ids[sender] = msg['from_id']
+
+        reply_to = msg.get('reply_to_message_id')
+        self._reply_to.append(reply_to if isinstance(reply_to, int) else NO_REPLY)
+
+        raw_text = msg.get('text', '')
+        self._texts.append(flatten_text(raw_text))
+        if isinstance(raw_text, list):
+            for part in raw_text:
+                if isinstance(part, dict) and part.get('type') == 'mention':
+                    mentioned = part.get('text', '').lstrip('@')
+                    if mentioned:
+                        self._mention_rows.append(row)
+                        self._mention_names.append(mentioned)
+
+        self._media.append(self._media_types.code(msg.get('media_type')))
+        self._photo.append(bool(msg.get('photo')))
+        self._file.append(bool(msg.get('file')))
+
+        for reaction in msg.get('reactions', []):
+            reaction_idx = len(self._reaction_rows)
+            self._reaction_rows.append(row)
+            self._reaction_emojis.append(self._emojis.code(reaction.get('emoji')))
+            self._reaction_amounts.append(reaction.get('count', 0))
+            for entry in reaction.get('recent', []):
+                user = self._users.code(entry.get('from'))
+                if user >= 0:
+                    self._recent_reactions.append(reaction_idx)
+                    self._recent_users.append(user)
+
+    def _flush_dates(self):
+        parsed = parse_dates(self._pending_dates)
+        # NaT хранится как минимальное int64
+        self._timestamps.frombytes(parsed.astype('int64').tobytes())
+        self._pending_dates = []
+
+    def build(self, name: str = 'Chat', info: Optional[Dict] = None) -> 'ChatStore':
+        """Превращает накопленные буферы в отсортированные по времени колонки"""
+        self._flush_dates()
+        timestamps = _column(self._timestamps, np.int64)
+        valid = timestamps != np.iinfo(np.int64).min
+
+        # Стабильная сортировка по времени, сообщения без даты — в конец
+        sort_key = np.where(valid, timestamps, np.iinfo(np.int64).max)
+        order = np.argsort(sort_key, kind='stable')
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+
+        # Таблицу реакций упорядочиваем по новым строкам
+        reaction_rows = inverse[_column(self._reaction_rows, np.int32)]
+        reaction_order = np.argsort(reaction_rows, kind='stable')
+        reaction_inverse = np.empty_like(reaction_order)
+        reaction_inverse[reaction_order] = np.arange(len(reaction_order))
+        reaction_rows = reaction_rows[reaction_order].astype(np.int32)
+        reaction_amounts = _column(self._reaction_amounts, np.int32)[reaction_order]
+
+        recent_reactions = reaction_inverse[_column(self._recent_reactions, np.int32)]
+        recent_order = np.argsort(recent_reactions, kind='stable')
+
+        mention_rows = inverse[_column(self._mention_rows, np.int32)]
+        mention_order = np.argsort(mention_rows, kind='stable')
+
+        return ChatStore(
+            name=name,
+            info=dict(info or {}),
+            users=self._users.values,
+            from_ids=[self._from_ids.get(code) for code in range(len(self._users.values))],
+            emojis=self._emojis.values,
+            media_type_names=self._media_types.values,
+            ids=_column(self._ids, np.int64)[order],
+            timestamps=timestamps[order],
+            n_dated=int(valid.sum()),
+            senders=_column(self._senders, np.int32)[order],
+            reply_to=_column(self._reply_to, np.int64)[order],
+            texts=self._texts.build().take(order),
+            text_lengths=self._texts.lengths[order],
+            reaction_counts=np.bincount(
+                reaction_rows, weights=reaction_amounts, minlength=len(order)
+            ).astype(np.int32),
+            media_types=_column(self._media, np.int16)[order],
+            has_photo=_column(self._photo, np.int8)[order].astype(bool),
+            has_file=_column(self._file, np.int8)[order].astype(bool),
+            reaction_rows=reaction_rows,
+            reaction_emojis=_column(self._reaction_emojis, np.int32)[reaction_order],
+            reaction_amounts=reaction_amounts,
+            recent_reactions=recent_reactions[recent_order].astype(np.int32),
+            recent_users=_column(self._recent_users, np.int32)[recent_order],
+            mention_rows=mention_rows[mention_order].astype(np.int32),
+            mention_names=[self._mention_names[i] for i in mention_order],
+        )
+
+
+def window_key(key: str, lo: int, hi: int) -> str:
+    """cache_key окна [lo, hi) чата с ключом key"""
+    return f"{key}{WINDOW_SEPARATOR}{lo}:{hi}"
+
+
+def split_window_key(key: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """Ключ чата в кэше и границы окна (None — чат целиком)"""
+    base, separator, bounds = key.partition(WINDOW_SEPARATOR)
+    if not separator:
+        return base, None
+    lo, hi = bounds.split(':')
+    return base, (int(lo), int(hi))
+
+
+def _rebase(rows: np.ndarray, offset: int) -> np.ndarray:
+    """Номера строк относительно начала окна (тот же dtype)"""
+    return rows - rows.dtype.type(offset)
+
+
+def _column(buffer: array, dtype) -> np.ndarray:
+    """Вид NumPy на буфер array.array без копирования"""
+    return np.frombuffer(buffer, dtype=dtype)
+
+
+class IdIndex:
+    """
+    Поиск строки сообщения по его id.
+
+    id в экспорте Telegram почти подряд, поэтому обычно строится плотная
+    таблица смещений (id - минимальный id → строка); при редких id —
+    отсортированный массив с бинарным поиском. При повторах id побеждает
+    последняя строка, как в словаре {id: ...}, собранном проходом по чату.
+    """
+
+    # Плотная таблица, пока она не длиннее стольких id на одно сообщение
+    DENSE_RATIO = 4
+
+    def __init__(self, ids: np.ndarray):
+        rows = np.flatnonzero(ids > 0)
+        keys = ids[rows]
+        self._table = None
+        if not len(keys):
+            self._keys = keys
+            self._rows = rows
+            return
+
+        self._first = int(keys.min())
+        span = int(keys.max()) - self._first + 1
+        if span <= self.DENSE_RATIO * len(keys) + 1024:
+            self._table = np.full(span, -1, dtype=np.int64)
+            np.maximum.at(self._table, keys - self._first, rows)
+        else:
+            order = np.argsort(keys, kind='stable')
+            self._keys = keys[order]
+            self._rows = rows[order]
+
+    def rows(self, ids) -> np.ndarray:
+        """Строки сообщений с данными id (-1, если такого сообщения нет)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        result = np.full(ids.shape, -1, dtype=np.int64)
+        if self._table is not None:
+            offsets = ids - self._first
+            inside = (ids > 0) & (offsets >= 0) & (offsets < len(self._table))
+            result[inside] = self._table[offsets[inside]]
+            return result
+
+        pos = np.searchsorted(self._keys, ids, side='right') - 1
+        found = pos >= 0
+        found[found] = self._keys[pos[found]] == ids[found]
+        result[found] = self._rows[pos[found]]
+        return result
+
+    def row(self, msg_id: int) -> int:
+        return int(self.rows([msg_id])[0])
+
+
+class ReplyGraph(NamedTuple):
+    """
+    Кто кому отвечает: разреженная матрица в формате CSR по кодам
+    пользователей. Ответы пользователя code — это targets[indptr[code]:
+    indptr[code + 1]] с количествами counts. Ответы самому себе и ответы
+    на сообщения, которых нет в выгрузке, не учитываются.
+    """
+    indptr: np.ndarray
+    targets: np.ndarray
+    counts: np.ndarray
+
+    def replies(self, code: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Кому отвечал пользователь code и сколько раз"""
+        lo, hi = self.indptr[code], self.indptr[code + 1]
+        return self.targets[lo:hi], self.counts[lo:hi]
+
+    @property
+    def sources(self) -> np.ndarray:
+        """Код ответившего для каждого ребра (индекс строки CSR)"""
+        return np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+
+    def edges(self):
+        """Тройки (кто ответил, кому, сколько раз)"""
+        return zip(self.sources.tolist(), self.targets.tolist(), self.counts.tolist())
+
+    @property
+    def sent(self) -> np.ndarray:
+        """Сколько раз каждый пользователь ответил другим"""
+        return np.bincount(
+            self.sources, weights=self.counts, minlength=len(self.indptr) - 1
+        ).astype(np.int64)
+
+    @property
+    def received(self) -> np.ndarray:
+        """Сколько ответов получил каждый пользователь"""
+        return np.bincount(
+            self.targets, weights=self.counts, minlength=len(self.indptr) - 1
+        ).astype(np.int64)
+
+
+class ChatStore:
+    """
+    Колоночное хранилище сообщений одного чата.
+
+    Строки отсортированы по времени (стабильно), сообщения без корректной
+    даты лежат в конце: у строк [0, n_dated) дата есть.
+
+    Колонки по сообщениям (длина = числу сообщений):
+        ids, timestamps (секунды, локальное время экспорта), senders (код
+        пользователя или -1), reply_to (id или -1), texts (склеенный текст,
+        TextStore: UTF-8 буфер со смещениями),
+        text_lengths, reaction_counts, media_types (код или -1),
+        has_photo, has_file.
+
+    Таблица реакций: reaction_rows/reaction_emojis/reaction_amounts,
+    авторы из "recent": recent_reactions (индекс реакции) и recent_users.
+    Упоминания: mention_rows и mention_names. Обе таблицы отсортированы
+    по строкам сообщений.
+
+    Индексы по id: id_index (id → строка), reply_rows (строка сообщения,
+    на которое ответили) и reply_graph (кто кому отвечает) строятся при
+    первом обращении. timeline — сообщения с датой и отправителем для
+    поиска пауз, ответов и сессий (см. tgchatsanalyzer.segments).
+
+    Календарные колонки (dates, days, months, hours, weekdays, datetimes,
+    day_keys, week_keys, month_keys) считаются из timestamps векторно
+    при первом обращении и дальше переиспользуются всеми плагинами.
+    У строк без даты: NaT, -1 или None.
+
+    window(lo, hi) — чат из строк [lo, hi) как виды на те же колонки,
+    rows_between(start, end) — такие границы для периода дат.
+    """
+
+    # Числовые колонки (сохраняются на диск как .npy)
+    ARRAY_COLUMNS = (
+        'ids', 'timestamps', 'senders', 'reply_to', 'text_lengths',
+        'reaction_counts', 'media_types', 'has_photo', 'has_file',
+        'reaction_rows', 'reaction_emojis', 'reaction_amounts',
+        'recent_reactions', 'recent_users', 'mention_rows',
+    )
+    # Справочники и метаданные (сохраняются как JSON)
+    META_COLUMNS = (
+        'name', 'info', 'n_dated', 'users', 'from_ids', 'emojis',
+        'media_type_names', 'mention_names',
+    )
+
+    # Колонки по сообщениям: окно чата — их срезы
+    ROW_COLUMNS = (
+        'ids', 'timestamps', 'senders', 'reply_to', 'texts', 'text_lengths',
+        'reaction_counts', 'media_types', 'has_photo', 'has_file',
+    )
+
+    # Хэш содержимого исходного файла, если чат загружен через кэш
+    cache_key: Optional[str] = None
+
+    def __init__(self, **columns):
+        self.__dict__.update(columns)
+        self.user_codes = {user: code for code, user in enumerate(self.users)}
+
+    @classmethod
+    def from_data(cls, data: Dict) -> 'ChatStore':
+        """Строит хранилище из распарсенного JSON экспорта"""
+        builder = ChatStoreBuilder()
+        for msg in data.get('messages', []):
+            builder.add(msg)
+        info = {k: v for k, v in data.items() if k != 'messages'}
+        return builder.build(data.get('name', 'Chat'), info)
+
+    def as_data(self) -> Dict:
+        """
+        Словарь в формате экспорта для плагинов со старой сигнатурой
+        run_plugin(data). Сообщения собираются из колонок лениво.
+        """
+        return {**self.info, 'messages': MessageList(self)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def message_counts(self) -> np.ndarray:
+        """Количество сообщений по кодам пользователей"""
+        senders = self.senders[self.senders >= 0]
+        return np.bincount(senders, minlength=len(self.users))
+
+    @property
+    def participants(self) -> List[str]:
+        """Пользователи, написавшие хотя бы одно сообщение"""
+        counts = self.message_counts
+        return [user for code, user in enumerate(self.users) if counts[code] > 0]
+
+    def rows_between(self, start, end) -> Tuple[int, int]:
+        """
+        Строки [lo, hi) с датами с start по end включительно: бинарный
+        поиск по отсортированным timestamps.
+        """
+        bounds = np.array([
+            np.datetime64(start, 'D'), np.datetime64(end, 'D') + np.timedelta64(1, 'D')
+        ]).astype('datetime64[s]').astype(np.int64)
+        lo, hi = np.searchsorted(self.timestamps[:self.n_dated], bounds)
+        return int(lo), int(max(lo, hi))
+
+    def window(self, lo: int, hi: int) -> 'ChatStore':
+        """
+        Чат из строк [lo, hi) без копирования колонок: срезы NumPy и
+        TextStore смотрят в те же буферы (и в те же memory map кэша).
+        Копируются только номера строк в таблицах реакций и упоминаний —
+        они отсчитываются от начала окна. Справочники (users, emojis)
+        общие, поэтому коды пользователей совпадают с исходным чатом.
+        Последнее окно запоминается: перезапуск скрипта с тем же
+        периодом получает тот же объект со всеми его кэшами.
+        """
+        lo, hi = max(lo, 0), min(max(hi, lo), len(self))
+        cached = self.__dict__.get('_window')
+        if cached is not None and cached[0] == (lo, hi):
+            return cached[1]
+
+        columns = {column: getattr(self, column)[lo:hi] for column in self.ROW_COLUMNS}
+        r_lo, r_hi = np.searchsorted(self.reaction_rows, [lo, hi])
+        c_lo, c_hi = np.searchsorted(self.recent_reactions, [r_lo, r_hi])
+        m_lo, m_hi = np.searchsorted(self.mention_rows, [lo, hi])
+        columns.update(
+            reaction_rows=_rebase(self.reaction_rows[r_lo:r_hi], lo),
+            reaction_emojis=self.reaction_emojis[r_lo:r_hi],
+            reaction_amounts=self.reaction_amounts[r_lo:r_hi],
+            recent_reactions=_rebase(self.recent_reactions[c_lo:c_hi], r_lo),
+            recent_users=self.recent_users[c_lo:c_hi],
+            mention_rows=_rebase(self.mention_rows[m_lo:m_hi], lo),
+            mention_names=self.mention_names[m_lo:m_hi],
+        )
+        for column in self.META_COLUMNS:
+            columns.setdefault(column, getattr(self, column))
+        columns['n_dated'] = min(max(self.n_dated - lo, 0), hi - lo)
+
+        chat = ChatStore(**columns)
+        if self.cache_key:
+            # Окно окна — тоже окно исходного чата из кэша
+            base, bounds = split_window_key(self.cache_key)
+            offset = bounds[0] if bounds else 0
+            chat.cache_key = window_key(base, offset + lo, offset + hi)
+        self._window = ((lo, hi), chat)
+        return chat
+
+    @cached_property
+    def id_index(self) -> IdIndex:
+        """Поиск строки по id сообщения"""
+        return IdIndex(self.ids)
+
+    @cached_property
+    def reply_rows(self) -> np.ndarray:
+        """Строка сообщения, на которое ответили (-1 — не ответ или нет в выгрузке)"""
+        return self.id_index.rows(self.reply_to)
+
+    @cached_property
+    def reply_graph(self) -> ReplyGraph:
+        """Ответы между пользователями: отправитель → автор исходного сообщения"""
+        n_users = len(self.users)
+        width = max(n_users, 1)
+        rows = np.flatnonzero((self.reply_rows >= 0) & (self.senders >= 0))
+        sources = self.senders[rows].astype(np.int64)
+        targets = self.senders[self.reply_rows[rows]].astype(np.int64)
+        keep = (targets >= 0) & (targets != sources)
+        pairs, counts = np.unique(
+            sources[keep] * width + targets[keep], return_counts=True
+        )
+        sources, targets = np.divmod(pairs, width)
+        indptr = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n_users), out=indptr[1:])
+        return ReplyGraph(indptr, targets, counts.astype(np.int64))
+
+    @cached_property
+    def timeline(self) -> Timeline:
+        """Сообщения с датой и отправителем: паузы, смены собеседника, сессии"""
+        return Timeline.from_chat(self)
+
+    @cached_property
+    def cube(self) -> ActivityCube:
+        """Плотные суммы отправитель × день с разворотом в недели и месяцы"""
+        return ActivityCube(self)
+
+    @cached_property
+    def dates(self) -> np.ndarray:
+        """Время сообщений как datetime64[s] (вид на timestamps без копии)"""
+        # NaT в datetime64 — это минимальное int64, им и помечены строки без даты
+        return self.timestamps.view('datetime64[s]')
+
+    @cached_property
+    def days(self) -> np.ndarray:
+        """Календарный день, datetime64[D]"""
+        return self.dates.astype('datetime64[D]')
+
+    @cached_property
+    def months(self) -> np.ndarray:
+        """Месяц, datetime64[M]"""
+        return self.days.astype('datetime64[M]')
+
+    @cached_property
+    def hours(self) -> np.ndarray:
+        """Час суток 0-23 (-1 без даты)"""
+        hours = np.full(len(self), -1, dtype=np.int8)
+        hours[:self.n_dated] = self.timestamps[:self.n_dated] // 3600 % 24
+        return hours
+
+    @cached_property
+    def weekdays(self) -> np.ndarray:
+        """День недели как datetime.weekday(): 0 — понедельник (-1 без даты)"""
+        weekdays = np.full(len(self), -1, dtype=np.int8)
+        # 1970-01-01 — четверг
+        weekdays[:self.n_dated] = (self.days[:self.n_dated].astype(np.int64) + 3) % 7
+        return weekdays
+
+    @cached_property
+    def datetimes(self) -> List[Optional[datetime]]:
+        """Время сообщений как datetime (None без даты)"""
+        return to_datetimes(self.timestamps[:self.n_dated]) + self._undated_padding
+
+    @cached_property
+    def day_keys(self) -> List[Optional[str]]:
+        """День строкой как strftime('%Y-%m-%d')"""
+        return self._keys(self.days)
+
+    @cached_property
+    def month_keys(self) -> List[Optional[str]]:
+        """Месяц строкой как strftime('%Y-%m')"""
+        return self._keys(self.months)
+
+    @cached_property
+    def week_keys(self) -> List[Optional[str]]:
+        """Неделя строкой как strftime('%Y-W%W') (недели с понедельника)"""
+        days = self.days[:self.n_dated]
+        years = days.astype('datetime64[Y]')
+        year_day = (days - years.astype('datetime64[D]')).astype(np.int64)
+        weeks = (year_day + 7 - self.weekdays[:self.n_dated]) // 7
+        labels = np.char.add(
+            np.char.add(np.datetime_as_string(years), '-W'),
+            np.char.zfill(weeks.astype(str), 2),
+        )
+        return labels.tolist() + self._undated_padding
+
+    @property
+    def _undated_padding(self) -> List[None]:
+        return [None] * (len(self) - self.n_dated)
+
+    def _keys(self, values: np.ndarray) -> List[Optional[str]]:
+        return np.datetime_as_string(values[:self.n_dated]).tolist() + self._undated_padding
+
+
+class MessageList(Sequence):
+    """
+    Ленивый список сообщений поверх ChatStore.
+
+    Каждый элемент — новый словарь только со спроецированными полями
+    (id, date, from, from_id, text, reply_to_message_id, reactions,
+    media_type, photo, file); изменения в нём не сохраняются.
+    """
+
+    def __init__(self, chat: ChatStore):
+        self._chat = chat
+        self._reaction_bounds = np.searchsorted(
+            chat.reaction_rows, np.arange(len(chat) + 1)
+        )
+        self._recent_bounds = np.searchsorted(
+            chat.recent_reactions, np.arange(len(chat.reaction_rows) + 1)
+        )
+
+    def __len__(self):
+        return len(self._chat)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._message(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('message index out of range')
+        return self._message(index)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._message(row)
+
+    def _message(self, row: int) -> Dict:
+        chat = self._chat
+        msg = {'id': int(chat.ids[row]), 'type': 'message'}
+        if row < chat.n_dated:
+            msg['date'] = str(chat.dates[row])
+
+        sender = int(chat.senders[row])
+        if sender >= 0:
+            msg['from'] = chat.users[sender]
+            if chat.from_ids[sender]:
+                msg['from_id'] = chat.from_ids[sender]
+
+        msg['text'] = chat.texts[row]
+
+        reply_to = int(chat.reply_to[row])
+        if reply_to != NO_REPLY:
+            msg['reply_to_message_id'] = reply_to
+
+        media_type = int(chat.media_types[row])
+        if media_type >= 0:
+            msg['media_type'] = chat.media_type_names[media_type]
+        if chat.has_photo[row]:
+            msg['photo'] = True
+        if chat.has_file[row]:
+            msg['file'] = True
+
+        lo, hi = self._reaction_bounds[row], self._reaction_bounds[row + 1]
+        if hi > lo:
+            reactions = []
+            for idx in range(lo, hi):
+                emoji = int(chat.reaction_emojis[idx])
+                r_lo, r_hi = self._recent_bounds[idx], self._recent_bounds[idx + 1]
+                reactions.append({
+                    'emoji': chat.emojis[emoji] if emoji >= 0 else None,
+                    'count': int(chat.reaction_amounts[idx]),
+                    'recent': [
+                        {'from': chat.users[user]}
+                        for user in chat.recent_users[r_lo:r_hi].tolist()
+                    ],
+                })
+            msg['reactions'] = reactions
+
+        return msg
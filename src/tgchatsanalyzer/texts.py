@@ -0,0 +1,146 @@
+"""
+Text Store
+Тексты сообщений одним UTF-8 буфером со смещениями.
+
+Отдельный объект str на каждое сообщение стоит десятки байт заголовка
+сверх самого текста, а массив dtype=object держит ещё и указатели.
+TextStore хранит все тексты подряд в одном буфере байт и массив
+смещений: текст строки row — buffer[offsets[row]:offsets[row + 1]].
+Строка str создаётся только при обращении:
+
+    texts = chat.texts
+    texts[row]                # str
+    texts.view(row)           # memoryview на байты UTF-8 без копии
+    texts.lowered[row]        # нижний регистр, буфер строится один раз
+
+Буфер и смещения — массивы NumPy, поэтому дисковый кэш сохраняет их
+как есть и открывает через memory map без декодирования.
+"""
+from array import array
+from collections.abc import Sequence
+from functools import cached_property
+from typing import Iterable, Iterator, List, Union
+
+import numpy as np
+
+ENCODING = 'utf-8'
+# surrogatepass: тексты из JSON могут содержать одиночные суррогаты
+ERRORS = 'surrogatepass'
+
+
+class TextBuilder:
+    """Накопление текстов в bytearray для TextStore"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array('q', [0])
+        self._lengths = array('i')
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def append(self, text: str):
+        self._buffer += text.encode(ENCODING, ERRORS)
+        self._offsets.append(len(self._buffer))
+        self._lengths.append(len(text))
+
+    def build(self) -> 'TextStore':
+        return TextStore(
+            np.frombuffer(bytes(self._buffer), dtype=np.uint8),
+            np.frombuffer(self._offsets, dtype=np.int64).copy(),
+        )
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Длины текстов в символах"""
+        return np.frombuffer(self._lengths, dtype=np.int32).copy()
+
+
+class TextStore(Sequence):
+    """Неизменяемая последовательность текстов поверх буфера байт и смещений"""
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, texts: Iterable[str]) -> 'TextStore':
+        builder = TextBuilder()
+        for text in texts:
+            builder.append(text)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @cached_property
+    def _memory(self) -> memoryview:
+        return memoryview(self.buffer).cast('B')
+
+    def view(self, row: int) -> memoryview:
+        """Байты UTF-8 текста строки без копирования"""
+        if row < 0:
+            row += len(self)
+        return self._memory[int(self.offsets[row]):int(self.offsets[row + 1])]
+
+    def __getitem__(self, index: Union[int, slice, Sequence, np.ndarray]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return TextStore(self.buffer, self.offsets[start:max(start, stop) + 1])
+            index = range(start, stop, step)
+        if isinstance(index, (int, np.integer)):
+            if not -len(self) <= index < len(self):
+                raise IndexError("индекс текста вне диапазона")
+            return str(self.view(int(index)), ENCODING, ERRORS)
+        return self.take(index)
+
+    def __iter__(self) -> Iterator[str]:
+        memory = self._memory
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets, offsets[1:]):
+            yield str(memory[start:stop], ENCODING, ERRORS)
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets[-1] - self.offsets[0])
+
+    def take(self, rows) -> 'TextStore':
+        """Тексты строк rows (номера или маска); подряд идущие строки — без копии буфера"""
+        rows = np.asarray(rows)
+        rows = np.flatnonzero(rows) if rows.dtype == bool else rows.astype(np.int64)
+        rows = np.where(rows < 0, rows + len(self), rows)
+        # Уже упорядоченный диапазон — переиспользуем буфер
+        if len(rows) and rows[0] >= 0 and np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+            return self[int(rows[0]):int(rows[0]) + len(rows)]
+        memory = self._memory
+        starts = self.offsets[rows].tolist()
+        stops = self.offsets[rows + 1].tolist()
+        joined = b''.join([memory[a:b] for a, b in zip(starts, stops)])
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(np.asarray(stops, dtype=np.int64) - starts, out=offsets[1:])
+        return TextStore(np.frombuffer(joined, dtype=np.uint8), offsets)
+
+    @cached_property
+    def lowered(self) -> 'TextStore':
+        """Те же тексты в нижнем регистре (строится при первом обращении)"""
+        return TextStore.from_strings(text.lower() for text in self)
+
+    def lower(self, row: int) -> str:
+        return self.lowered[row]
+
+    def compact(self) -> 'TextStore':
+        """Копия, в буфере которой только байты этих текстов (смещения с нуля)"""
+        start, stop = int(self.offsets[0]), int(self.offsets[-1])
+        return TextStore(np.array(self.buffer[start:stop]), self.offsets - start)
+
+    def __getstate__(self):
+        # Лишние байты среза и производные кэши не передаём
+        compact = self.compact()
+        return {'buffer': compact.buffer, 'offsets': compact.offsets}
+
+    def __repr__(self):
+        return f"TextStore({len(self)} texts, {self.nbytes} bytes)"
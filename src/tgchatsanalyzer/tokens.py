@@ -0,0 +1,508 @@
+"""
+Token Counts
+Частоты слов по чату без списков токенов.
+
+Слова получают номера в словаре (Vocabulary), а счётчики хранятся в
+массивах NumPy: общий вектор частот по номерам слов и разреженные
+векторы по группам (участникам, месяцам). Токены копятся в буфере из
+номеров и сворачиваются в счётчики каждые FLUSH_TOKENS штук, так что
+память растёт со словарём, а не с числом токенов:
+
+    counts = TokenCounts(("users", "months"))
+    counts.add(words, users="Alice", months="2024-01")
+    counts.most_common(30)
+    counts.count("работа", "months", "2024-01")
+
+Для очень больших чатов есть TokenSketch с тем же интерфейсом и
+ограниченной памятью: частые слова отслеживаются алгоритмом
+Misra–Gries (семейство Space-Saving), частоты любых слов оцениваются
+Count-Min sketch. Оба класса складываются через merge, поэтому
+подходят для map_reduce.
+"""
+import hashlib
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FLUSH_TOKENS = 1 << 20
+# Чаты длиннее этого числа сообщений считаются приближённо (TokenSketch)
+SKETCH_ROWS = int(os.environ.get("TGCHATS_SKETCH_ROWS", "5000000"))
+
+_WORD_BITS = 32
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+
+class Vocabulary:
+    """Слово <-> номер в порядке первого появления"""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for word in words:
+            self.intern(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def intern(self, word: str) -> int:
+        index = self.ids.get(word)
+        if index is None:
+            index = self.ids[word] = len(self.words)
+            self.words.append(word)
+        return index
+
+    def encode(self, words: Iterable[str]) -> List[int]:
+        ids = self.ids
+        result = []
+        for word in words:
+            index = ids.get(word)
+            if index is None:
+                index = ids[word] = len(self.words)
+                self.words.append(word)
+            result.append(index)
+        return result
+
+    def get(self, word: str) -> int:
+        """Номер слова или -1"""
+        return self.ids.get(word, -1)
+
+
+def _aggregate(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Суммирует counts по одинаковым keys; ключи возвращаются отсортированными"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=counts, minlength=len(unique)).astype(np.int64)
+
+
+def _top(counts: np.ndarray, n: int) -> np.ndarray:
+    """Позиции n наибольших значений по убыванию (при равенстве — по позиции)"""
+    n = min(n, len(counts))
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    # Все значения, равные n-му, тоже кандидаты: порядок должен быть устойчивым
+    border = np.partition(counts, len(counts) - n)[len(counts) - n]
+    candidates = np.flatnonzero(counts >= border)
+    order = np.lexsort((candidates, -counts[candidates]))
+    return candidates[order[:n]]
+
+
+class _Axis:
+    """
+    Разреженные счётчики одной группировки: ключ (метка << 32 | слово)
+    в отсортированном массиве keys, частота — в counts.
+    """
+
+    def __init__(self):
+        self.labels = Vocabulary()
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._spread = None
+
+    def label_slice(self, label_id: int) -> slice:
+        lo, hi = np.searchsorted(self.keys, [label_id << _WORD_BITS, (label_id + 1) << _WORD_BITS])
+        return slice(int(lo), int(hi))
+
+    def add(self, keys: np.ndarray, counts: np.ndarray):
+        self.keys, self.counts = _aggregate(
+            np.concatenate((self.keys, keys)), np.concatenate((self.counts, counts))
+        )
+        self._spread = None
+
+    def spread(self, n_words: int) -> np.ndarray:
+        """Число меток, у которых встречается каждое слово"""
+        if self._spread is None or len(self._spread) != n_words:
+            self._spread = np.bincount(self.keys & _WORD_MASK, minlength=n_words)
+        return self._spread
+
+
+class TokenCounts:
+    """
+    Точные частоты слов: totals — вектор по номерам слов словаря,
+    по каждой оси (axes) — разреженные векторы для каждой метки.
+    """
+
+    def __init__(self, axes: Sequence[str] = ()):
+        self.vocabulary = Vocabulary()
+        self.totals = np.zeros(0, dtype=np.int64)
+        self._axes: Dict[str, _Axis] = {axis: _Axis() for axis in axes}
+        self._words = array('q')
+        self._labels: Dict[str, array] = {axis: array('q') for axis in axes}
+
+    def add(self, words: Sequence[str], **labels: Optional[Hashable]):
+        """Добавляет слова одного сообщения; метка None — сообщение не входит в ось"""
+        if not words:
+            return
+        ids = self.vocabulary.encode(words)
+        self._words.extend(ids)
+        for axis, buffer in self._labels.items():
+            label = labels.get(axis)
+            label_id = -1 if label is None else self._axes[axis].labels.intern(label)
+            buffer.extend([label_id] * len(ids))
+        if len(self._words) >= FLUSH_TOKENS:
+            self.flush()
+
+    def flush(self):
+        """Сворачивает буфер токенов в счётчики"""
+        if not len(self._words):
+            return
+        words = np.frombuffer(self._words, dtype=np.int64)
+        n_words = len(self.vocabulary)
+        totals = np.zeros(n_words, dtype=np.int64)
+        totals[:len(self.totals)] = self.totals
+        totals += np.bincount(words, minlength=n_words)
+        self.totals = totals
+
+        for axis, buffer in self._labels.items():
+            label_ids = np.frombuffer(buffer, dtype=np.int64)
+            keep = label_ids >= 0
+            keys = (label_ids[keep] << _WORD_BITS) | words[keep]
+            self._axes[axis].add(*_aggregate(keys, np.ones(len(keys), dtype=np.int64)))
+
+        self._words = array('q')
+        self._labels = {axis: array('q') for axis in self._labels}
+
+    def __getstate__(self):
+        self.flush()
+        return self.__dict__
+
+    def merge(self, other: 'TokenCounts') -> 'TokenCounts':
+        """Прибавляет счётчики other (словари сопоставляются по словам)"""
+        self.flush()
+        other.flush()
+        mapping = np.array(self.vocabulary.encode(other.vocabulary.words), dtype=np.int64)
+        totals = np.zeros(len(self.vocabulary), dtype=np.int64)
+        totals[:len(self.totals)] = self.totals
+        totals[mapping] += other.totals
+        self.totals = totals
+
+        for name, theirs in other._axes.items():
+            ours = self._axes.setdefault(name, _Axis())
+            self._labels.setdefault(name, array('q'))
+            label_map = np.array(ours.labels.encode(theirs.labels.words), dtype=np.int64)
+            keys = (label_map[theirs.keys >> _WORD_BITS] << _WORD_BITS) | mapping[theirs.keys & _WORD_MASK]
+            ours.add(keys, theirs.counts)
+        return self
+
+    # Запросы
+
+    def _vector(self, axis: Optional[str], label: Optional[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+        """Номера слов и частоты: по всему чату или для одной метки оси"""
+        self.flush()
+        if axis is None:
+            return np.arange(len(self.totals)), self.totals
+        counts = self._axes[axis]
+        label_id = counts.labels.get(label)
+        if label_id < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        part = counts.label_slice(label_id)
+        return counts.keys[part] & _WORD_MASK, counts.counts[part]
+
+    @property
+    def vocabulary_size(self) -> Optional[int]:
+        return len(self.vocabulary)
+
+    @property
+    def total(self) -> int:
+        self.flush()
+        return int(self.totals.sum())
+
+    def labels(self, axis: str) -> List[Hashable]:
+        return list(self._axes[axis].labels.words)
+
+    def label_totals(self, axis: str) -> Dict[Hashable, int]:
+        """Число слов у каждой метки оси"""
+        self.flush()
+        counts = self._axes[axis]
+        sums = np.bincount(counts.keys >> _WORD_BITS, weights=counts.counts, minlength=len(counts.labels))
+        return dict(zip(counts.labels.words, sums.astype(np.int64).tolist()))
+
+    def count(self, word: str, axis: Optional[str] = None, label: Optional[Hashable] = None) -> int:
+        self.flush()
+        word_id = self.vocabulary.get(word)
+        if word_id < 0:
+            return 0
+        if axis is None:
+            return int(self.totals[word_id])
+        counts = self._axes[axis]
+        label_id = counts.labels.get(label)
+        if label_id < 0:
+            return 0
+        key = (label_id << _WORD_BITS) | word_id
+        pos = int(np.searchsorted(counts.keys, key))
+        found = pos < len(counts.keys) and counts.keys[pos] == key
+        return int(counts.counts[pos]) if found else 0
+
+    def most_common(
+        self, n: int, axis: Optional[str] = None, label: Optional[Hashable] = None
+    ) -> List[Tuple[str, int]]:
+        """n самых частых слов (при равенстве — в порядке первого появления)"""
+        ids, counts = self._vector(axis, label)
+        words = self.vocabulary.words
+        return [(words[ids[i]], int(counts[i])) for i in _top(counts, n).tolist()]
+
+    def spread(self, word: str, axis: str) -> int:
+        """У скольких меток оси встречается слово"""
+        self.flush()
+        word_id = self.vocabulary.get(word)
+        if word_id < 0:
+            return 0
+        return int(self._axes[axis].spread(len(self.vocabulary))[word_id])
+
+    def items(self, min_count: int = 1) -> List[Tuple[str, int]]:
+        """Слова с частотой не меньше min_count"""
+        self.flush()
+        ids = np.flatnonzero(self.totals >= min_count)
+        words = self.vocabulary.words
+        return [(words[i], int(self.totals[i])) for i in ids.tolist()]
+
+
+# Приближённый режим
+
+def word_hash(word: str) -> int:
+    """64-битный хэш слова, одинаковый во всех процессах (в отличие от hash())"""
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), 'little')
+
+
+# Нечётные множители для хэширования multiply-shift, по одному на строку
+_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9,
+], dtype=np.uint64)
+
+
+class CountMinSketch:
+    """
+    Оценка частот Count-Min: depth строк по width счётчиков. Оценка
+    не меньше истинной частоты и превышает её не более чем на
+    e / width от общего числа токенов с вероятностью 1 - exp(-depth).
+    """
+
+    def __init__(self, width: int = 1 << 14, depth: int = 4):
+        if width & (width - 1) or not 0 < depth <= len(_MULTIPLIERS):
+            raise ValueError("width должна быть степенью двойки, depth — от 1 до 8")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._shift = np.uint64(64 - (width.bit_length() - 1))
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        return ((_MULTIPLIERS[:self.depth, None] * hashes[None, :]) >> self._shift).astype(np.int64)
+
+    def add(self, hashes: np.ndarray, counts=1):
+        columns = self._columns(hashes)
+        weights = np.broadcast_to(np.asarray(counts, dtype=np.int64), columns.shape[1:])
+        for row in range(self.depth):
+            self.table[row] += np.bincount(columns[row], weights=weights, minlength=self.width).astype(np.int64)
+
+    def estimate(self, word: str) -> int:
+        columns = self._columns([word_hash(word)])[:, 0]
+        return int(self.table[np.arange(self.depth), columns].min())
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Размеры sketch не совпадают")
+        self.table += other.table
+        return self
+
+
+class FrequentItems:
+    """
+    Частые элементы (Misra–Gries): не больше capacity счётчиков.
+    Недооценка любой частоты не больше error <= N / (capacity + 1),
+    слово с частотой выше этой границы гарантированно отслеживается.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Counter = Counter()
+        self.error = 0
+
+    def update(self, counts):
+        """Добавляет пачку частот (Counter или словарь)"""
+        self.counts.update(counts)
+        self._prune()
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        values = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        threshold = int(np.partition(values, len(values) - self.capacity - 1)[len(values) - self.capacity - 1])
+        self.counts = Counter({k: v - threshold for k, v in self.counts.items() if v > threshold})
+        self.error += threshold
+
+    def merge(self, other: 'FrequentItems') -> 'FrequentItems':
+        self.counts.update(other.counts)
+        self.error += other.error
+        self._prune()
+        return self
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def most_common(self, n: int) -> List[Tuple[Hashable, int]]:
+        return self.counts.most_common(n)
+
+
+class _SketchAxis:
+    """Частые слова и Count-Min для каждой метки оси"""
+
+    def __init__(self, capacity: int, width: int, depth: int):
+        self.capacity = capacity
+        self.width = width
+        self.depth = depth
+        self.items: Dict[Hashable, FrequentItems] = {}
+        self.sketches: Dict[Hashable, CountMinSketch] = {}
+        self.totals: Counter = Counter()
+
+    def get(self, label):
+        if label not in self.items:
+            self.items[label] = FrequentItems(self.capacity)
+            self.sketches[label] = CountMinSketch(self.width, self.depth)
+        return self.items[label], self.sketches[label]
+
+
+class TokenSketch:
+    """
+    Приближённые частоты с ограниченной памятью и тем же интерфейсом,
+    что у TokenCounts. most_common берёт слова из Misra–Gries, а
+    частоты — из Count-Min; count — оценка Count-Min; spread считает
+    метки, у которых слово в списке частых; размер словаря неизвестен.
+    """
+
+    def __init__(
+        self,
+        axes: Sequence[str] = (),
+        capacity: int = 10000,
+        axis_capacity: int = 1000,
+        width: int = 1 << 16,
+        axis_width: int = 1 << 11,
+        depth: int = 4,
+    ):
+        self.frequent = FrequentItems(capacity)
+        self.sketch = CountMinSketch(width, depth)
+        self._total = 0
+        self._axes = {axis: _SketchAxis(axis_capacity, axis_width, depth) for axis in axes}
+        self._batch: Counter = Counter()
+        self._axis_batches: Dict[str, Dict[Hashable, Counter]] = {axis: {} for axis in axes}
+        self._batch_tokens = 0
+
+    def add(self, words: Sequence[str], **labels: Optional[Hashable]):
+        if not words:
+            return
+        self._batch.update(words)
+        for axis, batches in self._axis_batches.items():
+            label = labels.get(axis)
+            if label is not None:
+                batches.setdefault(label, Counter()).update(words)
+        self._batch_tokens += len(words)
+        if self._batch_tokens >= FLUSH_TOKENS:
+            self.flush()
+
+    @staticmethod
+    def _fold(batch: Counter, items: FrequentItems, sketch: CountMinSketch):
+        hashes = np.fromiter((word_hash(w) for w in batch), dtype=np.uint64, count=len(batch))
+        sketch.add(hashes, np.fromiter(batch.values(), dtype=np.int64, count=len(batch)))
+        items.update(batch)
+
+    def flush(self):
+        if not self._batch_tokens:
+            return
+        self._fold(self._batch, self.frequent, self.sketch)
+        self._total += self._batch_tokens
+        for axis, batches in self._axis_batches.items():
+            counts = self._axes[axis]
+            for label, batch in batches.items():
+                self._fold(batch, *counts.get(label))
+                counts.totals[label] += sum(batch.values())
+        self._batch = Counter()
+        self._axis_batches = {axis: {} for axis in self._axis_batches}
+        self._batch_tokens = 0
+
+    def __getstate__(self):
+        self.flush()
+        return self.__dict__
+
+    def merge(self, other: 'TokenSketch') -> 'TokenSketch':
+        self.flush()
+        other.flush()
+        self.frequent.merge(other.frequent)
+        self.sketch.merge(other.sketch)
+        self._total += other._total
+        for name, theirs in other._axes.items():
+            ours = self._axes.setdefault(name, theirs)
+            self._axis_batches.setdefault(name, {})
+            if ours is theirs:
+                continue
+            for label, items in theirs.items.items():
+                if label in ours.items:
+                    ours.items[label].merge(items)
+                    ours.sketches[label].merge(theirs.sketches[label])
+                else:
+                    ours.items[label] = items
+                    ours.sketches[label] = theirs.sketches[label]
+            ours.totals.update(theirs.totals)
+        return self
+
+    # Запросы
+
+    @property
+    def vocabulary_size(self) -> Optional[int]:
+        return None
+
+    @property
+    def total(self) -> int:
+        self.flush()
+        return self._total
+
+    def labels(self, axis: str) -> List[Hashable]:
+        self.flush()
+        return list(self._axes[axis].items)
+
+    def label_totals(self, axis: str) -> Dict[Hashable, int]:
+        self.flush()
+        return dict(self._axes[axis].totals)
+
+    def count(self, word: str, axis: Optional[str] = None, label: Optional[Hashable] = None) -> int:
+        self.flush()
+        if axis is None:
+            return self.sketch.estimate(word)
+        sketch = self._axes[axis].sketches.get(label)
+        return sketch.estimate(word) if sketch is not None else 0
+
+    def most_common(
+        self, n: int, axis: Optional[str] = None, label: Optional[Hashable] = None
+    ) -> List[Tuple[str, int]]:
+        self.flush()
+        if axis is None:
+            items, sketch = self.frequent, self.sketch
+        else:
+            counts = self._axes[axis]
+            if label not in counts.items:
+                return []
+            items, sketch = counts.items[label], counts.sketches[label]
+        # Кандидаты с запасом: порядок Misra–Gries и Count-Min может расходиться
+        candidates = [word for word, _ in items.most_common(2 * n)]
+        estimates = [(word, sketch.estimate(word)) for word in candidates]
+        estimates.sort(key=lambda item: item[1], reverse=True)
+        return estimates[:n]
+
+    def spread(self, word: str, axis: str) -> int:
+        self.flush()
+        return sum(1 for items in self._axes[axis].items.values() if word in items)
+
+    def items(self, min_count: int = 1) -> List[Tuple[str, int]]:
+        """Отслеживаемые частые слова с оценкой частоты не меньше min_count"""
+        self.flush()
+        estimates = ((word, self.sketch.estimate(word)) for word in self.frequent.counts)
+        return [(word, count) for word, count in estimates if count >= min_count]
+
+
+def token_counts(n_rows: int, axes: Sequence[str] = ()):
+    """Точные счётчики или, для чатов длиннее SKETCH_ROWS сообщений, приближённые"""
+    return TokenSketch(axes) if n_rows > SKETCH_ROWS else TokenCounts(axes)
@@ -0,0 +1,131 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC)
+
+from tgchatsanalyzer.batch import RecordingStreamlit, find_exports, select_plugins
+
+PLUGIN = """
+import pandas as pd
+import streamlit as st
+
+def compute_plugin(chat):
+    return {user: int(count) for user, count in zip(chat.users, chat.message_counts)}
+
+def render_plugin(data, chat, result):
+    st.subheader("Counts")
+    limit = st.slider("Limit", 1, 10, 3)
+    st.metric("Users", len(result))
+    st.dataframe(pd.DataFrame({"user": list(result), "count": list(result.values())}))
+    st.write(f"limit={limit}")
+"""
+
+BROKEN = """
+def run_plugin(data, chat):
+    raise RuntimeError("boom")
+"""
+
+
+def write_export(path, name):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "name": name,
+            "messages": [
+                {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+                {"id": 2, "date": "2024-01-01T11:00:00", "from": "Bob", "text": "b"},
+                {"id": 3, "date": "2024-01-02T12:00:00", "from": "Alice", "text": "c"},
+            ],
+        }, f)
+
+
+class TestRecordingStreamlit:
+    def test_widgets_return_defaults(self):
+        st = RecordingStreamlit()
+        assert st.slider("a", 1, 10, 4) == 4
+        assert st.slider("a", 1, 10) == 1
+        assert st.selectbox("b", ["x", "y"], index=1) == "y"
+        assert st.multiselect("c", ["x", "y"], default=["x"]) == ["x"]
+        assert st.checkbox("d") is False
+        assert st.button("e") is False
+
+    def test_widget_value_from_session_state(self):
+        st = RecordingStreamlit()
+        st.session_state.limit = 7
+        assert st.slider("a", 1, 10, 4, key="limit") == 7
+
+    def test_records_tables_and_text(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            st = RecordingStreamlit(table_format="csv")
+            st.begin(tmp)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("hello")
+            col2.metric("Total", 3)
+            st.dataframe(pd.DataFrame({"a": [1, 2]}))
+            st.finish()
+
+            assert st.tables == ["table_01.csv"]
+            assert st.metrics == {"Total": "3"}
+            with open(os.path.join(tmp, "report.md"), encoding="utf-8") as f:
+                report = f.read()
+            assert "hello" in report and "**Total**: 3" in report
+
+
+class TestBatch:
+    def test_find_exports_recurses_into_directories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_export(os.path.join(tmp, "a", "result.json"), "A")
+            write_export(os.path.join(tmp, "b", "result.json"), "B")
+            assert find_exports([tmp]) == [
+                os.path.join(tmp, "a", "result.json"),
+                os.path.join(tmp, "b", "result.json"),
+            ]
+
+    def test_select_plugins_by_name(self):
+        plugins = select_plugins(["messages_counter"])
+        assert list(plugins) == ["messages_counter"]
+        assert plugins["messages_counter"].endswith("messages_counter.py")
+
+    def test_cli_writes_results_per_chat(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            exports = os.path.join(tmp, "exports")
+            write_export(os.path.join(exports, "a", "result.json"), "A")
+            write_export(os.path.join(exports, "b", "result.json"), "B")
+            plugin = os.path.join(tmp, "counter.py")
+            with open(plugin, "w") as f:
+                f.write(PLUGIN)
+            broken = os.path.join(tmp, "broken.py")
+            with open(broken, "w") as f:
+                f.write(BROKEN)
+            out = os.path.join(tmp, "out")
+
+            completed = subprocess.run(
+                [
+                    sys.executable, "-m", "tgchatsanalyzer.batch", exports,
+                    "--out", out, "--plugins", plugin, broken, "--workers", "2",
+                    "--format", "csv", "--cache-dir", os.path.join(tmp, "cache"),
+                ],
+                cwd=SRC, capture_output=True, text=True, timeout=120,
+            )
+
+            assert completed.returncode == 1, completed.stderr
+            assert "чатов/мин" in completed.stdout
+            with open(os.path.join(out, "summary.json")) as f:
+                total = json.load(f)
+            assert total["chats"] == 2 and len(total["failed"]) == 2
+
+            with open(os.path.join(out, "a", "result", "summary.json")) as f:
+                summary = json.load(f)
+            assert summary["messages"] == 3
+            assert summary["plugins"]["counter"]["status"] == "ok"
+            assert summary["plugins"]["counter"]["metrics"] == {"Users": "2"}
+            assert "boom" in summary["plugins"]["broken"]["error"]
+            table = pd.read_csv(os.path.join(out, "a", "result", "counter", "table_01.csv"), index_col=0)
+            assert dict(zip(table["user"], table["count"])) == {"Alice": 2, "Bob": 1}
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.cache import ChatCache, content_hash
+
+
+def make_file(n=30, name="Чат"):
+    data = {
+        "name": name,
+        "messages": [
+            {"id": i, "date": f"2024-02-{1 + i % 9:02d}T12:00:00", "from": ["A", "B"][i % 2],
+             "text": f"текст {i} 💕", "reactions": [{"emoji": "👍", "count": 1}] if i % 3 == 0 else []}
+            for i in range(n)
+        ],
+    }
+    return io.BytesIO(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+class TestContentHash:
+    def test_depends_on_content_and_keeps_position(self):
+        f = make_file()
+        f.seek(5)
+
+        assert content_hash(f) == content_hash(make_file())
+        assert content_hash(f) != content_hash(make_file(name="Другой"))
+        assert f.tell() == 5
+
+
+class TestChatCache:
+    def test_roundtrip_is_memory_mapped(self, tmp_path):
+        cache = ChatCache(str(tmp_path))
+        chat = cache.load(make_file())
+        cached = cache.get(chat.cache_key)
+
+        assert isinstance(cached.timestamps, np.memmap)
+        for column in ChatStore.ARRAY_COLUMNS:
+            assert np.array_equal(getattr(cached, column), getattr(chat, column)), column
+        assert cached.texts.tolist() == chat.texts.tolist()
+        assert cached.users == chat.users
+        assert cached.name == "Чат"
+
+    def test_second_load_skips_parsing(self, tmp_path):
+        cache = ChatCache(str(tmp_path))
+        cache.load(make_file())
+
+        with patch("tgchatsanalyzer.cache.load_chat") as mock_load:
+            chat = cache.load(make_file())
+
+        mock_load.assert_not_called()
+        assert len(chat) == 30
+
+    def test_no_cache_key_when_entry_not_written(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        cache = ChatCache(str(blocker / "cache"))
+
+        assert cache.put("key", ChatStore.from_data({"messages": []})) is False
+        chat = cache.load(make_file())
+        assert len(chat) == 30
+        assert chat.cache_key is None
+
+    def test_corrupt_entry_is_dropped(self, tmp_path):
+        cache = ChatCache(str(tmp_path))
+        key = cache.load(make_file()).cache_key
+        os.remove(os.path.join(str(tmp_path), key, "ids.npy"))
+
+        assert cache.get(key) is None
+        assert not os.path.exists(os.path.join(str(tmp_path), key))
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ChatCache(str(tmp_path))
+        first = cache.load(make_file(name="1")).cache_key
+        second = cache.load(make_file(name="2")).cache_key
+        os.utime(os.path.join(str(tmp_path), first), (0, 0))
+        os.utime(os.path.join(str(tmp_path), second), (1, 1))
+        cache.get(first)
+
+        entry_size = sum(
+            os.path.getsize(os.path.join(str(tmp_path), first, f))
+            for f in os.listdir(os.path.join(str(tmp_path), first))
+        )
+        cache.max_bytes = int(entry_size * 2.5)
+        third = cache.load(make_file(name="3")).cache_key
+
+        assert sorted(os.listdir(str(tmp_path))) == sorted([first, third])
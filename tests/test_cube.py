@@ -0,0 +1,121 @@
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore, Lexicon
+from tgchatsanalyzer import cube as cube_module
+from tgchatsanalyzer.features import lexicon_features
+
+
+def make_chat():
+    rng = np.random.default_rng(0)
+    messages = []
+    t = np.datetime64("2023-12-20T10:00:00")
+    for i in range(300):
+        t = t + np.timedelta64(int(rng.integers(60, 40000)), "s")
+        messages.append({
+            "id": i,
+            "date": str(t),
+            "from": ["Alice", "Bob", "Carol"][int(rng.integers(0, 3))],
+            "text": ["привет", "", "пока привет", "ну"][int(rng.integers(0, 4))],
+        })
+    messages.append({"id": 1000, "date": "2024-01-05T10:00:00", "actor": "Bob", "text": "привет"})
+    messages.append({"id": 1001, "date": "broken", "from": "Alice", "text": "привет"})
+    return ChatStore.from_data({"name": "Test Chat", "messages": messages})
+
+
+def naive(chat, keys, values):
+    counts = Counter()
+    for row, (code, key) in enumerate(zip(chat.senders.tolist(), keys)):
+        if code >= 0 and key is not None:
+            counts[chat.users[code], key] += values[row]
+    return counts
+
+
+def as_counter(chat, rollup):
+    return Counter({
+        (chat.users[code], label): value
+        for code in range(len(chat.users))
+        for label, value in zip(rollup.labels, rollup.values[code].tolist())
+        if value
+    })
+
+
+class TestActivityCube:
+    def test_rollups_match_calendar_keys(self):
+        chat = make_chat()
+        cube = chat.cube
+        ones = [1] * len(chat)
+
+        assert cube.messages.sum() == 300
+        assert as_counter(chat, cube.rollup(cube.messages, "day")) == naive(chat, chat.day_keys, ones)
+        assert as_counter(chat, cube.rollup(cube.messages, "week")) == naive(chat, chat.week_keys, ones)
+        assert as_counter(chat, cube.rollup(cube.chars, "month")) == naive(
+            chat, chat.month_keys, chat.text_lengths.tolist()
+        )
+        weekdays = [w if w >= 0 else None for w in chat.weekdays.tolist()]
+        assert as_counter(chat, cube.rollup(cube.text_messages, "weekday")) == naive(
+            chat, weekdays, (chat.text_lengths > 0).tolist()
+        )
+
+    def test_lexicon_totals(self):
+        chat = make_chat()
+        lexicon = Lexicon({"hi": {"привет"}, "bye": {"пока"}})
+        scores = chat.cube.totals(lexicon_features(chat, lexicon).categories)
+        months, monthly = chat.cube.rollup(scores, "month")
+
+        assert scores.shape == chat.cube.shape + (2,)
+        hi = [lexicon.counts(t).get("hi", 0) for t in chat.texts]
+        assert as_counter(chat, chat.cube.rollup(scores[:, :, 0], "month")) == naive(chat, chat.month_keys, hi)
+        assert months[0] == "2023-12"
+        assert monthly.shape == (len(chat.users), len(months), 2)
+
+    def test_unknown_period(self):
+        with pytest.raises(ValueError):
+            make_chat().cube.rollup(np.zeros((3, 1)), "year")
+
+    @pytest.mark.parametrize("max_cells", [cube_module.PREFIX_SUMS_MAX_CELLS, 0])
+    def test_hourly_prefix_sums_match_date_filter(self, monkeypatch, max_cells):
+        monkeypatch.setattr(cube_module, "PREFIX_SUMS_MAX_CELLS", max_cells)
+        chat = make_chat()
+        cube = chat.cube
+        senders = chat.senders[cube.rows]
+        days = chat.days[cube.rows]
+        hours = chat.hours[cube.rows].astype(np.int64)
+        rng = np.random.default_rng(1)
+        for _ in range(20):
+            start, end = np.sort(rng.integers(-3, cube.n_days + 3, size=2))
+            start_date, end_date = cube.start + start, cube.start + end
+            mask = (days >= start_date) & (days <= end_date)
+            expected = np.bincount(
+                senders[mask] * 24 + hours[mask], minlength=len(chat.users) * 24
+            ).reshape(len(chat.users), 24)[cube.senders]
+            np.testing.assert_array_equal(cube.hourly.between(*cube.day_range(start_date, end_date)), expected)
+
+        weekdays = chat.weekdays[cube.rows].astype(np.int64)
+        expected = np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+        np.testing.assert_array_equal(cube.weekday_hourly.between(0, cube.n_days), expected)
+        assert cube.hourly.between(0, cube.n_days).sum() == 300
+        assert not cube.hourly.between(5, 5).any()
+        expected_type = cube_module.RangeCounts if max_cells == 0 else cube_module.PrefixSums
+        assert isinstance(cube.hourly, expected_type)
+
+    def test_hourly_rows_cover_only_senders(self):
+        chat = ChatStore.from_data({"name": "Chat", "messages": [
+            {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a",
+             "reactions": [{"emoji": "👍", "count": 1, "recent": [{"from": "Dave"}]}]},
+            {"id": 2, "date": "2024-01-03T23:00:00", "from": "Bob", "text": "b"},
+        ]})
+        cube = chat.cube
+
+        assert [chat.users[code] for code in cube.senders] == ["Alice", "Bob"]
+        assert len(chat.users) == 3
+        assert cube.hourly.cumulative.shape == (4, 2, 24)
+        assert cube.hourly.cumulative.dtype == np.int32
+        counts = cube.hourly.between(0, cube.n_days)
+        assert counts[0, 10] == 1 and counts[1, 23] == 1 and counts.sum() == 2
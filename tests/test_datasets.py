@@ -0,0 +1,156 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.datasets import (
+    dataset,
+    get_dataset,
+    parse_duration,
+    plan,
+    prepare_datasets,
+)
+
+calls = []
+
+
+@dataset("test_base")
+def base(chat):
+    calls.append("base")
+    return len(chat)
+
+
+@dataset("test_scaled", requires=("test_base",), parametric=True)
+def scaled(chat, factor, base):
+    calls.append(f"scaled@{factor}")
+    return base * int(factor)
+
+
+@dataset("test_sum", requires=("test_scaled@2", "test_scaled@3"))
+def total(chat, double, triple):
+    return double + triple
+
+
+@dataset("test_cycle_a", requires=("test_cycle_b",))
+def cycle_a(chat, b):
+    return b
+
+
+@dataset("test_cycle_b", requires=("test_cycle_a",))
+def cycle_b(chat, a):
+    return a
+
+
+failures = []
+
+
+@dataset("test_flaky")
+def flaky(chat):
+    failures.append(1)
+    if len(failures) == 1:
+        raise RuntimeError("first call fails")
+    return "ok"
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+            {"id": 2, "date": "2024-01-01T10:05:00", "from": "Bob", "text": "b"},
+            {"id": 3, "date": "2024-01-01T16:00:00", "from": "Bob", "text": "c"},
+            {"id": 4, "date": "2024-01-01T16:30:00", "from": "Alice", "text": "d"},
+            {"id": 5, "date": "2024-01-02T09:00:00", "from": "Alice", "text": "e"},
+        ],
+    })
+
+
+class TestPlan:
+    def test_dependencies_come_first(self):
+        assert plan(["test_sum"]) == ["test_base", "test_scaled@2", "test_scaled@3", "test_sum"]
+
+    def test_unknown_and_cycle(self):
+        with pytest.raises(KeyError):
+            plan(["no_such_dataset"])
+        with pytest.raises(ValueError):
+            plan(["test_cycle_a"])
+        with pytest.raises(ValueError):
+            plan(["test_scaled"])
+
+    def test_parse_duration(self):
+        assert parse_duration("4h") == 4 * 3600
+        assert parse_duration("30m") == 1800
+        assert parse_duration("90") == 90
+
+
+class TestGetDataset:
+    def test_each_dataset_computed_once_per_chat(self):
+        calls.clear()
+        chat = make_chat()
+        assert get_dataset(chat, "test_sum") == 5 * 2 + 5 * 3
+        assert get_dataset(chat, "test_scaled@2") == 10
+        assert sorted(calls) == ["base", "scaled@2", "scaled@3"]
+
+        get_dataset(make_chat(), "test_base")
+        assert calls.count("base") == 2
+
+    def test_failure_is_not_cached(self):
+        chat = make_chat()
+        with pytest.raises(RuntimeError):
+            get_dataset(chat, "test_flaky")
+        assert get_dataset(chat, "test_flaky") == "ok"
+
+    def test_cycle_raises_instead_of_blocking(self):
+        with pytest.raises(ValueError):
+            get_dataset(make_chat(), "test_cycle_a")
+
+
+class TestPrepareDatasets:
+    def test_runs_graph_in_background(self):
+        calls.clear()
+        chat = make_chat()
+        futures = prepare_datasets(chat, ["test_sum", "test_scaled@2", "no_such_dataset"])
+
+        assert set(futures) == {"test_base", "test_scaled@2", "test_scaled@3", "test_sum"}
+        assert futures["test_sum"].result(timeout=10) == 25
+        assert get_dataset(chat, "test_sum") == 25
+        assert calls.count("base") == 1
+
+    def test_independent_nodes_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=10)
+
+        @dataset("test_left")
+        def left(chat):
+            barrier.wait()
+            return "left"
+
+        @dataset("test_right")
+        def right(chat):
+            barrier.wait()
+            return "right"
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = prepare_datasets(make_chat(), ["test_left", "test_right"], executor)
+            assert futures["test_left"].result(timeout=10) == "left"
+            assert futures["test_right"].result(timeout=10) == "right"
+
+
+class TestBuiltinDatasets:
+    def test_turn_deltas_sorted_by_delta(self):
+        turns = get_dataset(make_chat(), "turn_deltas")
+        assert turns["messages"] == 5
+        assert turns["deltas"].tolist() == [300, 1800]
+        assert turns["responders"].tolist() == [1, 0]
+
+    def test_conversation_starts_share_sessions(self):
+        chat = make_chat()
+        starts = get_dataset(chat, "conversation_starts@4h")
+        sessions = get_dataset(chat, "sessions@4h")
+        assert sessions.starts.tolist() == [0, 2, 4]
+        np.testing.assert_array_equal(starts, [2, 1])
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore, Scan, run_scan, scan_messages
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": 2, "date": "2024-01-01T12:00:00", "from": "Bob", "text": "hi"},
+            {"id": 1, "date": "2024-01-01T10:30:00", "from": "Alice",
+             "text": ["hello", {"type": "mention", "text": "@bob"}]},
+            {"id": 3, "date": "2024-01-02T00:00:00", "actor": "Bob", "text": ""},
+        ],
+    })
+
+
+class TestScanMessages:
+    def test_feeds_every_row_to_every_handler(self):
+        chat = make_chat()
+        first, second = [], []
+
+        scan_messages(chat, [
+            lambda row, sender, text: first.append((row, sender, text)),
+            lambda row, sender, text: second.append(row),
+        ])
+
+        assert first == [(0, "Alice", "hello @bob"), (1, "Bob", "hi"), (2, None, "")]
+        assert second == [0, 1, 2]
+
+    def test_failed_handler_is_dropped(self):
+        chat = make_chat()
+        seen, errors = [], []
+
+        def broken(row, sender, text):
+            raise ValueError(row)
+
+        scan_messages(
+            chat,
+            [broken, lambda row, sender, text: seen.append(row)],
+            on_error=lambda handler, exc: errors.append((handler, exc)),
+        )
+
+        assert seen == [0, 1, 2]
+        assert len(errors) == 1 and errors[0][0] is broken
+
+    def test_raises_without_error_callback(self):
+        def broken(row, sender, text):
+            raise ValueError(row)
+
+        with pytest.raises(ValueError):
+            scan_messages(make_chat(), [broken])
+
+
+class TestRunScan:
+    def test_renders_after_pass(self):
+        events = []
+        scan = Scan(
+            lambda row, sender, text: events.append(row),
+            lambda: events.append("render"),
+        )
+
+        run_scan(scan, make_chat())
+
+        assert events == [0, 1, 2, "render"]
+
+    def test_skips_plugin_without_scan(self):
+        run_scan(None, make_chat())
@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore, Lexicon
+from tgchatsanalyzer.features import lexicon_features, register_lexicon
+
+TEXTS = ["Люблю тебя, спасибо", "устала, всё плохо", "", "спасибо спасибо 😊", "ничего"]
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": i, "date": f"2024-01-01T10:0{i}:00", "from": "Alice" if i % 2 else "Bob", "text": text}
+            for i, text in enumerate(TEXTS)
+        ],
+    })
+
+
+class TestLexiconFeatures:
+    def test_matches_lexicon_per_message(self):
+        positive = register_lexicon(Lexicon({"love": {"люблю", "тебя"}, "thanks": {"спасибо": 2}}))
+        negative = register_lexicon(Lexicon({"sad": {"устала", "плохо"}, "emoji": {"😊": 0.5}}))
+        chat = make_chat()
+
+        for lexicon in (positive, negative):
+            features = lexicon_features(chat, lexicon)
+            for row, text in enumerate(chat.texts):
+                assert features.hits(row) == lexicon.hits(text)
+                assert features.counts(row) == lexicon.counts(text)
+                assert features.score(row) == lexicon.score(text)
+
+    def test_one_pass_for_all_registered(self):
+        first = register_lexicon(Lexicon({"a": {"спасибо"}}))
+        second = register_lexicon(Lexicon({"b": {"плохо"}}))
+        chat = make_chat()
+
+        lexicon_features(chat, first)
+        cache = chat.__dict__["_lexicon_features"]
+        assert first in cache and second in cache
+        assert lexicon_features(chat, second) is cache[second]
+
+    def test_unregistered_lexicon_and_totals(self):
+        lexicon = Lexicon({"thanks": {"спасибо"}, "sad": {"плохо", "устала"}})
+        chat = make_chat()
+
+        features = lexicon_features(chat, lexicon)
+        totals = features.categories.totals(chat.senders, len(chat.users))
+        alice, bob = chat.user_codes["Alice"], chat.user_codes["Bob"]
+        assert totals[bob].tolist() == [1, 0]
+        assert totals[alice].tolist() == [1, 2]
+        assert features.categories.column_totals().tolist() == [2, 2]
@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import Hit, Lexicon
+
+
+def brute_force(categories, text):
+    text_lower = text.lower()
+    return {
+        category: sorted(m for m in markers if m in text_lower)
+        for category, markers in categories.items()
+        if any(m in text_lower for m in markers)
+    }
+
+
+class TestLexicon:
+    def test_matches_substring_semantics(self):
+        categories = {
+            "desire": {"хочу", "хочу тебя", "тебя", "🔥"},
+            "rejection": {"не хочу", "потом", "хочу"},
+        }
+        lexicon = Lexicon(categories)
+
+        for text in ["Не хочу тебя 🔥", "потом потом", "", "ничего", "ХОЧУ ТЕБЯ!!"]:
+            hits = {c: sorted(found) for c, found in lexicon.hits(text).items()}
+            assert hits == brute_force(categories, text)
+
+    def test_counts_each_marker_once(self):
+        lexicon = Lexicon({"a": {"ха"}})
+
+        assert lexicon.counts("хахаха") == {"a": 1}
+        assert len(lexicon.find("хахаха")) == 3
+
+    def test_find_reports_positions(self):
+        lexicon = Lexicon({"a": {"ab", "b"}, "b": {"b"}})
+
+        assert sorted(lexicon.find("xab")) == sorted([
+            Hit("a", "ab", 1, 1),
+            Hit("a", "b", 1, 2),
+            Hit("b", "b", 1, 2),
+        ])
+
+    def test_weighted_score(self):
+        lexicon = Lexicon({"horny": {"хочу": 2, "🔥": 1.5}, "pms": {"устала": 1}})
+
+        assert lexicon.score("Хочу 🔥🔥 хочу") == {"horny": 3.5}
+        assert lexicon.score("") == {}
+
+    def test_overlapping_suffixes(self):
+        categories = {"x": {"she", "he", "hers", "his"}}
+        lexicon = Lexicon(categories)
+
+        assert sorted(lexicon.hits("ushers")["x"]) == ["he", "hers", "she"]
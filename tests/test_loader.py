@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.loader import _StreamReader, iter_export, load_chat
+
+
+def make_export():
+    return {
+        "name": "Тестовый чат",
+        "type": "personal_chat",
+        "id": 1234567890123,
+        "messages": [
+            {"id": i, "type": "message", "date": f"2024-01-0{1 + i % 5}T1{i % 10}:00:00",
+             "from": ["Аня", "Боря"][i % 2], "from_id": f"user{i % 2}",
+             "text": ["привет ", {"type": "mention", "text": "@bob"}] if i % 3 == 0 else f"сообщение {i}",
+             "reply_to_message_id": i - 1 if i % 4 == 0 and i else None,
+             "reactions": [{"emoji": "❤", "count": 2, "recent": [{"from": "Аня"}]}] if i % 5 == 0 else [],
+             "unused_heavy_field": "x" * 100}
+            for i in range(40)
+        ],
+    }
+
+
+def to_file(data, prefix=b""):
+    return io.BytesIO(prefix + json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+class TestLoadChat:
+    @pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+    def test_streaming_matches_full_parse(self, chunk_size):
+        data = make_export()
+        expected = ChatStore.from_data(data)
+        chat = load_chat(to_file(data), chunk_size=chunk_size)
+
+        assert chat.name == "Тестовый чат"
+        assert chat.info["id"] == 1234567890123
+        for column in ("ids", "timestamps", "senders", "reply_to", "reaction_counts",
+                       "text_lengths", "reaction_rows", "mention_rows"):
+            assert np.array_equal(getattr(chat, column), getattr(expected, column)), column
+        assert chat.texts.tolist() == expected.texts.tolist()
+        assert chat.users == expected.users
+
+    def test_reports_progress(self):
+        seen = []
+        load_chat(to_file(make_export()), chunk_size=256, progress=seen.append)
+
+        assert seen == sorted(seen)
+        assert seen[-1] == 1.0
+
+    def test_handles_bom_and_empty_messages(self):
+        chat = load_chat(to_file({"name": "Пусто", "messages": []}, prefix=b"\xef\xbb\xbf"))
+
+        assert chat.name == "Пусто"
+        assert len(chat) == 0
+
+    def test_rejects_truncated_file(self):
+        raw = to_file(make_export()).getvalue()[:-50]
+
+        with pytest.raises(ValueError):
+            load_chat(io.BytesIO(raw), chunk_size=64)
+
+
+class TestNumbersAtChunkBoundary:
+    RAW = '[123.75, 2.5e3, -0.5E-2, 7, 1e+2]'
+    EXPECTED = [123.75, 2500.0, -0.005, 7, 100.0]
+
+    @pytest.mark.parametrize("chunk_size", range(1, 36))
+    def test_reader_reads_whole_numbers(self, chunk_size):
+        reader = _StreamReader(io.BytesIO(self.RAW.encode()), chunk_size, None)
+        reader.expect('[')
+        values = []
+        while True:
+            values.append(reader.value())
+            sep = reader.peek()
+            reader.pos += 1
+            if sep == ']':
+                break
+            assert sep == ','
+
+        assert values == self.EXPECTED
+        assert all(type(v) is type(e) for v, e in zip(values, self.EXPECTED))
+
+    @pytest.mark.parametrize("chunk_size", range(1, 40))
+    def test_header_numbers(self, chunk_size):
+        raw = b'{"score": 123.75, "big": 2.5e3, "id": 42, "messages": []}'
+        header = {}
+        assert list(iter_export(io.BytesIO(raw), header, chunk_size=chunk_size)) == []
+
+        assert header == {"score": 123.75, "big": 2500.0, "id": 42}
+
+
+class TestMessageList:
+    def test_view_reproduces_projected_fields(self):
+        data = make_export()
+        messages = load_chat(to_file(data)).as_data()["messages"]
+
+        assert len(messages) == len(data["messages"])
+        msg = next(m for m in messages if m["id"] == 20)
+        assert msg["from"] == "Аня"
+        assert msg["date"] == data["messages"][20]["date"]
+        assert msg["reply_to_message_id"] == 19
+        assert msg["reactions"] == [{"emoji": "❤", "count": 2, "recent": [{"from": "Аня"}]}]
+        assert "unused_heavy_field" not in msg
+        assert messages[-1] == list(messages)[-1]
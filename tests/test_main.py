@@ -11,7 +11,12 @@ from main import (
     create_uploaded_file_from_path,
     get_module_name_from_path,
     load_and_run_plugin,
+    load_plugin_module,
+    run_plugins,
+    select_period,
 )
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.pool import load_plugin
 
 
 class TestCreateUploadedFileFromPath:
@@ -66,6 +71,16 @@ class TestGetModuleNameFromPath:
 
         assert name1 != name2
 
+    def test_pool_imports_the_same_module(self):
+        tmp_path = write_plugin("VALUE = 1\n")
+        try:
+            with patch("main.st"):
+                module = load_plugin_module(tmp_path)
+            assert load_plugin(tmp_path) is module
+            assert get_module_name_from_path(tmp_path) == get_module_name_from_path(os.path.relpath(tmp_path))
+        finally:
+            os.unlink(tmp_path)
+
 
 class TestLoadAndRunPlugin:
     def test_loads_and_runs_plugin_successfully(self):
@@ -133,6 +148,30 @@ def run_plugin(data):
         finally:
             os.unlink(tmp_path)
 
+    def test_passes_chat_store_to_two_argument_plugin(self):
+        plugin_content = """
+received = []
+
+def run_plugin(data, chat):
+    received.append(chat)
+"""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".py") as tmp:
+            tmp.write(plugin_content)
+            tmp_path = tmp.name
+
+        try:
+            test_data = {"messages": [], "name": "Test Chat"}
+            chat = object()
+
+            with patch("main.st") as mock_st:
+                load_and_run_plugin(tmp_path, test_data, chat=chat)
+
+                mock_st.error.assert_not_called()
+                module = sys.modules[get_module_name_from_path(tmp_path)]
+                assert module.received == [chat]
+        finally:
+            os.unlink(tmp_path)
+
     def test_handles_invalid_plugin_path(self):
         invalid_path = "/nonexistent/path/plugin.py"
         test_data = {"messages": [], "name": "Test Chat"}
@@ -142,3 +181,167 @@ def run_plugin(data):
 
             # Should call st.error for invalid path
             mock_st.error.assert_called()
+
+
+SCAN_PLUGIN = """
+from tgchatsanalyzer import Scan
+
+events = []
+
+def scan_plugin(data, chat):
+    events.append("setup")
+
+    def on_message(row, sender, text):
+        events.append(row)
+
+    def render():
+        events.append("render")
+
+    return Scan(on_message, render)
+"""
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+            {"id": 2, "date": "2024-01-01T11:00:00", "from": "Bob", "text": "b"},
+        ],
+    })
+
+
+def write_plugin(content):
+    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".py") as tmp:
+        tmp.write(content)
+        return tmp.name
+
+
+class TestScanPlugins:
+    def test_load_and_run_plugin_runs_scan_alone(self):
+        tmp_path = write_plugin(SCAN_PLUGIN)
+        try:
+            with patch("main.st") as mock_st:
+                load_and_run_plugin(tmp_path, {"messages": []}, chat=make_chat())
+
+                mock_st.error.assert_not_called()
+                module = sys.modules[get_module_name_from_path(tmp_path)]
+                assert module.events == ["setup", 0, 1, "render"]
+        finally:
+            os.unlink(tmp_path)
+
+    def test_run_plugins_shares_one_pass(self):
+        paths = [write_plugin(SCAN_PLUGIN), write_plugin(SCAN_PLUGIN)]
+        try:
+            with patch("main.st") as mock_st, patch("main.scan_messages") as mock_scan:
+                run_plugins([("a", paths[0]), ("b", paths[1])], {"messages": []}, chat=make_chat())
+
+                mock_st.error.assert_not_called()
+                assert mock_scan.call_count == 1
+                assert len(mock_scan.call_args[0][1]) == 2
+                for path in paths:
+                    assert sys.modules[get_module_name_from_path(path)].events == ["setup", "render"]
+        finally:
+            for path in paths:
+                os.unlink(path)
+
+    def test_run_plugins_reports_failed_handler(self):
+        broken = SCAN_PLUGIN.replace("events.append(row)", "raise ValueError('boom')")
+        paths = [write_plugin(broken), write_plugin(SCAN_PLUGIN)]
+        try:
+            with patch("main.st") as mock_st:
+                run_plugins([("a", paths[0]), ("b", paths[1])], {"messages": []}, chat=make_chat())
+
+                assert mock_st.error.call_count == 1
+                assert "boom" in mock_st.error.call_args[0][0]
+                assert sys.modules[get_module_name_from_path(paths[0])].events == ["setup"]
+                assert sys.modules[get_module_name_from_path(paths[1])].events == ["setup", 0, 1, "render"]
+        finally:
+            for path in paths:
+                os.unlink(path)
+
+
+class TestComputePlugins:
+    def test_load_and_run_plugin_computes_then_renders(self):
+        tmp_path = write_plugin("""
+rendered = []
+
+def compute_plugin(chat):
+    return len(chat)
+
+def render_plugin(data, chat, result):
+    rendered.append(result)
+""")
+        try:
+            with patch("main.st") as mock_st:
+                load_and_run_plugin(tmp_path, {"messages": []}, chat=make_chat())
+
+                mock_st.error.assert_not_called()
+                assert sys.modules[get_module_name_from_path(tmp_path)].rendered == [2]
+        finally:
+            os.unlink(tmp_path)
+
+    def test_load_and_run_plugin_v2_uses_controls_params(self):
+        tmp_path = write_plugin("""
+PARAMS = {"scale": 1}
+rendered = []
+
+def controls(chat):
+    return {"scale": 5}
+
+def compute(chat, params):
+    return len(chat) * params["scale"]
+
+def render(result):
+    rendered.append(result)
+""")
+        try:
+            with patch("main.st") as mock_st:
+                load_and_run_plugin(tmp_path, {"messages": []}, chat=make_chat())
+
+                mock_st.error.assert_not_called()
+                assert sys.modules[get_module_name_from_path(tmp_path)].rendered == [10]
+        finally:
+            os.unlink(tmp_path)
+
+    def test_run_plugins_reports_failed_controls(self):
+        tmp_path = write_plugin("""
+def controls(chat):
+    raise ValueError("bad widget")
+
+def compute(chat, params):
+    return 1
+
+def render(result):
+    pass
+""")
+        try:
+            with patch("main.st") as mock_st:
+                run_plugins([("a", tmp_path)], {"messages": []}, chat=make_chat())
+
+                assert mock_st.error.call_count == 1
+                assert "bad widget" in mock_st.error.call_args[0][0]
+        finally:
+            os.unlink(tmp_path)
+
+
+class TestSelectPeriod:
+    def test_narrow_period_gives_window(self):
+        chat = ChatStore.from_data({
+            "messages": [
+                {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+                {"id": 2, "date": "2024-01-02T11:00:00", "from": "Bob", "text": "b"},
+                {"id": 3, "date": "2024-01-03T12:00:00", "from": "Alice", "text": "c"},
+            ],
+        })
+        with patch("main.st") as mock_st:
+            first, last = (d.astype(object) for d in chat.days[[0, 2]])
+            mock_st.sidebar.date_input.return_value = (first, last)
+            assert select_period(chat) is chat
+
+            mock_st.sidebar.date_input.return_value = (first,)
+            assert select_period(chat) is chat
+
+            mock_st.sidebar.date_input.return_value = (chat.days[1].astype(object), last)
+            window = select_period(chat)
+            assert window.ids.tolist() == [2, 3]
@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.cache import ChatCache
+from tgchatsanalyzer.mapreduce import chunk_bounds, map_reduce, merge
+from tgchatsanalyzer.pool import PluginPool, load_plugin
+
+MAPPER = """
+from collections import Counter
+
+def count_chunk(chat, lo, hi):
+    return {"senders": Counter(chat.senders[lo:hi].tolist()), "rows": hi - lo}
+"""
+
+
+def make_chat(n=50):
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": i, "date": f"2024-01-01T10:{i % 60:02d}:00", "from": f"user{i % 3}", "text": "x"}
+            for i in range(n)
+        ],
+    })
+
+
+class TestChunkBounds:
+    def test_covers_all_rows(self):
+        bounds = chunk_bounds(10, 3)
+
+        assert bounds[0][0] == 0 and bounds[-1][1] == 10
+        assert all(hi - lo <= 3 for lo, hi in bounds)
+        assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+    def test_empty_chat_is_one_chunk(self):
+        assert chunk_bounds(0, 3) == [(0, 0)]
+
+
+class TestMerge:
+    def test_merges_nested_partials(self):
+        left = {"c": Counter(a=1), "n": 2, "arr": np.array([1, 2]), "only_left": [1]}
+        right = {"c": Counter(a=2, b=1), "n": 3, "arr": np.array([3, 4]), "only_right": [2]}
+
+        result = merge(left, right)
+
+        assert result["c"] == Counter(a=3, b=1)
+        assert result["n"] == 5
+        assert result["arr"].tolist() == [4, 6]
+        assert result["only_left"] == [1] and result["only_right"] == [2]
+
+    def test_rejects_unknown_types(self):
+        with pytest.raises(TypeError):
+            merge(object(), object())
+
+
+class TestMapReduce:
+    def test_chunked_result_matches_single_pass(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mapper.py")
+            with open(path, "w") as f:
+                f.write(MAPPER)
+            mapper = load_plugin(path).count_chunk
+            chat = make_chat()
+
+            whole = mapper(chat, 0, len(chat))
+            assert map_reduce(chat, mapper, chunk_rows=7) == whole
+
+            # Воркеры открывают чат из кэша
+            cache_dir = os.path.join(tmp, "cache")
+            ChatCache(cache_dir).put("key", chat)
+            chat.cache_key = "key"
+            pool = PluginPool(cache_dir, max_workers=2)
+            try:
+                assert map_reduce(chat, mapper, chunk_rows=20, pool=pool) == whole
+                # Запись вытеснена из кэша — чанки считаются в текущем процессе
+                chat.cache_key = "evicted"
+                assert map_reduce(chat, mapper, chunk_rows=20, pool=pool) == whole
+            finally:
+                pool.shutdown()
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.memo import ResultCache, memoize, memoize_future, results
+from tgchatsanalyzer.pool import load_plugin
+
+PLUGIN = """
+calls = []
+
+def collect(chat, hours):
+    calls.append(hours)
+    return {"rows": len(chat), "hours": hours}
+"""
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [{"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"}],
+    })
+
+
+def write_plugin(directory, content=PLUGIN):
+    path = os.path.join(directory, "memo_plugin.py")
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+class TestMemoize:
+    def test_recomputes_only_for_new_params(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_plugin(write_plugin(tmp))
+            chat = make_chat()
+            cache = ResultCache()
+
+            assert memoize(chat, module.collect, 4, cache=cache) == {"rows": 1, "hours": 4}
+            memoize(chat, module.collect, 4, cache=cache)
+            memoize(chat, module.collect, 8, cache=cache)
+
+            assert module.calls == [4, 8]
+            # Другой чат — другой ключ
+            memoize(make_chat(), module.collect, 4, cache=cache)
+            assert module.calls == [4, 8, 4]
+
+    def test_plugin_source_change_invalidates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp)
+            module = load_plugin(path)
+            chat = make_chat()
+            cache = ResultCache()
+            memoize(chat, module.collect, 1, cache=cache)
+
+            time.sleep(0.01)
+            write_plugin(tmp, PLUGIN + "\n# changed\n")
+            memoize(chat, module.collect, 1, cache=cache)
+
+            assert module.calls == [1, 1]
+
+    def test_lru_bound(self):
+        cache = ResultCache(max_entries=2)
+        for key in "abc":
+            cache.put(key, key)
+
+        assert cache.get("a") is None
+        assert cache.get("c") == "c"
+
+    def test_disk_copy_for_cached_chats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_plugin(write_plugin(tmp))
+            chat = make_chat()
+            chat.cache_key = "v1-abc"
+            memo_dir = os.path.join(tmp, "memo")
+
+            memoize(chat, module.collect, 2, cache=ResultCache(directory=memo_dir))
+            fresh = ResultCache(directory=memo_dir)
+            assert memoize(chat, module.collect, 2, cache=fresh) == {"rows": 1, "hours": 2}
+            assert module.calls == [2]
+
+
+class TestMemoizeFuture:
+    def test_remembers_finished_result(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_plugin(write_plugin(tmp))
+            chat = make_chat()
+            submitted = []
+
+            def submit():
+                submitted.append(True)
+                future = Future()
+                future.set_result(module.collect(chat, 3))
+                return future
+
+            try:
+                first = memoize_future(chat, module.collect, submit, 3)
+                second = memoize_future(chat, module.collect, submit, 3)
+
+                assert first.result() == second.result() == {"rows": 1, "hours": 3}
+                assert len(submitted) == 1
+            finally:
+                results.clear()
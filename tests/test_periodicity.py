@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer.periodicity import (
+    daily_series, find_peaks, moving_average, neighbour_max, peak_threshold, sliding_max,
+)
+
+
+def naive_peaks(values, window, min_distance, threshold):
+    peaks = []
+    for i in range(window, len(values) - window):
+        left = np.max(values[i - window:i])
+        right = np.max(values[i + 1:i + window + 1])
+        if values[i] >= left and values[i] >= right and values[i] >= threshold:
+            if not peaks or i - peaks[-1] >= min_distance:
+                peaks.append(i)
+    return peaks
+
+
+class TestDailySeries:
+    def test_fills_gaps_and_skips_nat(self):
+        days = np.array(["2024-01-03", "2024-01-01", "NaT", "2024-01-03", "2024-01-05"], dtype="datetime64[D]")
+        series = daily_series(days, np.array([1.0, 2.0, 5.0, 3.0, 4.0]))
+
+        assert series.start == np.datetime64("2024-01-01")
+        assert series.values.tolist() == [2, 0, 4, 0, 4]
+        assert str(series.dates[-1]) == "2024-01-05"
+
+    def test_columns_and_mask(self):
+        days = np.array(["2024-01-01", "2024-01-02", "2024-01-02"], dtype="datetime64[s]")
+        series = daily_series(days, np.array([[1, 10], [1, 20], [1, 30]]), mask=np.array([False, True, True]))
+
+        assert series.start == np.datetime64("2024-01-02")
+        assert series.values.tolist() == [[2, 50]]
+        assert len(daily_series(days, 1, mask=np.zeros(3, dtype=bool))) == 0
+
+
+class TestPeaks:
+    def test_sliding_max_matches_naive(self):
+        values = np.random.default_rng(0).normal(size=101)
+        for width in (1, 3, 7, 10, 101):
+            expected = [values[j:j + width].max() for j in range(len(values) - width + 1)]
+            assert np.allclose(sliding_max(values, width), expected)
+
+    def test_neighbour_max_edges(self):
+        left, right = neighbour_max(np.array([1.0, 5.0, 2.0]), 1)
+        assert left.tolist() == [-np.inf, 1, 5]
+        assert right.tolist() == [5, 2, -np.inf]
+
+    def test_find_peaks_matches_naive(self):
+        rng = np.random.default_rng(1)
+        for _ in range(20):
+            values = np.round(rng.normal(size=300), 1)
+            window = int(rng.integers(1, 15))
+            distance = int(rng.integers(1, 40))
+            threshold = peak_threshold(values)
+            assert find_peaks(values, window, distance, threshold) == naive_peaks(values, window, distance, threshold)
+
+    def test_short_series_and_threshold(self):
+        assert find_peaks(np.ones(5), 3) == []
+        assert peak_threshold(np.array([-1.0, 3.0])) == 1.0
+        assert peak_threshold(np.array([-3.0, 1.0])) == 0
+
+    def test_moving_average(self):
+        values = [1, 2, 3, 4, 5]
+        assert np.allclose(moving_average(values, 3), np.convolve(values, np.ones(3) / 3, mode="valid"))
@@ -0,0 +1,144 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer.plugins import HEAVY_MODULES, import_plugin, inspect_plugin, plugin_module_name, warm_up
+from tgchatsanalyzer.pool import load_plugin
+
+PLUGINS_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "plugins")
+
+COMPUTE_PLUGIN = '''"""
+Reply Counter
+Считает ответы по пользователям.
+"""
+raise RuntimeError("модуль не должен выполняться при разборе")
+
+
+def compute_plugin(chat):
+    return chat.reply_to[chat.senders >= 0]
+
+
+def render_plugin(data, chat, result):
+    pass
+'''
+
+RUN_PLUGIN = '''
+INPUTS = ("timestamps", "senders")
+
+
+def run_plugin(data):
+    return len(data["messages"])
+'''
+
+V2_PLUGIN = '''
+PARAMS = {"pause_hours": 4}
+DATASETS = ("sessions@4h", "turn_deltas")
+
+
+def compute(chat, params):
+    return chat.timestamps
+
+
+def render(result):
+    pass
+'''
+
+
+def write_plugin(directory, content, name="plugin.py"):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+class TestInspectPlugin:
+    def test_reads_docstring_entry_and_inputs_without_import(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            info = inspect_plugin(write_plugin(tmp, COMPUTE_PLUGIN))
+            assert info.name == "plugin"
+            assert info.title == "Reply Counter"
+            assert info.description == "Считает ответы по пользователям."
+            assert info.entry == "compute"
+            assert info.accepts_chat
+            assert info.inputs == ("reply_to", "senders")
+
+    def test_declared_inputs_and_legacy_signature(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            info = inspect_plugin(write_plugin(tmp, RUN_PLUGIN))
+            assert info.entry == "run"
+            assert not info.accepts_chat
+            assert info.inputs == ("timestamps", "senders")
+
+    def test_v2_entry_needs_compute_and_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            info = inspect_plugin(write_plugin(tmp, V2_PLUGIN))
+            assert info.entry == "compute"
+            assert info.accepts_chat
+            assert info.datasets == ("sessions@4h", "turn_deltas")
+            helper = V2_PLUGIN.replace("def render(result)", "def draw(result)")
+            assert inspect_plugin(write_plugin(tmp, helper, "helper.py")).entry is None
+
+    def test_builtin_plugins(self):
+        plugins_dir = os.path.join(os.path.dirname(__file__), "..", "src", "plugins")
+        expected = {
+            "messages_counter.py": "run",
+            "girlfriend_research/toxicity_detector.py": "scan",
+            "friend_research/topic_analysis.py": "compute",
+            "girlfriend_research/initiative_ratio.py": "compute",
+            # Вспомогательный модуль, не плагин
+            "girlfriend_research/text_analyzer.py": None,
+        }
+        for name, entry in expected.items():
+            assert inspect_plugin(os.path.join(plugins_dir, name)).entry == entry, name
+
+
+class TestImportPlugin:
+    def test_failed_import_leaves_no_module(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp, COMPUTE_PLUGIN)
+            with pytest.raises(RuntimeError):
+                import_plugin(path, "plugin_broken_test")
+            assert "plugin_broken_test" not in sys.modules
+
+    def test_imports_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp, RUN_PLUGIN)
+            module = import_plugin(path, "plugin_once_test")
+            assert import_plugin(path, "plugin_once_test") is module
+            del sys.modules["plugin_once_test"]
+
+
+class TestWarmUp:
+    def test_imports_plugins_in_background(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            good = write_plugin(tmp, RUN_PLUGIN, "good.py")
+            broken = write_plugin(tmp, COMPUTE_PLUGIN, "broken.py")
+            names = {good: "plugin_warm_good", broken: "plugin_warm_broken"}
+            warm_up([broken, good], names.get).join(timeout=60)
+            assert "plugin_warm_good" in sys.modules
+            assert "plugin_warm_broken" not in sys.modules
+            del sys.modules["plugin_warm_good"]
+
+    def test_imports_selected_builtin_plugins_under_app_names(self):
+        selected = [os.path.join(PLUGINS_DIR, name) for name in ("hourly_activity.py", "reply_network.py")]
+        skipped = os.path.join(PLUGINS_DIR, "radio_silence.py")
+        names = [plugin_module_name(path) for path in selected]
+        for name in names + [plugin_module_name(skipped)]:
+            sys.modules.pop(name, None)
+        try:
+            warm_up(selected, plugin_module_name).join(timeout=120)
+
+            for path, name in zip(selected, names):
+                module = sys.modules[name]
+                assert os.path.samefile(module.__file__, path)
+                # Пул и main берут уже прогретый модуль, а не импортируют заново
+                assert load_plugin(path) is module
+            assert plugin_module_name(skipped) not in sys.modules
+            assert all(name in sys.modules for name in HEAVY_MODULES)
+        finally:
+            for name in names:
+                sys.modules.pop(name, None)
@@ -0,0 +1,160 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.cache import ChatCache
+from tgchatsanalyzer.pool import (
+    PluginPool,
+    compute_args,
+    is_compute_plugin,
+    load_plugin,
+    render_result,
+    shared_result,
+)
+
+PLUGIN = """
+def compute_plugin(chat):
+    return {user: int(count) for user, count in zip(chat.users, chat.message_counts)}
+
+def render_plugin(data, chat, result):
+    pass
+"""
+
+PLUGIN_V2 = """
+PARAMS = {"min_count": 1, "scale": 1}
+calls = []
+
+def controls(chat):
+    return {"min_count": 2}
+
+def compute(chat, params):
+    calls.append(params)
+    return {
+        user: int(count) * params["scale"]
+        for user, count in zip(chat.users, chat.message_counts)
+        if count >= params["min_count"]
+    }
+
+def render(result):
+    calls.append(("render", result))
+"""
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+            {"id": 2, "date": "2024-01-01T11:00:00", "from": "Bob", "text": "b"},
+            {"id": 3, "date": "2024-01-01T12:00:00", "from": "Alice", "text": "c"},
+        ],
+    })
+
+
+def write_plugin(directory, content=PLUGIN, name="counter.py"):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+class TestPluginPool:
+    def test_computes_inline_without_cache_entry(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp)
+            module = load_plugin(path)
+            assert is_compute_plugin(module)
+
+            future = PluginPool(tmp, max_workers=2).submit(path, module, make_chat())
+
+            assert future.result() == {"Alice": 2, "Bob": 1}
+
+    def test_worker_opens_chat_from_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp)
+            cache_dir = os.path.join(tmp, "cache")
+            chat = make_chat()
+            ChatCache(cache_dir).put("key", chat)
+            chat.cache_key = "key"
+
+            pool = PluginPool(cache_dir, max_workers=2)
+            try:
+                future = pool.submit(path, load_plugin(path), chat)
+                assert future.result(timeout=60) == {"Alice": 2, "Bob": 1}
+            finally:
+                pool.shutdown()
+
+    def test_worker_opens_window_of_cached_chat(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp)
+            cache_dir = os.path.join(tmp, "cache")
+            chat = make_chat()
+            ChatCache(cache_dir).put("key", chat)
+            chat.cache_key = "key"
+            window = chat.window(1, len(chat))
+
+            pool = PluginPool(cache_dir, max_workers=2)
+            try:
+                future = pool.submit(path, load_plugin(path), window)
+                assert future.result(timeout=60) == {"Alice": 1, "Bob": 1}
+            finally:
+                pool.shutdown()
+
+    def test_missing_cache_entry_computes_inline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp)
+            chat = make_chat()
+            # Ключ есть, а записи на диске нет (например, вытеснена)
+            chat.cache_key = "evicted"
+
+            pool = PluginPool(os.path.join(tmp, "cache"), max_workers=2)
+            try:
+                future = pool.submit(path, load_plugin(path), chat)
+                assert future.result(timeout=60) == {"Alice": 2, "Bob": 1}
+            finally:
+                pool.shutdown()
+
+class TestPluginApiV2:
+    def test_params_from_defaults_controls_and_overrides(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_plugin(write_plugin(tmp, PLUGIN_V2, "v2.py"))
+            assert is_compute_plugin(module)
+            assert compute_args(module) == ({"min_count": 1, "scale": 1},)
+            assert compute_args(module, make_chat()) == ({"min_count": 2, "scale": 1},)
+            assert compute_args(module, params={"scale": 3}) == ({"min_count": 1, "scale": 3},)
+            assert compute_args(load_plugin(write_plugin(tmp))) == ()
+
+    def test_render_receives_only_result(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            module = load_plugin(write_plugin(tmp, PLUGIN_V2, "v2.py"))
+            render_result(module, {"messages": []}, make_chat(), {"Alice": 2})
+            assert module.calls == [("render", {"Alice": 2})]
+
+    def test_worker_computes_with_params(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp, PLUGIN_V2, "v2.py")
+            cache_dir = os.path.join(tmp, "cache")
+            chat = make_chat()
+            ChatCache(cache_dir).put("key", chat)
+            chat.cache_key = "key"
+
+            pool = PluginPool(cache_dir, max_workers=2)
+            try:
+                future = pool.submit(path, load_plugin(path), chat, {"min_count": 2, "scale": 10})
+                assert future.result(timeout=60) == {"Alice": 20}
+            finally:
+                pool.shutdown()
+
+    def test_shared_result_is_memoized(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_plugin(tmp, PLUGIN_V2, "v2.py")
+            chat = make_chat()
+
+            first = shared_result(chat, path, {"scale": 2})
+            second = shared_result(chat, path, {"scale": 2})
+
+            assert first == second == {"Alice": 4, "Bob": 2}
+            assert load_plugin(path).calls == [{"min_count": 1, "scale": 2}]
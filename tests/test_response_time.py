@@ -0,0 +1,90 @@
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC)
+
+spec = importlib.util.spec_from_file_location(
+    "response_time", os.path.join(SRC, "plugins", "girlfriend_research", "response_time.py")
+)
+response_time = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(response_time)
+
+
+def make_turns(n=200, n_users=4, seed=0):
+    rng = np.random.default_rng(seed)
+    deltas = np.sort(rng.integers(1, 3 * 86400, size=n))
+    # Много одинаковых времён: стабильная сортировка не должна их путать
+    if n > 20:
+        deltas[10:20] = deltas[10]
+    return {
+        "messages": n + 1,
+        "deltas": deltas,
+        # Пользователь 3 ни разу не отвечает
+        "responders": rng.integers(0, n_users - 1, size=n),
+        "months": rng.integers(0, 5, size=n),
+        "hours": rng.integers(0, 24, size=n),
+    }
+
+
+class TestWithin:
+    def test_cut_includes_threshold_value(self):
+        turns = make_turns()
+        turns["deltas"][50:60] = 7200
+        turns["deltas"].sort()
+
+        cut = response_time.within(turns, 2)
+        assert cut["deltas"].max() == 7200
+        assert len(cut["deltas"]) == int((turns["deltas"] <= 7200).sum())
+        assert all(len(cut[key]) == len(cut["deltas"]) for key in ("responders", "months", "hours"))
+        assert len(response_time.within(turns, 0)["deltas"]) == 0
+
+
+class TestGroupStats:
+    @pytest.mark.parametrize("n", [1, 2, 7, 200])
+    def test_matches_numpy_per_group(self, n):
+        turns = make_turns(n)
+        keys, deltas = turns["responders"], turns["deltas"]
+        stats = response_time.group_stats(keys, deltas, 4)
+
+        for group in range(4):
+            values = deltas[keys == group]
+            assert stats["count"][group] == len(values)
+            if not len(values):
+                for name in ("mean", "median", "min", "max"):
+                    assert np.isnan(stats[name][group])
+                continue
+            assert stats["mean"][group] == pytest.approx(np.mean(values))
+            assert stats["median"][group] == pytest.approx(np.median(values))
+            assert stats["min"][group] == values.min()
+            assert stats["max"][group] == values.max()
+
+    def test_even_and_odd_group_sizes(self):
+        keys = np.array([0, 1, 0, 1, 0, 1, 1])
+        deltas = np.array([1, 2, 3, 4, 5, 6, 10])
+        stats = response_time.group_stats(keys, deltas, 3)
+
+        # Группа 0: 1, 3, 5; группа 1: 2, 4, 6, 10; группа 2 пуста
+        assert stats["median"][:2].tolist() == [3, 5]
+        assert stats["count"].tolist() == [3, 4, 0]
+        assert np.isnan(stats["median"][2])
+
+
+class TestBucketMeans:
+    def test_matches_numpy_mean_with_nan_for_empty(self):
+        turns = make_turns()
+        buckets = turns["hours"]
+        means = response_time.bucket_means(turns, buckets, 4, 24)
+
+        assert means.shape == (4, 24)
+        for user in range(4):
+            for bucket in range(24):
+                values = turns["deltas"][(turns["responders"] == user) & (buckets == bucket)]
+                if len(values):
+                    assert means[user, bucket] == pytest.approx(np.mean(values))
+                else:
+                    assert np.isnan(means[user, bucket])
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.segments import gap_positions, runs, split_by_gap
+
+
+def make_chat():
+    return ChatStore.from_data({
+        "name": "Test Chat",
+        "messages": [
+            {"id": 1, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+            {"id": 2, "date": "2024-01-01T10:05:00", "from": "Bob", "text": "b"},
+            {"id": 3, "date": "2024-01-01T10:06:00", "actor": "Bob", "text": ""},
+            {"id": 4, "date": "2024-01-01T10:07:00", "from": "Bob", "text": "c"},
+            {"id": 5, "date": "2024-01-01T20:00:00", "from": "Alice", "text": "d"},
+            {"id": 6, "date": "broken", "from": "Alice", "text": "e"},
+        ],
+    })
+
+
+class TestSplitting:
+    def test_gap_positions_and_sessions(self):
+        timestamps = np.array([0, 10, 100, 105, 300])
+
+        assert gap_positions(timestamps, 50).tolist() == [2, 4]
+        sessions = split_by_gap(timestamps, 50)
+        assert sessions.starts.tolist() == [0, 2, 4]
+        assert sessions.stops.tolist() == [2, 4, 5]
+        assert sessions.ids().tolist() == [0, 0, 1, 1, 2]
+        assert sessions.sums(np.array([1, 2, 3, 4, 5])).tolist() == [3, 7, 5]
+
+    def test_empty(self):
+        assert len(split_by_gap(np.array([], dtype=np.int64), 10)) == 0
+        assert len(runs(np.array([], dtype=bool))) == 0
+
+    def test_runs(self):
+        streaks = runs(np.array([True, True, False, True, False, True]))
+        assert streaks.starts.tolist() == [0, 3, 5]
+        assert streaks.sizes.tolist() == [2, 1, 1]
+
+
+class TestTimeline:
+    def test_skips_service_and_undated_messages(self):
+        timeline = make_chat().timeline
+
+        assert len(timeline) == 4
+        assert timeline.deltas.tolist() == [0, 300, 120, 35580]
+        assert timeline.turns.tolist() == [1, 3]
+
+    def test_sessions_are_cached_per_threshold(self):
+        timeline = make_chat().timeline
+
+        sessions = timeline.sessions(4 * 3600)
+        assert sessions.starts.tolist() == [0, 3]
+        assert timeline.sessions(4 * 3600) is sessions
+        assert timeline.sessions(200).starts.tolist() == [0, 1, 3]
@@ -0,0 +1,179 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import ChatStore, flatten_text
+
+
+def make_data():
+    return {
+        "name": "Test Chat",
+        "messages": [
+            {"id": 2, "date": "2024-01-01T12:00:00", "from": "Bob", "text": "hi",
+             "reply_to_message_id": 1,
+             "reactions": [{"emoji": "👍", "count": 3, "recent": [{"from": "Alice"}]}]},
+            {"id": 1, "date": "2024-01-01T10:30:00", "from": "Alice",
+             "text": ["hello ", {"type": "mention", "text": "@bob"}]},
+            {"id": 3, "date": "broken", "from": "Alice", "text": "no date"},
+            {"id": 4, "date": "2024-01-02T00:00:00", "actor": "Bob", "text": ""},
+        ],
+    }
+
+
+class TestFlattenText:
+    def test_joins_entities(self):
+        assert flatten_text(["a", {"type": "bold", "text": "b"}, {"type": "x"}]) == "a b"
+
+    def test_handles_empty(self):
+        assert flatten_text(None) == ""
+        assert flatten_text("") == ""
+
+
+class TestChatStore:
+    def test_rows_sorted_by_time_with_undated_last(self):
+        chat = ChatStore.from_data(make_data())
+
+        assert len(chat) == 4
+        assert chat.n_dated == 3
+        assert chat.ids.tolist() == [1, 2, 4, 3]
+        assert np.all(np.diff(chat.timestamps[: chat.n_dated]) >= 0)
+
+    def test_columns(self):
+        chat = ChatStore.from_data(make_data())
+
+        assert chat.users == ["Bob", "Alice"]
+        assert [chat.users[s] if s >= 0 else None for s in chat.senders] == [
+            "Alice", "Bob", None, "Alice"
+        ]
+        assert chat.texts[0] == "hello  @bob"
+        assert chat.text_lengths.tolist() == [len(t) for t in chat.texts]
+        assert chat.reply_to.tolist() == [-1, 1, -1, -1]
+        assert chat.reaction_counts.tolist() == [0, 3, 0, 0]
+        assert chat.timestamps[0] % 86400 == 10 * 3600 + 30 * 60
+
+    def test_reactions_and_mentions_follow_sorted_rows(self):
+        chat = ChatStore.from_data(make_data())
+
+        assert chat.reaction_rows.tolist() == [1]
+        assert chat.emojis[chat.reaction_emojis[0]] == "👍"
+        assert chat.users[chat.recent_users[0]] == "Alice"
+        assert chat.mention_rows.tolist() == [0]
+        assert chat.mention_names == ["bob"]
+
+    def test_participants_exclude_reactors_without_messages(self):
+        data = make_data()
+        data["messages"][0]["reactions"][0]["recent"] = [{"from": "Carol"}]
+        chat = ChatStore.from_data(data)
+
+        assert "Carol" in chat.users
+        assert chat.participants == ["Bob", "Alice"]
+
+    def test_empty_chat(self):
+        chat = ChatStore.from_data({"messages": []})
+
+        assert len(chat) == 0
+        assert chat.n_dated == 0
+        assert chat.participants == []
+
+    def test_calendar_columns(self):
+        chat = ChatStore.from_data(make_data())
+
+        assert chat.hours.tolist() == [10, 12, 0, -1]
+        assert chat.weekdays.tolist() == [0, 0, 1, -1]
+        assert chat.day_keys == ["2024-01-01", "2024-01-01", "2024-01-02", None]
+        assert chat.month_keys == ["2024-01", "2024-01", "2024-01", None]
+        assert chat.datetimes[0] == datetime(2024, 1, 1, 10, 30)
+        assert chat.datetimes[3] is None
+        assert str(chat.dates[3]) == "NaT"
+
+    def test_week_keys_match_strftime(self):
+        days = [datetime(2023, 12, 31) + timedelta(days=i) for i in range(400)]
+        chat = ChatStore.from_data({"messages": [
+            {"id": i, "date": d.isoformat(), "from": "A", "text": ""} for i, d in enumerate(days)
+        ]})
+
+        assert chat.week_keys == [d.strftime("%Y-W%W") for d in days]
+
+
+class TestWindow:
+    def make_chat(self):
+        data = make_data()
+        data["messages"].append(
+            {"id": 5, "date": "2024-01-03T09:00:00", "from": "Bob", "text": "later",
+             "reply_to_message_id": 2,
+             "reactions": [{"emoji": "❤", "count": 1, "recent": [{"from": "Alice"}]}]}
+        )
+        return ChatStore.from_data(data)
+
+    def test_rows_between_uses_inclusive_dates(self):
+        chat = self.make_chat()
+
+        assert chat.rows_between("2024-01-01", "2024-01-01") == (0, 2)
+        assert chat.rows_between("2024-01-02", "2024-01-03") == (2, 4)
+        assert chat.rows_between("2023-01-01", "2030-01-01") == (0, chat.n_dated)
+        assert chat.rows_between("2024-01-03", "2024-01-02") == (3, 3)
+
+    def test_window_is_view_over_same_columns(self):
+        chat = self.make_chat()
+        window = chat.window(1, 4)
+
+        assert len(window) == 3 and window.n_dated == 3
+        assert np.shares_memory(window.timestamps, chat.timestamps)
+        assert window.texts.buffer is chat.texts.buffer
+        assert [m["id"] for m in window.as_data()["messages"]] == [2, 4, 5]
+        assert list(window.as_data()["messages"]) == list(chat.as_data()["messages"])[1:4]
+        assert window.users == chat.users
+        assert window.mention_rows.tolist() == []
+        # Ответ на сообщение вне окна не находится
+        assert window.reply_rows.tolist() == [-1, -1, 0]
+        assert window.window(1, 3).n_dated == 2
+        assert chat.window(1, 4) is window
+
+    def test_window_cache_key_points_at_source(self):
+        chat = self.make_chat()
+        chat.cache_key = "abc"
+
+        assert chat.window(1, 4).window(1, 2).cache_key == "abc@2:3"
+        assert ChatStore.from_data(make_data()).window(0, 1).cache_key is None
+
+
+class TestReplyIndex:
+    def make_chat(self, step=1):
+        return ChatStore.from_data({
+            "name": "Replies",
+            "messages": [
+                {"id": 1 * step, "date": "2024-01-01T10:00:00", "from": "Alice", "text": "a"},
+                {"id": 2 * step, "date": "2024-01-01T10:01:00", "from": "Bob", "text": "b",
+                 "reply_to_message_id": 1 * step},
+                {"id": 3 * step, "date": "2024-01-01T10:02:00", "from": "Alice", "text": "c",
+                 "reply_to_message_id": 2 * step},
+                {"id": 4 * step, "date": "2024-01-01T10:03:00", "from": "Bob", "text": "d",
+                 "reply_to_message_id": 1 * step},
+                {"id": 5 * step, "date": "2024-01-01T10:04:00", "from": "Bob", "text": "e",
+                 "reply_to_message_id": 4 * step},
+                {"id": 6 * step, "date": "2024-01-01T10:05:00", "from": "Alice", "text": "f",
+                 "reply_to_message_id": 999 * step},
+            ],
+        })
+
+    def test_id_index_dense_and_sparse(self):
+        for step in (1, 100000):
+            chat = self.make_chat(step)
+            assert chat.id_index.rows([3 * step, 7 * step, -1, 0]).tolist() == [2, -1, -1, -1]
+            assert chat.id_index.row(6 * step) == 5
+            assert chat.reply_rows.tolist() == [-1, 0, 1, 0, 3, -1]
+
+    def test_reply_graph_skips_self_and_missing(self):
+        chat = self.make_chat()
+        alice, bob = chat.user_codes["Alice"], chat.user_codes["Bob"]
+        graph = chat.reply_graph
+
+        assert sorted(graph.edges()) == sorted([(bob, alice, 2), (alice, bob, 1)])
+        targets, counts = graph.replies(bob)
+        assert targets.tolist() == [alice] and counts.tolist() == [2]
+        assert graph.sent[[alice, bob]].tolist() == [1, 2]
+        assert graph.received[[alice, bob]].tolist() == [2, 1]
@@ -0,0 +1,137 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "plugins", "girlfriend_research"))
+
+from text_analyzer import (
+    PatternMatcher,
+    RelationshipAnalyzer,
+    SentimentAnalyzer,
+    extract_words,
+    negation_flags,
+    normalize_text,
+    prepare_text,
+)
+
+
+@pytest.fixture(scope="module")
+def sentiment():
+    return SentimentAnalyzer()
+
+
+class TestNegation:
+    def test_window_after_each_negation(self):
+        words = "я не люблю ждать но тебя очень люблю".split()
+        assert negation_flags(words) == [False, False, True, True, True, False, False, False]
+        assert prepare_text("Я  НЕ люблю").negated == [False, False, True]
+
+
+class TestSentimentAnalyzer:
+    def test_negation_applies_per_occurrence(self, sentiment):
+        result = sentiment.analyze("Я не люблю ждать, но тебя очень люблю")
+
+        assert result["negative_words"] == ["не люблю"]
+        assert result["positive_words"] == ["люблю"]
+        assert result["positive_score"] == result["negative_score"] == 2
+        assert result["score"] == 0
+
+    def test_repeated_word_counts_twice(self, sentiment):
+        result = sentiment.analyze("люблю люблю")
+
+        assert result["positive_words"] == ["люблю", "люблю"]
+        assert result["positive_score"] == 4
+        assert result["score"] == 1
+        assert result["confidence"] == pytest.approx(0.8)
+
+    def test_emoji_only_text(self, sentiment):
+        result = sentiment.analyze("😍😍💔")
+
+        assert result["positive_words"] == ["😍", "😍"]
+        assert result["negative_words"] == ["💔"]
+        assert result["score"] == pytest.approx((4 - 1.5) / 5.5)
+        # Составной эмодзи (сердце с вариационным селектором) — один маркер
+        assert sentiment.analyze("❤️")["positive_words"] == ["❤️"]
+
+    def test_empty_text(self, sentiment):
+        assert sentiment.analyze("") == {
+            "score": 0.0,
+            "positive_words": [],
+            "negative_words": [],
+            "positive_score": 0.0,
+            "negative_score": 0.0,
+            "confidence": 0.0,
+        }
+
+    def test_analyze_many_matches_analyze(self, sentiment):
+        texts = ["люблю", "не люблю", "", "люблю", "ужасно 😡", "ок"]
+        results = sentiment.analyze_many(texts)
+
+        assert results == [sentiment.analyze(text) for text in texts]
+        # Одинаковые тексты получают независимые копии
+        results[0]["positive_words"].append("x")
+        assert results[3]["positive_words"] == ["люблю"]
+
+
+def baseline_find_all(patterns, text):
+    """Поиск по категориям отдельно, как до общего матчера"""
+    lower = normalize_text(text)
+    words = extract_words(text)
+    results = {}
+    for category, pattern_set in patterns.items():
+        found = []
+        for pattern in pattern_set:
+            if " " in pattern and pattern in lower:
+                idx = lower.find(pattern)
+                found.append((pattern, lower[max(0, idx - 30):idx + len(pattern) + 30]))
+        for idx, word in enumerate(words):
+            if word in pattern_set:
+                negated = negation_flags(words)[idx]
+                found.append((f"не {word}" if negated else word, " ".join(words[max(0, idx - 3):idx + 4])))
+        if found:
+            results[category] = sorted(found)
+    return results
+
+
+class TestPatternMatcher:
+    def test_phrase_and_word_hits(self):
+        matcher = PatternMatcher({"забота": {"как дела", "рядом"}})
+        hits = matcher.matches("Привет, как дела? Я рядом")
+
+        assert [(hit.pattern, hit.start) for hit in hits] == [("как дела", 8), ("рядом", 20)]
+        assert matcher.find_all("Привет, как дела? Я рядом") == {
+            "забота": [("как дела", "привет, как дела? я рядом"), ("рядом", "как дела я рядом")]
+        }
+
+    def test_negated_word(self):
+        matcher = PatternMatcher({"запреты": {"нельзя"}})
+
+        assert matcher.find_all("тебе не нельзя, а просто нельзя") == {
+            "запреты": [("не нельзя", "тебе не нельзя а просто нельзя"),
+                        ("нельзя", "нельзя а просто нельзя")]
+        }
+
+    def test_combined_matcher_matches_per_category_baseline(self):
+        analyzer = RelationshipAnalyzer()
+        texts = [
+            "ты где? с кем ты сейчас",
+            "я рядом, всё будет хорошо, ты справишься",
+            "ты меня любишь? я тебе надоела",
+            "не ходи туда, нельзя. покажи переписку",
+            "обычное сообщение без паттернов",
+        ]
+        for text, result in zip(texts, analyzer.analyze_many(texts)):
+            for aspect, patterns in analyzer.aspects.items():
+                found = {category: sorted(matches) for category, matches in result[aspect].items()}
+                assert found == baseline_find_all(patterns, text), (aspect, text)
+
+    def test_analyze_many_returns_independent_copies(self):
+        analyzer = RelationshipAnalyzer()
+        first, second = analyzer.analyze_many(["ты где", "ты где"])
+
+        assert first == second == analyzer.analyze_message("ты где")
+        first["control"]["слежка"].append(("x", "x"))
+        first["sentiment"]["score"] = 1
+        assert second == analyzer.analyze_message("ты где")
@@ -0,0 +1,45 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer.texts import TextStore
+
+TEXTS = ["Привет", "", "hello 😊", "ÀÉ \ud83d", "ok"]
+
+
+class TestTextStore:
+    def test_round_trip(self):
+        texts = TextStore.from_strings(TEXTS)
+
+        assert len(texts) == 5
+        assert list(texts) == TEXTS
+        assert texts[0] == "Привет" and texts[-1] == "ok"
+        assert bytes(texts.view(2)) == "hello 😊".encode("utf-8")
+        assert texts.nbytes == len(texts.buffer)
+        with pytest.raises(IndexError):
+            texts[5]
+
+    def test_slices_and_take(self):
+        texts = TextStore.from_strings(TEXTS)
+
+        part = texts[1:4]
+        assert part.buffer is texts.buffer
+        assert part.tolist() == TEXTS[1:4]
+        assert texts[::2].tolist() == TEXTS[::2]
+        assert texts.take([4, 0, 2]).tolist() == ["ok", "Привет", "hello 😊"]
+        assert texts.take(np.array([True, False, False, False, True])).tolist() == ["Привет", "ok"]
+
+    def test_lowered_and_pickle(self):
+        texts = TextStore.from_strings(TEXTS)
+
+        assert texts.lowered.tolist() == [t.lower() for t in TEXTS]
+        assert texts.lower(0) == "привет"
+
+        part = pickle.loads(pickle.dumps(texts[2:4]))
+        assert part.tolist() == TEXTS[2:4]
+        assert len(part.buffer) == part.nbytes
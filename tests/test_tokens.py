@@ -0,0 +1,88 @@
+import os
+import pickle
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from tgchatsanalyzer import tokens
+from tgchatsanalyzer.mapreduce import merge
+from tgchatsanalyzer.tokens import CountMinSketch, FrequentItems, TokenCounts, TokenSketch, Vocabulary, word_hash
+
+MESSAGES = [
+    (["кот", "пёс", "кот"], "Alice", "2024-01"),
+    (["пёс"], "Bob", "2024-01"),
+    (["кот", "рыба"], "Bob", None),
+    ([], "Alice", "2024-02"),
+    (["рыба", "кот"], "Alice", "2024-02"),
+]
+
+
+def fill(counts, messages=MESSAGES):
+    for words, user, month in messages:
+        counts.add(words, users=user, months=month)
+    return counts
+
+
+class TestVocabulary:
+    def test_interns_in_order(self):
+        vocabulary = Vocabulary(["a", "b"])
+        assert vocabulary.encode(["b", "c", "a"]) == [1, 2, 0]
+        assert vocabulary.words == ["a", "b", "c"]
+        assert vocabulary.get("d") == -1
+
+
+class TestTokenCounts:
+    def test_matches_counters(self, monkeypatch):
+        monkeypatch.setattr(tokens, "FLUSH_TOKENS", 2)
+        counts = fill(TokenCounts(("users", "months")))
+
+        assert counts.total == 8 and counts.vocabulary_size == 3
+        assert counts.most_common(2) == [("кот", 4), ("пёс", 2)]
+        assert counts.most_common(5, "users", "Bob") == [("кот", 1), ("пёс", 1), ("рыба", 1)]
+        assert counts.count("кот", "months", "2024-01") == 2
+        assert counts.count("рыба", "months", "2024-01") == 0
+        assert counts.count("нет", "users", "Alice") == 0
+        assert counts.spread("пёс", "users") == 2 and counts.spread("кот", "months") == 2
+        assert counts.label_totals("users") == {"Alice": 5, "Bob": 3}
+        assert sorted(counts.labels("months")) == ["2024-01", "2024-02"]
+        assert dict(counts.items(min_count=2)) == {"кот": 4, "пёс": 2, "рыба": 2}
+
+    def test_merge_remaps_vocabularies(self):
+        whole = fill(TokenCounts(("users", "months")))
+        left = fill(TokenCounts(("users", "months")), MESSAGES[:2])
+        right = pickle.loads(pickle.dumps(fill(TokenCounts(("users", "months")), MESSAGES[2:])))
+
+        merged = merge(left, right)
+        assert dict(merged.items()) == dict(whole.items())
+        for user in ("Alice", "Bob"):
+            assert sorted(merged.most_common(5, "users", user)) == sorted(whole.most_common(5, "users", user))
+        assert merged.label_totals("months") == whole.label_totals("months")
+
+
+class TestSketches:
+    def test_count_min_overestimates(self):
+        words = ["w%d" % (i % 50) for i in range(1000)] + ["частое"] * 300
+        sketch = CountMinSketch(width=64, depth=4)
+        batch = Counter(words)
+        sketch.add([word_hash(w) for w in batch], list(batch.values()))
+
+        assert sketch.estimate("частое") >= 300
+        assert all(sketch.estimate(w) >= c for w, c in batch.items())
+
+    def test_frequent_items_keeps_heavy_hitters(self):
+        items = FrequentItems(capacity=3)
+        for i in range(100):
+            items.update(Counter(["a", "a", "b", "x%d" % i]))
+
+        assert "a" in items and "b" in items
+        assert items.counts["a"] >= 200 - items.error
+
+    def test_token_sketch_interface(self):
+        sketch = fill(TokenSketch(("users", "months"), capacity=10, axis_capacity=10, width=256, axis_width=64))
+
+        assert sketch.total == 8 and sketch.vocabulary_size is None
+        assert sketch.most_common(1) == [("кот", 4)]
+        assert sketch.count("кот", "months", "2024-01") >= 2
+        assert sketch.spread("пёс", "users") == 2
+        assert sketch.label_totals("users") == {"Alice": 5, "Bob": 3}
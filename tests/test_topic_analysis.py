@@ -0,0 +1,56 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC)
+
+from tgchatsanalyzer import ChatStore
+from tgchatsanalyzer.batch import RecordingStreamlit
+
+spec = importlib.util.spec_from_file_location(
+    "topic_analysis", os.path.join(SRC, "plugins", "friend_research", "topic_analysis.py")
+)
+topic_analysis = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(topic_analysis)
+
+TEXTS = [
+    ("Alice", "работа работа опять проект"),
+    ("Bob", "смотрели фильм и сериал"),
+    ("Alice", "вечером фильм, потом работа"),
+    ("Bob", "пицца и суши, очень вкусно"),
+    ("Carol", "билет в отпуск купила"),
+]
+
+
+def make_chat():
+    messages = [
+        {"id": i, "date": f"2024-{1 + i % 5:02d}-10T12:00:00", "from": sender, "text": text}
+        for i, (sender, text) in enumerate(TEXTS * 2)
+    ]
+    return ChatStore.from_data({"name": "Group", "messages": messages})
+
+
+class TestRenderPlugin:
+    # Шрифту по умолчанию не хватает эмодзи из названий тем
+    @pytest.mark.filterwarnings("ignore:Glyph")
+    def test_renders_topics_and_keywords(self, monkeypatch):
+        chat = make_chat()
+        recorder = RecordingStreamlit(table_format="csv")
+        monkeypatch.setattr(topic_analysis, "st", recorder)
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder.begin(tmp)
+            result = topic_analysis.compute_plugin(chat)
+            topic_analysis.render_plugin(chat.as_data(), chat, result)
+
+        report = "\n".join(str(line) for line in recorder.lines)
+        assert "**💼 Работа**: 8 упоминаний — работа (6), проект (2)" in report
+        assert "**🎬 Кино/Сериалы**: 6 упоминаний — фильм (4), сериал (2)" in report
+        assert "👤 **Alice**" in report
+        assert recorder.figures